@@ -0,0 +1,216 @@
+import os
+import json
+import random
+import argparse
+from datetime import date, timedelta
+from html import escape
+
+from page_archive import iter_archive
+
+
+# Laid out like stub_server.py expects: <root>/search/*.html, <root>/product/<ASIN>.html,
+# <root>/reviews/<ASIN>.html, so the same corpus can also be served for fetch tests
+PAGE_TYPES = ('search', 'product', 'reviews')
+
+CATEGORIES = ['Smartphones', 'Laptops', 'video_games', 'Dresses', 'Shoes', 'Accessories']
+WORDS = ('battery screen fast slow great terrible cheap sturdy broke works fine love hate return '
+         'quality price size fit color sound charger shipping perfect awful recommend').split()
+VOTE_WORDS = ['One', 'Two', 'Three', 'Five', 'Ten']
+MONTHS = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+          'October', 'November', 'December']
+
+
+def make_asin(number):
+    return f"B{number:09d}"
+
+
+def sentence(rng, words=12):
+    return ' '.join(rng.choice(WORDS) for _ in range(rng.randint(3, words))).capitalize()
+
+
+def posted_on(rng):
+    # Mostly parseable dates, with the odd malformed one the extractors must survive
+    if rng.random() < 0.05:
+        return "Reviewed on Smarch 5, 2023"
+    day = date(2023, 1, 1) + timedelta(days=rng.randint(0, 600))
+    return f"Reviewed in the United States on {MONTHS[day.month - 1]} {day.day}, {day.year}"
+
+
+def helpful_votes(rng):
+    if rng.random() < 0.5:
+        return f"{rng.choice(VOTE_WORDS)} people found this helpful"
+    return f"{rng.randint(2, 900)} people found this helpful"
+
+
+def make_search_page(rng, asins):
+    cards = []
+    for asin in asins:
+        if rng.random() < 0.1:
+            # Sponsored slots and widgets carry a data-asin but no result card
+            cards.append(f'<div data-asin="{asin}"></div>')
+            continue
+        price = f'<span class="a-price"><span class="a-offscreen">${rng.randint(5, 1500)}.{rng.randint(0, 99):02d}</span></span>' if rng.random() < 0.8 else ''
+        count = f"{rng.randint(1, 99)}.{rng.randint(0, 9)}K" if rng.random() < 0.3 else f"{rng.randint(1, 9999):,}"
+        cards.append(
+            f'<div data-asin="{asin}" data-component-type="s-search-result"><h2><a><span>{escape(sentence(rng, 8))}</span></a></h2>'
+            f'<span class="a-icon-alt">{rng.randint(10, 50) / 10} out of 5 stars</span>'
+            f'<a href="/dp/{asin}#customerReviews"><span class="a-size-base s-underline-text">({count})</span></a>{price}</div>'
+        )
+    cards.append('<div data-asin=""></div>')
+    return f'<html><body><div class="s-main-slot s-result-list">\n' + '\n'.join(cards) + '\n</div></body></html>\n'
+
+
+def make_product_page(rng, asin):
+    price_class = 'aok-offscreen' if rng.random() < 0.5 else 'a-offscreen'
+    parts = [f'<span id="productTitle"> {escape(sentence(rng, 10))} </span>']
+    if rng.random() < 0.9:
+        parts.append(f'<span class="a-price"><span class="{price_class}">${rng.randint(5, 2500):,}.{rng.randint(0, 99):02d}</span></span>')
+    if rng.random() < 0.9:
+        parts.append(f'<div id="acrPopover"><span class="a-declarative"><a><span> {rng.randint(10, 50) / 10} </span></a></span></div>')
+    parts.append(f'<span id="acrCustomerReviewText">{rng.randint(1, 50000):,} ratings</span>')
+    # Real product pages are large; pad with inert markup so parse cost is realistic
+    parts.append('<div class="a-section">' + ''.join(f'<p>{sentence(rng, 20)}</p>' for _ in range(200)) + '</div>')
+    return f'<html><body>{"".join(parts)}</body></html>\n'
+
+
+def make_viewpoint(rng, review_id, css_class):
+    return (
+        f'<div id="viewpoint-{review_id}" class="a-column"><div class="a-profile-content"><span class="a-profile-name">{rng.choice(WORDS).title()}</span></div>'
+        f'<i data-hook="review-star-rating-view-point"><span class="a-icon-alt">{rng.randint(1, 5)}.0 out of 5 stars</span></i>'
+        f'<span data-hook="review-title">{escape(sentence(rng, 5))}</span><div class="a-row a-spacing-top-mini">{escape(sentence(rng, 40))}</div>'
+        f'<div class="a-expander-content a-expander-partial-collapse-content"><span class="a-size-base a-color-secondary review-date">{posted_on(rng)}</span></div></div>'
+        f'<div class="a-column a-span6 view-point-review {css_class}"><div class="a-row a-spacing-top-small"><span class="a-size-small a-color-tertiary">'
+        f'<span class="review-votes">{helpful_votes(rng)}</span></span></div></div>'
+    )
+
+
+def make_review(rng, review_id):
+    stars = rng.randint(1, 5)
+    if rng.random() < 0.9:
+        title = f'<a data-hook="review-title"><span>{stars}.0 out of 5 stars\n</span><span>{escape(sentence(rng, 6))}</span></a>'
+    else:
+        title = f'<span class="cr-original-review-content">{escape(sentence(rng, 6))}</span>'
+    votes = f'<span data-hook="helpful-vote-statement">{helpful_votes(rng)}</span>' if rng.random() < 0.6 else ''
+    return (
+        f'<div data-hook="review" id="{review_id}"><i data-hook="review-star-rating"><span class="a-icon-alt">{stars}.0 out of 5 stars</span></i>'
+        f'{title}{votes}<div id="customer_review-{review_id}"><span>{posted_on(rng)}</span></div>'
+        f'<span data-hook="review-body">{escape(sentence(rng, 80))}</span></div>'
+    )
+
+
+def make_review_page(rng, asin, reviews=10):
+    parts = []
+    if rng.random() < 0.8:
+        parts.append(make_viewpoint(rng, f"R{asin}P", 'positive-review'))
+        parts.append(make_viewpoint(rng, f"R{asin}C", 'critical-review a-span-last'))
+    parts.extend(make_review(rng, f"R{asin}{position:03d}") for position in range(reviews))
+    return '<html><body>\n' + '\n'.join(parts) + '\n</body></html>\n'
+
+
+def write_page(root, page_type, name, html_content):
+    with open(os.path.join(root, page_type, f"{name}.html"), 'w', encoding='utf-8') as file:
+        file.write(html_content)
+
+
+def write_fixture_pages(root, products=200, per_search_page=48, seed=0):
+    """Write a synthetic corpus of search, product and review pages; returns page counts."""
+    rng = random.Random(seed)
+    for page_type in PAGE_TYPES:
+        os.makedirs(os.path.join(root, page_type), exist_ok=True)
+    asins = [make_asin(number) for number in range(1, products + 1)]
+    for page, start in enumerate(range(0, products, per_search_page), start=1):
+        write_page(root, 'search', f"page-{page}", make_search_page(rng, asins[start:start + per_search_page]))
+    for asin in asins:
+        write_page(root, 'product', asin, make_product_page(rng, asin))
+        write_page(root, 'reviews', asin, make_review_page(rng, asin))
+    return {page_type: len(os.listdir(os.path.join(root, page_type))) for page_type in PAGE_TYPES}
+
+
+def export_archive_pages(archive_dir, root, limit=None):
+    # Saved product and review pages from a real crawl archive, in the fixture layout
+    for page_type in PAGE_TYPES:
+        os.makedirs(os.path.join(root, page_type), exist_ok=True)
+    exported = 0
+    for record in iter_archive(archive_dir):
+        if record['page_type'] not in ('product', 'reviews'):
+            continue
+        write_page(root, record['page_type'], record['asin'], record['html'])
+        exported += 1
+        if limit and exported >= limit:
+            break
+    return exported
+
+
+def make_product_record(rng, number, scraped_at):
+    # One scraper record, including the messy values clean_data has to handle
+    asin = make_asin(number)
+    record = {
+        'Product_ID': asin,
+        'product': sentence(rng, 10) if rng.random() < 0.95 else 'N/A',
+        'price': rng.choice([f"{rng.randint(5, 2500):,}.{rng.randint(0, 99):02d}", '', 'None']),
+        'ratings': str(rng.randint(10, 50) / 10) if rng.random() < 0.9 else '',
+        'reviews': rng.randint(0, 50000),
+        'url': f"https://www.amazon.com/product-reviews/{asin}/ref=cm_cr_dp_d_show_all_top?ie=UTF8&reviewerType=all_reviews&sortBy=recent",
+        'category': rng.choice(CATEGORIES),
+        'scraped_at': scraped_at,
+    }
+    for review_type in ('Top_Positive', 'Critical'):
+        present = rng.random() < 0.8
+        record.update({
+            f'{review_type}_Review_Cust_ID': f"R{asin}{review_type[0]}" if present else 'None',
+            f'{review_type}_Review_Cust_Name': rng.choice(WORDS).title() if present else 'None',
+            f'{review_type}_Review_Cust_Influenced': rng.randint(0, 500) if present else 0,
+            f'{review_type}_Review_Cust_Comment': sentence(rng, 40) if present else 'None',
+            f'{review_type}_Review_Cust_Comment_Title': sentence(rng, 5) if present else 'None',
+            f'{review_type}_Review_Cust_Date': rng.choice([f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00", '-', None]) if present else None,
+            f'{review_type}_Review_Cust_Star_Rating': float(rng.randint(1, 5)) if present else 0.0,
+        })
+    for i in range(1, rng.randint(0, 5) + 1):
+        record.update({
+            f'Customer_{i}_ID': f"R{asin}{i:03d}",
+            f'Customer_{i}_Star_Rating': float(rng.randint(1, 5)),
+            f'Customer_{i}_Comment': sentence(rng, 60),
+            f'Customer_{i}_buying_influence': rng.randint(0, 300),
+            f'Customer_{i}_Date': f"2023-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T00:00:00" if rng.random() < 0.95 else '-',
+        })
+    return record
+
+
+def write_synthetic_products(path, products=10000, duplicate_rate=0.02, seed=0):
+    """Write a synthetic amazon_data_ext.json (.jsonl: one product per line) of the given size.
+
+    About duplicate_rate of the records repeat an earlier Product_ID, as re-crawled
+    products do, so the de-duplication path is exercised too.
+    """
+    rng = random.Random(seed)
+    scraped_at = '2024-01-15T12:00:00'
+    records = []
+    for number in range(1, products + 1):
+        if records and rng.random() < duplicate_rate:
+            records.append(dict(rng.choice(records)))
+        else:
+            records.append(make_product_record(rng, number, scraped_at))
+    with open(path, 'w') as file:
+        if path.endswith('.jsonl'):
+            for record in records:
+                file.write(json.dumps(record) + '\n')
+        else:
+            json.dump(records, file)
+    return len(records)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Build offline benchmark fixtures: saved pages and a synthetic scraper output.")
+    parser.add_argument('--root', default='benchmark_fixtures', help="Directory for the page corpus and the synthetic JSON")
+    parser.add_argument('--products', type=int, default=200, help="Synthetic products (one product and one review page each)")
+    parser.add_argument('--records', type=int, default=10000, help="Records in the synthetic amazon_data_ext.json")
+    parser.add_argument('--from-archive', default=None, help="Also export real pages from a scraper_script.py --archive-dir")
+    parser.add_argument('--archive-limit', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    counts = write_fixture_pages(args.root, args.products, seed=args.seed)
+    if args.from_archive:
+        print(f"Exported {export_archive_pages(args.from_archive, args.root, args.archive_limit)} archived pages")
+    records = write_synthetic_products(os.path.join(args.root, 'amazon_data_ext.json'), args.records, seed=args.seed)
+    print(f"Wrote {counts} pages and {records} synthetic products to {args.root}")
@@ -0,0 +1,61 @@
+import sys
+import time
+import argparse
+
+import pandas as pd
+
+from data_processing_script import reshape_reviews_long
+
+
+def reshape_reviews_loop(amazon_data, num_customers=5):
+    # The per-customer copy/rename/concat loop from create_new_csv.ipynb
+    all_customers_data = []
+    for i in range(1, num_customers + 1):
+        customer_data = amazon_data[['Product_ID', 'product', 'category', 'price_dollars', 'star_ratings', 'total_ratings', f'Customer_{i}_ID', f'Customer_{i}_Star_Rating', f'Customer_{i}_Comment', f'Customer_{i}_buying_influence', f'Customer_{i}_Date']].copy()
+        customer_data['Customer_i_Unique_ID'] = customer_data['Product_ID'] + '-' + customer_data[f'Customer_{i}_ID']
+        customer_data.columns = ['Product_ID', 'product', 'category', 'price_dollars', 'star_ratings', 'total_ratings', 'Customer_i_ID', 'Customer_i_Star_Rating', 'Customer_i_Comment', 'Customer_i_buying_influence', 'Customer_i_Date', 'Customer_i_Unique_ID']
+        customer_data = customer_data[customer_data['Customer_i_ID'].notna()]
+        columns_order = ['Customer_i_Unique_ID', 'Customer_i_ID', 'Customer_i_Star_Rating', 'Customer_i_Comment', 'Customer_i_buying_influence', 'Customer_i_Date', 'Product_ID', 'product', 'category', 'price_dollars', 'star_ratings', 'total_ratings']
+        all_customers_data.append(customer_data[columns_order])
+    formatted_data_all = pd.concat(all_customers_data, ignore_index=True)
+    return formatted_data_all.drop(columns=['Product_ID'])
+
+
+def reshape_reviews_loop_filtered(amazon_data):
+    # The loop keeps 'Unavailable' placeholder IDs; the library function drops them
+    formatted = reshape_reviews_loop(amazon_data)
+    return formatted[~formatted['Customer_i_ID'].isin(['None', 'Unavailable'])].reset_index(drop=True)
+
+
+def time_reshape(reshape, amazon_data, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        reshape(amazon_data)
+    return (time.perf_counter() - started) / rounds
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the vectorized wide-to-long reshape with the notebook loop.")
+    parser.add_argument('csv_path', nargs='?', default='amazon_data_ext.csv', help="Wide CSV written by data_processing_script.py")
+    parser.add_argument('--repeat', type=int, default=1, help="Stack the input this many times to benchmark a larger crawl")
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    amazon_data = pd.read_csv(args.csv_path)
+    if args.repeat > 1:
+        amazon_data = pd.concat([amazon_data] * args.repeat, ignore_index=True)
+
+    expected = reshape_reviews_loop_filtered(amazon_data)
+    try:
+        pd.testing.assert_frame_equal(reshape_reviews_long(amazon_data), expected, check_dtype=False)
+        matches = True
+    except AssertionError as e:
+        print(f"Output differs: {e}")
+        matches = False
+
+    loop_seconds = time_reshape(reshape_reviews_loop_filtered, amazon_data, args.rounds)
+    vectorized_seconds = time_reshape(reshape_reviews_long, amazon_data, args.rounds)
+    print(f"{len(amazon_data)} products -> {len(expected)} reviews")
+    print(f"Notebook loop:      {loop_seconds * 1000:.1f} ms")
+    print(f"Vectorized reshape: {vectorized_seconds * 1000:.1f} ms ({loop_seconds / vectorized_seconds:.1f}x)")
+    sys.exit(0 if matches else 1)
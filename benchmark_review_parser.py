@@ -0,0 +1,37 @@
+import sys
+import time
+import argparse
+
+from review_parser import parse_review_page
+from scraper_script import parse_review_page_bs4
+
+
+def time_parser(parse, pages, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for url, page_source in pages:
+            parse(page_source, url)
+    elapsed = time.perf_counter() - started
+    return len(pages) * rounds / elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Compare the lxml review extractor with the BeautifulSoup one.")
+    parser.add_argument('pages', nargs='+', help="Saved review pages (HTML files)")
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    pages = []
+    for path in args.pages:
+        with open(path, encoding='utf-8') as file:
+            pages.append((path, file.read()))
+
+    mismatches = [url for url, page_source in pages if parse_review_page(page_source, url) != parse_review_page_bs4(page_source, url)]
+    for url in mismatches:
+        print(f"Output differs for {url}")
+
+    bs4_rate = time_parser(parse_review_page_bs4, pages, args.rounds)
+    lxml_rate = time_parser(parse_review_page, pages, args.rounds)
+    print(f"BeautifulSoup (html.parser): {bs4_rate:.1f} pages/s")
+    print(f"lxml compiled selectors:     {lxml_rate:.1f} pages/s ({lxml_rate / bs4_rate:.1f}x)")
+    sys.exit(1 if mismatches else 0)
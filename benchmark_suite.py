@@ -0,0 +1,228 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+
+import psycopg2
+
+import benchmark_fixtures
+from scraper_script import extract_data_asins_from_html, parse_product_page
+from review_parser import parse_review_page
+from data_processing_script import read_chunks, clean_data, build_rows, rows_to_csv, create_tables, bulk_load
+
+
+# Throughput may drop this far below the baseline before a benchmark counts as a regression
+DEFAULT_TOLERANCE = 0.20
+
+# Postgres schema the load benchmark creates its tables in, and drops afterwards
+BENCHMARK_SCHEMA = 'benchmark_suite'
+
+
+def read_pages(root, page_type):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(root, page_type, '*.html'))):
+        with open(path, encoding='utf-8') as file:
+            pages.append((os.path.splitext(os.path.basename(path))[0], file.read()))
+    return pages
+
+
+def measure(run, units, rounds, setup=None, min_round_seconds=0.5):
+    """Time rounds of run() (each processing units items) and its peak traced memory.
+
+    A warm-up call sizes each round to repeat run() for at least min_round_seconds, so
+    fast paths are not timed from a few milliseconds of work; benchmarks with a setup
+    step (which must run before every call) are not repeated. The timed rounds run
+    without tracemalloc, which would slow them down; one extra call under tracemalloc
+    gives the peak Python allocation (C allocations inside lxml are not traced).
+    """
+    if setup is not None:
+        setup()
+    started = time.perf_counter()
+    run()
+    warm_up = time.perf_counter() - started
+    repeats = 1 if setup is not None or warm_up >= min_round_seconds else int(min_round_seconds / max(warm_up, 1e-6)) + 1
+
+    timings = []
+    for _ in range(rounds):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        for _ in range(repeats):
+            run()
+        timings.append((time.perf_counter() - started) / repeats)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'units': units,
+        'best_seconds': best,
+        'mean_seconds': sum(timings) / len(timings),
+        'per_second': units / best if best else 0.0,
+        'peak_mb': peak / (1024 * 1024),
+    }
+
+
+def bench_search_asins(pages, rounds):
+    def run():
+        for _, page_source in pages:
+            extract_data_asins_from_html(page_source)
+    return measure(run, len(pages), rounds)
+
+
+def bench_product_getters(pages, rounds):
+    def run():
+        for asin, page_source in pages:
+            parse_product_page(page_source, asin)
+    return measure(run, len(pages), rounds)
+
+
+def bench_review_extraction(pages, rounds):
+    # What scrape_extra_parameters does once the browser has the page
+    def run():
+        for asin, page_source in pages:
+            parse_review_page(page_source, f"https://www.amazon.com/product-reviews/{asin}")
+    return measure(run, len(pages), rounds)
+
+
+def bench_clean(products_path, chunk_size, rounds):
+    # Everything the loader does before COPY: read, clean, split into rows, format as CSV
+    rows = sum(len(chunk) for chunk in read_chunks(products_path, chunk_size))
+
+    def run():
+        seen_keys = set()
+        for chunk in read_chunks(products_path, chunk_size):
+            loaded = build_rows(clean_data(chunk, seen_keys))
+            rows_to_csv(product_row for _, product_row, _ in loaded)
+            rows_to_csv(review_row for _, _, review_rows in loaded for review_row in review_rows)
+    return measure(run, rows, rounds)
+
+
+def bench_clean_and_load(products_path, chunk_size, rounds, dsn):
+    # The full clean-and-load path against a throwaway Postgres (local or a container)
+    conn = psycopg2.connect(dsn)
+    with conn.cursor() as cur:
+        cur.execute(f"DROP SCHEMA IF EXISTS {BENCHMARK_SCHEMA} CASCADE; CREATE SCHEMA {BENCHMARK_SCHEMA}; SET search_path TO {BENCHMARK_SCHEMA}")
+    conn.commit()
+    create_tables(conn)
+    rows = sum(len(chunk) for chunk in read_chunks(products_path, chunk_size))
+
+    def empty_tables():
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE products CASCADE")
+        conn.commit()
+
+    def run():
+        seen_keys = set()
+        for chunk in read_chunks(products_path, chunk_size):
+            bulk_load(conn, clean_data(chunk, seen_keys), chunk_size=chunk_size)
+
+    try:
+        return measure(run, rows, rounds, setup=empty_tables)
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA {BENCHMARK_SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+def run_suite(root, rounds=5, chunk_size=5000, dsn=None, only=None):
+    products_path = os.path.join(root, 'amazon_data_ext.json')
+    benchmarks = {
+        'search_asins': lambda: bench_search_asins(read_pages(root, 'search'), rounds),
+        'product_getters': lambda: bench_product_getters(read_pages(root, 'product'), rounds),
+        'review_extraction': lambda: bench_review_extraction(read_pages(root, 'reviews'), rounds),
+        'clean': lambda: bench_clean(products_path, chunk_size, rounds),
+    }
+    if dsn:
+        benchmarks['clean_and_load'] = lambda: bench_clean_and_load(products_path, chunk_size, rounds, dsn)
+    else:
+        print("No --dsn given; skipping the clean_and_load benchmark")
+
+    results = {}
+    for name, bench in benchmarks.items():
+        if only and name not in only:
+            continue
+        results[name] = bench()
+        result = results[name]
+        print(f"{name}: {result['units']} items, {result['per_second']:.1f}/s (best of {rounds}: {result['best_seconds']:.3f}s), "
+              f"peak {result['peak_mb']:.1f} MB")
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Returns a list of regression messages; benchmarks missing on either side are skipped
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get('results', {}).get(name)
+        if expected is None:
+            continue
+        change = result['per_second'] / expected['per_second'] - 1 if expected['per_second'] else 0.0
+        print(f"  {name}: {change:+.1%} throughput, {result['peak_mb'] - expected['peak_mb']:+.1f} MB peak vs baseline")
+        if change < -tolerance:
+            regressions.append(f"{name} throughput fell {-change:.1%} ({expected['per_second']:.1f}/s -> {result['per_second']:.1f}/s)")
+        if expected['peak_mb'] and result['peak_mb'] > expected['peak_mb'] * (1 + tolerance):
+            regressions.append(f"{name} peak memory grew from {expected['peak_mb']:.1f} MB to {result['peak_mb']:.1f} MB")
+    return regressions
+
+
+def save_baseline(results, path):
+    baseline = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.node(),
+        'results': results,
+    }
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the scraper extractors and the clean-and-load path.")
+    parser.add_argument('--fixtures', default='benchmark_fixtures', help="Fixture directory (built by benchmark_fixtures.py if missing)")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--dsn', default=os.environ.get('BENCHMARK_DSN'),
+                        help="Postgres for clean_and_load, e.g. 'host=localhost user=postgres password=demopass' (default: $BENCHMARK_DSN)")
+    parser.add_argument('--only', nargs='*', default=None, help="Run only these benchmarks")
+    parser.add_argument('--baseline', default='benchmark_baseline.json', help="Stored results to compare against")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline instead of comparing")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed throughput drop / memory growth (0.2 = 20%%)")
+    parser.add_argument('--output', default=None, help="Also write this run's results as JSON")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.fixtures, 'amazon_data_ext.json')):
+        print(f"Building fixtures in {args.fixtures}")
+        benchmark_fixtures.write_fixture_pages(args.fixtures)
+        benchmark_fixtures.write_synthetic_products(os.path.join(args.fixtures, 'amazon_data_ext.json'))
+
+    results = run_suite(args.fixtures, args.rounds, args.chunk_size, args.dsn, args.only)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Saved baseline to {args.baseline}")
+        sys.exit(0)
+    if not os.path.exists(args.baseline):
+        # Nothing to compare with is a failure, not a pass: a check in CI must not go green silently
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        sys.exit(2)
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    print(f"Compared with the baseline from {baseline['created']}:")
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    for message in regressions:
+        print(f"REGRESSION: {message}")
+    sys.exit(1 if regressions else 0)
@@ -0,0 +1,71 @@
+import os
+import json
+import logging
+
+
+def replay_journal(path):
+    completed_pages = set()
+    products = {}
+    with open(path, encoding='utf-8') as file:
+        for line_number, line in enumerate(file, start=1):
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # Only the last line can be cut short by a crash
+                logging.warning(f"Ignoring incomplete journal line {line_number} in {path}")
+                continue
+            if entry['event'] == 'page':
+                completed_pages.add((entry['category'], entry['page']))
+            elif entry['event'] == 'product':
+                products.setdefault(entry['product']['Product_ID'], entry['product'])
+    return completed_pages, list(products.values())
+
+
+def load_journal_products(path):
+    if not os.path.exists(path):
+        return []
+    return replay_journal(path)[1]
+
+
+class CrawlJournal:
+    """Append-only JSON-lines log of crawl progress.
+
+    Every scraped product is written (and fsynced) as soon as it is complete, and a search
+    page is marked done once all of its products have been handled. Re-opening the journal
+    with ``resume=True`` replays it, so a restarted crawl skips finished pages and ASINs.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = path
+        self.completed_pages = set()
+        self.products = []
+        if resume and os.path.exists(path):
+            self.completed_pages, self.products = replay_journal(path)
+            print(f"Resuming from {path}: {len(self.completed_pages)} search pages and {len(self.products)} products done")
+        self.seen_products = {product['Product_ID'] for product in self.products}
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8')
+        if resume and self._file.tell() > 0:
+            # Terminate a line left half-written by a crash before appending
+            with open(path, 'rb') as file:
+                file.seek(-1, os.SEEK_END)
+                if file.read(1) != b'\n':
+                    self._file.write('\n')
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def is_page_done(self, category, page):
+        return (category, page) in self.completed_pages
+
+    def record_product(self, product_details):
+        self.seen_products.add(product_details['Product_ID'])
+        self._write({'event': 'product', 'product': product_details})
+
+    def record_page(self, category, page):
+        self.completed_pages.add((category, page))
+        self._write({'event': 'page', 'category': category, 'page': page})
+
+    def close(self):
+        self._file.close()
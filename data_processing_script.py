@@ -1,281 +1,657 @@
+import io
+import os
+import csv
+import time
+import argparse
 import pandas as pd
 import psycopg2
 import numpy as np
-import re
 import logging
-from datetime import datetime
 
-logging.basicConfig(level=logging.INFO)
-
-# Load the JSON data into a pandas DataFrame
-df = pd.read_json('amazon_data_ext.json')
-
-# Define variations of NaN or missing values and replace in customer comment columns
-nan_variants = [np.nan, 'NaN', 'nan', 'None', 'none', 'N/A', 'n/a', 'NA', 'na', 'null', '']
-
-# Replace NaN values with 'Unavailable' in specific columns
-columns_to_replace_nan = [
-    'Critical_Review_Cust_ID', 'Critical_Review_Cust_Name', 'Critical_Review_Cust_Comment',
-    'Critical_Review_Cust_Comment_Title', 
-    'Top_Positive_Review_Cust_ID', 'Top_Positive_Review_Cust_Name', 'Top_Positive_Review_Cust_Comment',
-    'Top_Positive_Review_Cust_Comment_Title' 
-]
-for column in columns_to_replace_nan:
-    if column in df.columns:
-        df[column] = df[column].replace('(', '').replace(')', '').replace(nan_variants, "Unavailable").fillna("Unavailable")
-    else:
-        print(f"Column '{column}' not found in the DataFrame.")
+import parquet_dataset
+from run_metrics import METRICS
 
-# Rest of the code remains unchanged
+logging.basicConfig(level=logging.INFO)
 
-# ---- START OF INSERTED CODE ----
-def fix_products_length(df):
-    """Ensure each record has a length of 42 by appending None values."""
-    max_len = df.shape[1]
-    if max_len < 42:
-        for _ in range(42 - max_len):
-            df[f'Extra_Column_{_}'] = None
+# Values treated as missing in any column
+nan_variants = [np.nan, 'NaN', 'nan', 'None', 'none', 'N/A', 'n/a', 'NA', 'na', 'null', '', '-']
+
+
+def column(kind, default=None, nulls=nan_variants):
+    return {'type': kind, 'default': default, 'nulls': nulls}
+
+
+def review_columns(prefix):
+    return {
+        f'{prefix}_Review_Cust_ID': column('text', 'Unavailable'),
+        f'{prefix}_Review_Cust_Name': column('text', 'Unavailable'),
+        f'{prefix}_Review_Cust_Date': column('date'),
+        f'{prefix}_Review_Cust_Comment': column('text', 'Unavailable'),
+        f'{prefix}_Review_Cust_Comment_Title': column('text', 'Unavailable'),
+        f'{prefix}_Review_Cust_Influenced': column('int', 0),
+        f'{prefix}_Review_Cust_Star_Rating': column('float', 0.0),
+    }
+
+
+def customer_columns(i):
+    return {
+        f'Customer_{i}_ID': column('text', 'Unavailable'),
+        f'Customer_{i}_Star_Rating': column('float', 0.0),
+        f'Customer_{i}_Comment': column('text', 'Unavailable'),
+        f'Customer_{i}_buying_influence': column('int', 0),
+        f'Customer_{i}_Date': column('date'),
+    }
+
+
+# Every column of the wide amazon_data_ext shape, in insert order: its type, the values
+# that mean "missing" and what a missing value becomes
+COLUMN_SCHEMA = {
+    'Product_ID': column('text'),
+    'product': column('text', 'Unavailable'),
+    'price': column('float', 0.0),
+    'ratings': column('float', 0.0),
+    'reviews': column('int', 0),
+    'category': column('text'),
+    'url': column('text'),
+    **review_columns('Top_Positive'),
+    **review_columns('Critical'),
+    **{name: spec for i in range(1, 6) for name, spec in customer_columns(i).items()},
+    'scraped_at': column('date'),
+}
+
+TABLE_COLUMNS = list(COLUMN_SCHEMA)
+
+# Scraped dates are ISO timestamps from datetime.isoformat()
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+
+PRODUCT_COLUMNS = ("product_id", "product", "price", "ratings", "reviews", "category", "url")
+REVIEW_COLUMNS = ("product_id", "review_type", "position", "review_id", "customer_name", "title", "comment", "star_rating", "helpful_votes", "review_date")
+
+# Text search configuration for review titles (weight A) and comments (weight B); review_search.py
+# queries with the same configuration
+SEARCH_CONFIG = 'english'
+SEARCH_VECTOR_EXPRESSION = (f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') || "
+                            f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(comment, '')), 'B')")
+
+# Reviews from the scraper's --max-reviews stream (amazon_reviews_ext.jsonl). They have no
+# title, so only the comment is searchable.
+STREAM_REVIEW_COLUMNS = ("product_id", "review_id", "star_rating", "comment", "helpful_votes", "review_date")
+STREAM_SEARCH_VECTOR_EXPRESSION = f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(comment, '')), 'B')"
+
+# Where each review sits in the wide tuple: (review_type, position, offset, fields in tuple order)
+VIEWPOINT_FIELDS = ("review_id", "customer_name", "review_date", "comment", "title", "helpful_votes", "star_rating")
+CUSTOMER_FIELDS = ("review_id", "star_rating", "comment", "helpful_votes", "review_date")
+REVIEW_SLOTS = [
+    ("top_positive", 1, 7, VIEWPOINT_FIELDS),
+    ("critical", 1, 14, VIEWPOINT_FIELDS),
+] + [("customer", i, 21 + 5 * (i - 1), CUSTOMER_FIELDS) for i in range(1, 6)]
+
+# Column names used by the CSV exports
+CSV_COLUMN_NAMES = {'ratings': 'star_ratings', 'reviews': 'total_ratings', 'price': 'price_dollars'}
+
+# The one-row-per-review shape of formatted_customer_data.csv
+CUSTOMER_REVIEW_FIELDS = ("ID", "Star_Rating", "Comment", "buying_influence", "Date")
+LONG_PRODUCT_COLUMNS = ['product', 'category', 'price_dollars', 'star_ratings', 'total_ratings']
+LONG_COLUMNS = ['Customer_i_Unique_ID'] + [f'Customer_i_{field}' for field in CUSTOMER_REVIEW_FIELDS] + LONG_PRODUCT_COLUMNS
+LONG_COLUMN_TYPES = {
+    'Customer_i_Unique_ID': 'text', 'Customer_i_ID': 'text', 'Customer_i_Star_Rating': 'float',
+    'Customer_i_Comment': 'text', 'Customer_i_buying_influence': 'int', 'Customer_i_Date': 'date',
+    'product': 'text', 'category': 'text', 'price_dollars': 'float', 'star_ratings': 'float', 'total_ratings': 'int',
+}
+
+
+def columns_of_type(kind):
+    return [name for name, spec in COLUMN_SCHEMA.items() if spec['type'] == kind]
+
+
+def null_mask(block):
+    # True wherever a value is missing or one of its column's null sentinels
+    mask = block.isna()
+    for name in block.columns:
+        sentinels = [value for value in COLUMN_SCHEMA[name]['nulls'] if not pd.isna(value)]
+        mask[name] |= block[name].isin(sentinels)
+    return mask
+
+
+def to_number(values):
+    # Scraped numbers may carry thousands separators or a currency sign ("1,299.99")
+    if not pd.api.types.is_numeric_dtype(values):
+        values = values.astype('string').str.replace(r'[$,\s]', '', regex=True)
+    return pd.to_numeric(values, errors='coerce')
+
+
+def normalize_columns(df):
+    """Return a frame with exactly TABLE_COLUMNS, cleaned and typed per COLUMN_SCHEMA.
+
+    Each dtype is handled as one block of vectorized operations, so the cost grows with
+    the number of columns rather than with rows times columns. Missing values come out as
+    the column default (None for SQL NULL), ready for COPY.
+    """
+    missing = [name for name in TABLE_COLUMNS if name not in df.columns]
+    if missing:
+        logging.warning(f"Columns not found in the DataFrame, using defaults: {', '.join(missing)}")
+    df = df.reindex(columns=TABLE_COLUMNS)
+    defaults = {name: spec['default'] for name, spec in COLUMN_SCHEMA.items()}
+    cleaned = {}
+
+    text_columns = columns_of_type('text')
+    block = df[text_columns].astype(object)
+    block = block.mask(null_mask(block)).fillna({name: defaults[name] for name in text_columns if defaults[name] is not None})
+    cleaned['text'] = block.where(block.notna(), None)
+
+    for kind, dtype in (('float', 'float64'), ('int', 'int64')):
+        kind_columns = columns_of_type(kind)
+        block = df[kind_columns]
+        block = block.mask(null_mask(block)).apply(to_number)
+        cleaned[kind] = block.fillna({name: defaults[name] for name in kind_columns}).astype(dtype)
+
+    date_columns = columns_of_type('date')
+    block = df[date_columns]
+    block = block.mask(null_mask(block)).apply(pd.to_datetime, errors='coerce', format=DATE_FORMAT)
+    block = block.apply(lambda dates: dates.dt.strftime('%Y-%m-%d')).astype(object)
+    cleaned['date'] = block.where(block.notna(), None)
+
+    return pd.concat(cleaned.values(), axis=1)[TABLE_COLUMNS]
+
+
+def clean_data(df, seen_keys=None):
+    # Drop the 'review_responders' column if it exists
+    if 'review_responders' in df.columns:
+        df = df.drop(columns=['review_responders'])
+
+    df = normalize_columns(df)
+
+    # Remove any duplicates that may have been created due to URL changes
+    df = df.drop_duplicates(subset=['Product_ID'], keep='first')
+
+    # When cleaning chunk by chunk, also drop products already kept from earlier chunks
+    if seen_keys is not None:
+        df = df[~df['Product_ID'].isin(seen_keys)]
+        seen_keys.update(df['Product_ID'])
     return df
 
-# Call the function to ensure data consistency
-df = fix_products_length(df)
-# ---- END OF INSERTED CODE ----
 
-# Check if specific columns are in the DataFrame
-columns_to_check = ['Critical_Review_Cust_Influenced', 'Top_Positive_Review_Cust_Influenced']
-for column in columns_to_check:
-    if column not in df.columns:
-        logging.warning(f"Column '{column}' not found in the DataFrame. Please check the column name in the JSON file.")
+def read_chunks(path, chunk_size):
+    """Yield the scraped products at path as DataFrames of at most chunk_size rows.
+
+    A .jsonl file is streamed, so only one chunk is in memory at a time; a JSON array
+    has to be parsed whole and is only sliced.
+    """
+    if path.endswith('.jsonl'):
+        with pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False) as reader:
+            yield from reader
+    else:
+        df = pd.read_json(path, dtype=False, convert_dates=False)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+
+
+def connect():
+    # Connect to PostgreSQL
+    return psycopg2.connect(
+        host="localhost",
+        database="postgres",
+        user="postgres",
+        password="demopass",
+        client_encoding='utf8'
+    )
+
+
+def create_tables(conn):
+    # One row per product and one row per review. Reviews live under their product's key,
+    # so per-product, per-category and per-date queries can use an index instead of a scan.
+    create_table_query = """
+    DO $$ BEGIN
+        CREATE TYPE review_type AS ENUM ('top_positive', 'critical', 'customer');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$;
+
+    CREATE TABLE IF NOT EXISTS products (
+        product_id TEXT PRIMARY KEY,
+        product TEXT NOT NULL,
+        price NUMERIC NULL,
+        ratings NUMERIC NULL,
+        reviews INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        url TEXT NOT NULL
+    );
+
+    CREATE TABLE IF NOT EXISTS reviews (
+        product_id TEXT NOT NULL REFERENCES products (product_id) ON DELETE CASCADE,
+        review_type review_type NOT NULL,
+        position SMALLINT NOT NULL,
+        review_id TEXT NOT NULL,
+        customer_name TEXT,
+        title TEXT,
+        comment TEXT,
+        star_rating NUMERIC,
+        helpful_votes INTEGER,
+        review_date DATE,
+        PRIMARY KEY (product_id, review_type, position)
+    );
+
+    CREATE INDEX IF NOT EXISTS products_category_idx ON products (category);
+    CREATE INDEX IF NOT EXISTS reviews_product_id_review_date_idx ON reviews (product_id, review_date);
+    CREATE INDEX IF NOT EXISTS reviews_star_rating_idx ON reviews (star_rating);
+
+    -- Full-text search over review titles and comments (see review_search.py). A stored
+    -- generated column is recomputed by every insert, so each load keeps the index current.
+    ALTER TABLE reviews ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (""" + SEARCH_VECTOR_EXPRESSION + """) STORED;
+    CREATE INDEX IF NOT EXISTS reviews_search_vector_idx ON reviews USING GIN (search_vector);
+
+    -- Every review of the deep review stream, kept across loads (a reloaded product only
+    -- replaces its rows in reviews)
+    CREATE TABLE IF NOT EXISTS stream_reviews (
+        product_id TEXT NOT NULL REFERENCES products (product_id) ON DELETE CASCADE,
+        review_id TEXT NOT NULL,
+        star_rating NUMERIC,
+        comment TEXT,
+        helpful_votes INTEGER,
+        review_date DATE,
+        search_vector tsvector GENERATED ALWAYS AS (""" + STREAM_SEARCH_VECTOR_EXPRESSION + """) STORED,
+        PRIMARY KEY (product_id, review_id)
+    );
+    CREATE INDEX IF NOT EXISTS stream_reviews_search_vector_idx ON stream_reviews USING GIN (search_vector);
+
+    -- What review_search.py searches: the product-page reviews plus the stream's reviews
+    -- that are not among them
+    CREATE OR REPLACE VIEW searchable_reviews AS
+    SELECT product_id, review_type, review_id, title, comment, star_rating, review_date, search_vector FROM reviews
+    UNION ALL
+    SELECT s.product_id, 'customer'::review_type, s.review_id, NULL::text, s.comment, s.star_rating, s.review_date, s.search_vector
+    FROM stream_reviews s
+    WHERE NOT EXISTS (SELECT 1 FROM reviews r WHERE r.product_id = s.product_id AND r.review_id = s.review_id);
+
+    -- The wide table written by earlier versions of this script is kept as amazon_data_ext_legacy
+    DO $$ BEGIN
+        IF EXISTS (SELECT 1 FROM pg_class WHERE relname = 'amazon_data_ext' AND relkind = 'r' AND pg_table_is_visible(oid)) THEN
+            ALTER TABLE amazon_data_ext RENAME TO amazon_data_ext_legacy;
+        END IF;
+    END $$;
+    """ + wide_view_query() + """
+    CREATE TEMP TABLE IF NOT EXISTS products_staging (LIKE products INCLUDING DEFAULTS);
+    CREATE TEMP TABLE IF NOT EXISTS reviews_staging (LIKE reviews INCLUDING DEFAULTS);
+    CREATE TEMP TABLE IF NOT EXISTS stream_reviews_staging (
+        product_id TEXT, review_id TEXT, star_rating NUMERIC, comment TEXT, helpful_votes INTEGER, review_date DATE
+    );
+    -- The products of this run and their scrape times, for the review stream's exports
+    CREATE TEMP TABLE IF NOT EXISTS run_products (product_id TEXT PRIMARY KEY, scraped_at TIMESTAMP);
+    """
+    with conn.cursor() as cur:
+        cur.execute(create_table_query)
+    conn.commit()
+
+
+def wide_view_query():
+    # Rebuild the old 46-column amazon_data_ext shape on top of products/reviews
+    columns = [f"p.{column} AS {wide}" for column, wide in zip(PRODUCT_COLUMNS, TABLE_COLUMNS)]
+    for review_type, position, offset, fields in REVIEW_SLOTS:
+        for field, wide in zip(fields, TABLE_COLUMNS[offset:offset + len(fields)]):
+            columns.append(f"max(r.{field}) FILTER (WHERE r.review_type = '{review_type}' AND r.position = {position}) AS {wide}")
+    return """
+    CREATE OR REPLACE VIEW amazon_data_ext AS
+    SELECT
+        """ + ",\n        ".join(columns) + """
+    FROM products p
+    LEFT JOIN reviews r ON r.product_id = p.product_id
+    GROUP BY p.product_id;
+    """
+
+
+product_column_list = ", ".join(PRODUCT_COLUMNS)
+review_column_list = ", ".join(REVIEW_COLUMNS)
+
+# Define the INSERT queries
+insert_product_query = f"INSERT INTO products_staging ({product_column_list}) VALUES (" + ", ".join(["%s"] * len(PRODUCT_COLUMNS)) + ")"
+insert_review_query = f"INSERT INTO reviews_staging ({review_column_list}) VALUES (" + ", ".join(["%s"] * len(REVIEW_COLUMNS)) + ")"
+
+copy_products_query = f"COPY products_staging ({product_column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+copy_reviews_query = f"COPY reviews_staging ({review_column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+
+# A product listed twice in one batch keeps its last staged row; ON CONFLICT cannot touch a row twice
+upsert_products_query = f"""
+INSERT INTO products ({product_column_list})
+SELECT DISTINCT ON (product_id) {product_column_list} FROM products_staging ORDER BY product_id, ctid DESC
+ON CONFLICT (product_id) DO UPDATE SET
+    """ + ",\n    ".join(f"{column} = EXCLUDED.{column}" for column in PRODUCT_COLUMNS[1:])
+
+# A reloaded product's reviews replace the ones stored for it before
+replace_reviews_query = f"""
+DELETE FROM reviews WHERE product_id IN (SELECT product_id FROM products_staging);
+INSERT INTO reviews ({review_column_list})
+SELECT DISTINCT ON (product_id, review_type, position) {review_column_list} FROM reviews_staging
+ORDER BY product_id, review_type, position, ctid DESC;
+TRUNCATE products_staging, reviews_staging;
+"""
 
-# Convert date columns to datetime objects and then to 'yyyy-mm-dd' string format
-date_columns = ['Critical_Review_Cust_Date', 'Top_Positive_Review_Cust_Date'] + [f'Customer_{i}_Date' for i in range(1, 6)]
-for column in date_columns:
-    df[column] = pd.to_datetime(df[column], errors='coerce', format='%Y-%m-%dT%H:%M:%S')
-    df[column].fillna(pd.NaT, inplace=True)
-    df[column] = df[column].apply(lambda x: x.strftime('%Y-%m-%d') if pd.notna(x) else '1677-09-21')
 
-# Replace NaN values with 'None' in specific columns
-columns_to_replace_nan = [
-    'Critical_Review_Cust_ID', 'Critical_Review_Cust_Name', 'Critical_Review_Cust_Comment',
-    'Critical_Review_Cust_Comment_Title', 'Critical_Review_Cust_Influenced',
-    'Top_Positive_Review_Cust_ID', 'Top_Positive_Review_Cust_Name', 'Top_Positive_Review_Cust_Comment',
-    'Top_Positive_Review_Cust_Comment_Title', 'Top_Positive_Review_Cust_Influenced'
-]
-for column in columns_to_replace_nan:
-    df[column] = df[column].replace({np.nan: 'None'})
+stream_review_column_list = ", ".join(STREAM_REVIEW_COLUMNS)
+copy_stream_reviews_query = f"COPY stream_reviews_staging ({stream_review_column_list}) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+
+insert_stream_review_query = (f"INSERT INTO stream_reviews_staging ({stream_review_column_list}) VALUES ("
+                              + ", ".join(["%s"] * len(STREAM_REVIEW_COLUMNS)) + ")")
+copy_run_products_query = "COPY run_products (product_id, scraped_at) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+
+# Staged stream reviews of this run's products that neither the product pages (reviews) nor
+# an earlier load (stream_reviews) stored, in the formatted_customer_data shape
+new_stream_reviews_query = """
+SELECT DISTINCT ON (s.product_id, s.review_id)
+    s.product_id || '-' || s.review_id, s.review_id, s.star_rating, s.comment, s.helpful_votes, s.review_date,
+    p.product, p.category, p.price, p.ratings, p.reviews, rp.scraped_at
+FROM stream_reviews_staging s
+JOIN products p ON p.product_id = s.product_id
+JOIN run_products rp ON rp.product_id = s.product_id
+WHERE NOT EXISTS (SELECT 1 FROM reviews r WHERE r.product_id = s.product_id AND r.review_id = s.review_id)
+  AND NOT EXISTS (SELECT 1 FROM stream_reviews t WHERE t.product_id = s.product_id AND t.review_id = s.review_id)
+ORDER BY s.product_id, s.review_id, s.ctid DESC
+"""
 
+# Reviews of products that were never loaded are left out; they would break the foreign key
+merge_stream_reviews_query = f"""
+INSERT INTO stream_reviews ({stream_review_column_list})
+SELECT DISTINCT ON (product_id, review_id) {stream_review_column_list} FROM stream_reviews_staging s
+WHERE EXISTS (SELECT 1 FROM products p WHERE p.product_id = s.product_id)
+ORDER BY product_id, review_id, ctid DESC
+ON CONFLICT (product_id, review_id) DO UPDATE SET
+    """ + ",\n    ".join(f"{column} = EXCLUDED.{column}" for column in STREAM_REVIEW_COLUMNS[2:])
 
 
-# Remove any duplicates that may have been created due to URL changes
-df = df.drop_duplicates(subset=['Product_ID'], keep='first')
+def is_missing_review(review_id):
+    return review_id is None or review_id in ('None', 'Unavailable')
 
-# Replace NaN values with 'None' in customer comment and ID columns
-for i in range(1, 6):
-    df[f'Customer_{i}_Comment'] = df[f'Customer_{i}_Comment'].replace({np.nan: 'Unavailable'})
-    df[f'Customer_{i}_ID'] = df[f'Customer_{i}_ID'].replace({np.nan: 'Unavailable'})
 
-# Define variations of NaN or missing values and replace in customer comment columns
-nan_variants = [np.nan, 'NaN', 'nan', 'None', 'none', 'N/A', 'n/a', 'NA', 'na', 'null', '']
-for i in range(1, 6):
-    col_name = f'Customer_{i}_Comment'
-    df[col_name] = df[col_name].astype(str).replace(nan_variants, 'None')
+def split_record(tuple_values):
+    # Turn one wide TABLE_COLUMNS tuple into a products row and its reviews rows
+    product_row = tuple(tuple_values[:len(PRODUCT_COLUMNS)])
+    review_rows = []
+    for review_type, position, offset, fields in REVIEW_SLOTS:
+        review = dict(zip(fields, tuple_values[offset:offset + len(fields)]))
+        if is_missing_review(review['review_id']):
+            continue
+        review_rows.append((product_row[0], review_type, position) + tuple(review.get(column) for column in REVIEW_COLUMNS[3:]))
+    return product_row, review_rows
 
 
-# Update the 'Critical_Review_Cust_Influenced' and 'Top_Positive_Review_Cust_Influenced' columns
-for column in ['Critical_Review_Cust_Influenced', 'Top_Positive_Review_Cust_Influenced']:
-    df[column] = df[column].replace({'"NaN"': 0.0, 'NaN': 0.0, 'None': 0.0})
+def build_rows(df):
+    # df is already normalized, so its rows go to the database as they are
+    values = df[TABLE_COLUMNS].astype(object).itertuples(index=False, name=None)
+    return [(index,) + split_record(tuple_values) for index, tuple_values in zip(df.index, values)]
 
-# Drop the 'review_responders' column if it exists
-if 'review_responders' in df.columns:
-    df.drop(columns=['review_responders'], inplace=True)
 
-# Clean other columns
-def safe_float_conversion(value):
-    try:
-        return float(value)
-    except:
-        return 0.0
-
-df['price'] = df['price'].apply(safe_float_conversion)
-df['ratings'] = df['ratings'].apply(lambda x: float(x) if pd.notna(x) and x != '' else None)
-df['reviews'] = df['reviews'].replace(nan_variants, 0).astype(int)
-
-df['ratings'] = df['ratings'].replace('(', '').replace(')', '').replace(nan_variants, 0).fillna(0).astype(float)
-
-# Connect to PostgreSQL
-conn = psycopg2.connect(
-    host="localhost",
-    database="postgres",
-    user="postgres",
-    password="demopass",
-    client_encoding='utf8'
-)
-cur = conn.cursor()
-
-# Modify the CREATE TABLE query to include additional columns
-create_table_query = """
-DROP TABLE IF EXISTS amazon_data_ext;
-CREATE TABLE IF NOT EXISTS amazon_data_ext (
-    Product_ID TEXT NOT NULL,
-    product TEXT NOT NULL,
-    price NUMERIC NULL,
-    ratings NUMERIC NULL,
-    reviews INTEGER NOT NULL,
-    category TEXT NOT NULL,
-    url TEXT NOT NULL,
-    Top_Positive_Review_Cust_ID TEXT,
-    Top_Positive_Review_Cust_Name TEXT,
-    Top_Positive_Review_Cust_Date DATE,
-    Top_Positive_Review_Cust_Comment TEXT,
-    Top_Positive_Review_Cust_Comment_Title TEXT,
-    Top_Positive_Review_Cust_Influenced INTEGER,
-    Top_Positive_Review_Cust_Star_Rating NUMERIC,
-    Critical_Review_Cust_ID TEXT,
-    Critical_Review_Cust_Name TEXT,
-    Critical_Review_Cust_Date DATE,
-    Critical_Review_Cust_Comment TEXT,
-    Critical_Review_Cust_Comment_Title TEXT,
-    Critical_Review_Cust_Influenced INTEGER,
-    Critical_Review_Cust_Star_Rating NUMERIC,
-    """ + ",\n    ".join([f"Customer_{i}_ID TEXT, Customer_{i}_Star_Rating NUMERIC, Customer_{i}_Comment TEXT, Customer_{i}_buying_influence INTEGER, Customer_{i}_Date DATE" for i in range(1, 6)]) + """
-)
-"""
-cur.execute(create_table_query)
-conn.commit()
-
-def clean_format_data(row):
-    # Extract values directly, as they are already cleaned
-    ratings = row['ratings']
-    price = row['price']
-    reviews = row['reviews']
-    product_id = row['Product_ID']
-    product = row['product']
-    category = row['category']
-    url = row['url']
-      
-    critical_review_id = row['Critical_Review_Cust_ID'] if row['Critical_Review_Cust_ID'] != 'None' else None
-    critical_review_cust_name = row['Critical_Review_Cust_Name'] if row['Critical_Review_Cust_Name'] != 'None' else None
-    critical_review_cust_comment = row['Critical_Review_Cust_Comment']
-    if critical_review_cust_comment in nan_variants or critical_review_cust_comment == 'None':
-        critical_review_cust_comment = 'Unavailable'
-    
-    critical_review_cust_comment_title = row['Critical_Review_Cust_Comment_Title'] if row['Critical_Review_Cust_Comment_Title'] != 'None' else None
-    critical_review_cust_influenced = row['Critical_Review_Cust_Influenced'] if row['Critical_Review_Cust_Influenced'] != 'None' else 0  # Correctly handle NaN values
-    critical_review_star_rating = row['Critical_Review_Cust_Star_Rating'] if pd.notna(row['Critical_Review_Cust_Star_Rating']) else 0.0
-    critical_review_cust_date = row['Critical_Review_Cust_Date'] if row['Critical_Review_Cust_Date'] != 'None' else '0001-01-01'  # Correctly handle NaN values
-
-    top_positive_review_id = row['Top_Positive_Review_Cust_ID'] if row['Top_Positive_Review_Cust_ID'] != 'None' else None
-    top_positive_review_cust_name = row['Top_Positive_Review_Cust_Name'] if row['Top_Positive_Review_Cust_Name'] != 'None' else None
-    top_positive_review_cust_comment = row['Critical_Review_Cust_Comment']
-    if top_positive_review_cust_comment in nan_variants or top_positive_review_cust_comment == 'None':
-        top_positive_review_cust_comment = None    
-    top_positive_review_cust_comment_title = row['Top_Positive_Review_Cust_Comment_Title'] if row['Top_Positive_Review_Cust_Comment_Title'] != 'None' else None
-    top_positive_review_cust_influenced = row['Top_Positive_Review_Cust_Influenced'] if row['Top_Positive_Review_Cust_Influenced'] != 'None' else 0  # Correctly handle NaN values
-    top_positive_review_star_rating = row['Top_Positive_Review_Cust_Star_Rating'] if pd.notna(row['Top_Positive_Review_Cust_Star_Rating']) else 0.0
-    top_positive_review_cust_date = row['Top_Positive_Review_Cust_Date'] if row['Top_Positive_Review_Cust_Date'] != 'None' else '0001-01-01'  # Correctly handle NaN values
-    
-    top_positive_date = row['Top_Positive_Review_Cust_Date']
-    critical_review_date = row['Critical_Review_Cust_Date']
-
-    def format_date(date_value):
-        if isinstance(date_value, str) and re.match(r'\d{4}-\d{2}-\d{2}', date_value):
-            return date_value
-        else:
-            return '0001-01-01'  # Default value for invalid date formats or non-string values
-
-    top_positive_review_cust_date = format_date(top_positive_date)
-    critical_review_cust_date = format_date(critical_review_date)
-
-
-
-    # Handle additional customer information
-    customer_data = []
-    for i in range(1, 6):
-        customer_id = row[f'Customer_{i}_ID'] if row[f'Customer_{i}_ID'] != 'None' else "Unavailable"
-        star_rating = row[f'Customer_{i}_Star_Rating'] if pd.notna(row[f'Customer_{i}_Star_Rating']) else 0.0
-        comment = row[f'Customer_{i}_Comment'] if row[f'Customer_{i}_Comment'] != 'None' else "Unavailable"
-        buying_influence = row[f'Customer_{i}_buying_influence'] if pd.notna(row[f'Customer_{i}_buying_influence']) else 0
-        customer_date = row[f'Customer_{i}_Date'] if row[f'Customer_{i}_Date'] != 'None' else '0001-01-01'  # Correctly handle NaN values
-        customer_data.extend([customer_id, star_rating, comment, buying_influence, customer_date])
-
-    # Construct the return tuple
-    result_tuple = (product_id, product, price, ratings, reviews, category, url, 
-                   top_positive_review_id, top_positive_review_cust_name, top_positive_review_cust_date, 
-                   top_positive_review_cust_comment, top_positive_review_cust_comment_title, 
-                   top_positive_review_cust_influenced, top_positive_review_star_rating, 
-                   critical_review_id, critical_review_cust_name, critical_review_cust_date, critical_review_cust_comment, 
-                   critical_review_cust_comment_title, critical_review_cust_influenced, 
-                   critical_review_star_rating, *customer_data)
-    
-    if not result_tuple:
-        logging.error(f"Failed to construct tuple for row: {row}")
-        return None
-    
-    return result_tuple
-
-# Check for the presence of the column `Customer_{i}_buying_influence` in the DataFrame
-for i in range(1, 6):
-    if f'Customer_{i}_buying_influence' not in df.columns:
-        logging.error(f"Column 'Customer_{i}_buying_influence' not found in the DataFrame.")
-
-
-# Define the INSERT query
-insert_query = """
-INSERT INTO amazon_data_ext (
-    Product_ID, product, price, ratings, reviews, category, url,
-    Top_Positive_Review_Cust_ID, Top_Positive_Review_Cust_Name, Top_Positive_Review_Cust_Date, Top_Positive_Review_Cust_Comment, Top_Positive_Review_Cust_Comment_Title, Top_Positive_Review_Cust_Influenced, Top_Positive_Review_Cust_Star_Rating, Critical_Review_Cust_ID, Critical_Review_Cust_Name, Critical_Review_Cust_Date, Critical_Review_Cust_Comment, Critical_Review_Cust_Comment_Title, Critical_Review_Cust_Influenced, Critical_Review_Cust_Star_Rating,
-    """ + ", ".join([f"Customer_{i}_ID, Customer_{i}_Star_Rating, Customer_{i}_Comment, Customer_{i}_buying_influence, Customer_{i}_Date" for i in range(1, 6)]) + """
-) VALUES (""" + ", ".join(["%s"] * (21 + 25)) + ")"
-
-
-# Count the number of placeholders in the SQL query
-num_placeholders = insert_query.count('%s')
-
-for index, row in df.iterrows():
-    tuple_values = clean_format_data(row)
-    if not tuple_values:
-        logging.warning(f"Skipping row at index {index} due to errors in data processing.")
-        continue
-    num_tuple_values = len(tuple_values)
-    
-    # Check for mismatch between placeholders and tuple values
-    if num_placeholders != num_tuple_values:
-        logging.error(f"Mismatch at index {index}! Number of placeholders: {num_placeholders}, Number of tuple values: {num_tuple_values}")
-        logging.error(f"Tuple values: {tuple_values}")
-        
-        # Expected columns based on the INSERT query
-        # Expected columns based on the INSERT query
-        expected_columns = [
-            "Product_ID", "product", "price", "ratings", "reviews", "category", "url",
-            "Top_Positive_Review_Cust_ID", "Top_Positive_Review_Cust_Name", "Top_Positive_Review_Cust_Date", "Top_Positive_Review_Cust_Comment", "Top_Positive_Review_Cust_Comment_Title", "Top_Positive_Review_Cust_Influenced",
-            "Top_Positive_Review_Cust_Star_Rating", "Critical_Review_Cust_ID", "Critical_Review_Cust_Name", "Critical_Review_Cust_Date", "Critical_Review_Cust_Comment", "Critical_Review_Cust_Comment_Title",
-            "Critical_Review_Cust_Influenced", "Critical_Review_Cust_Star_Rating"
-        ] + [f"Customer_{i}_ID" for i in range(1, 6)] + [f"Customer_{i}_Star_Rating" for i in range(1, 6)] + [f"Customer_{i}_Comment" for i in range(1, 6)] + [f"Customer_{i}_buying_influence" for i in range(1, 6)] + [f"Customer_{i}_Date" for i in range(1, 6)]
-
-
-
-        # In the section where you're logging the mismatch error, add this:
-        for col, val in zip(expected_columns, tuple_values):
-            print(f"{col}: {val}")
-
-        
-        continue  # Skip this iteration
+def rows_to_csv(rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for values in rows:
+        writer.writerow(['\\N' if value is None else value for value in values])
+    buffer.seek(0)
+    return buffer
 
 
+def load_batch(cur, rows):
+    # Fast path: the whole batch in two COPYs, merged with one upsert and one review replace
+    cur.execute("SAVEPOINT batch")
     try:
-        cur.execute(insert_query, tuple_values)
-    except Exception as e:
-        logging.error(f"Error inserting row at index {index}: {e}")
-        logging.debug(f"Row data: {row}")
-        conn.rollback()
-
-        
-
-conn.commit()
-cur.close()
-conn.close()
-# Rename the columns in the DataFrame
-df.rename(columns={'ratings': 'star_ratings', 'reviews': 'total_ratings', 'price': 'price_dollars'}, inplace=True)
-
-# Save the DataFrame to a CSV file with updated column names
-df.to_csv('amazon_data_ext.csv', index=False, encoding='utf-8')
\ No newline at end of file
+        cur.copy_expert(copy_products_query, rows_to_csv(product_row for _, product_row, _ in rows))
+        cur.copy_expert(copy_reviews_query, rows_to_csv(review_row for _, _, review_rows in rows for review_row in review_rows))
+        cur.execute(upsert_products_query)
+        cur.execute(replace_reviews_query)
+        cur.execute("RELEASE SAVEPOINT batch")
+        return len(rows), []
+    except psycopg2.Error as e:
+        logging.warning(f"Batch COPY failed ({e}); retrying row by row to isolate bad rows")
+        cur.execute("ROLLBACK TO SAVEPOINT batch")
+
+    # Slow path: stage products one at a time so bad ones can be reported and skipped
+    bad_rows = []
+    for index, product_row, review_rows in rows:
+        cur.execute("SAVEPOINT row")
+        try:
+            cur.execute(insert_product_query, product_row)
+            cur.executemany(insert_review_query, review_rows)
+            cur.execute("RELEASE SAVEPOINT row")
+        except psycopg2.Error as e:
+            cur.execute("ROLLBACK TO SAVEPOINT row")
+            bad_rows.append((index, str(e).strip()))
+    cur.execute(upsert_products_query)
+    cur.execute(replace_reviews_query)
+    return len(rows) - len(bad_rows), bad_rows
+
+
+def bulk_load(conn, df, chunk_size=5000):
+    """Upsert the cleaned frame into products/reviews in chunks of chunk_size rows.
+
+    Each chunk is committed on its own, so a bad row only costs its own chunk a slower
+    row-by-row retry; it is reported and skipped rather than rolling back the load.
+    """
+    started = time.time()
+    loaded = 0
+    rejected = 0
+    with conn.cursor() as cur:
+        for batch_number, start in enumerate(range(0, len(df), chunk_size), start=1):
+            rows = build_rows(df.iloc[start:start + chunk_size])
+            batch_loaded, bad_rows = load_batch(cur, rows)
+            conn.commit()
+            loaded += batch_loaded
+            rejected += len(bad_rows)
+            for index, error in bad_rows:
+                logging.error(f"Batch {batch_number}: row at index {index} rejected: {error}")
+
+    elapsed = time.time() - started
+    rate = loaded / elapsed if elapsed else 0.0
+    logging.info(f"Loaded {loaded} rows ({rejected} rejected) in {elapsed:.2f}s ({rate:.0f} rows/s)")
+    return loaded, rejected
+
+
+def reshape_reviews_long(df, customers=5, extra_columns=()):
+    """Turn wide product rows into the one-row-per-review formatted_customer_data shape.
+
+    Accepts the cleaned frame or amazon_data_ext.csv as read back. Each Customer_i_* field
+    is stacked customer-major in one pass, without copying per-customer frames, so rows come
+    out in the order of the old per-customer loop: every product's first review, then every second review, and so on.
+    That order holds within one call only; reshaping chunk by chunk gives the chunks' rows
+    one after another, each chunk customer-major. Reviews without an ID or a product ID are
+    dropped. extra_columns are carried along from the product row.
+    """
+    df = df.rename(columns=CSV_COLUMN_NAMES)
+    # Row k of the long frame is customer k // len(df) + 1 of product k % len(df)
+    long = {}
+    for field in CUSTOMER_REVIEW_FIELDS:
+        long[f'Customer_i_{field}'] = pd.concat([df[f'Customer_{i}_{field}'] for i in range(1, customers + 1)], ignore_index=True)
+    for name in ['Product_ID'] + LONG_PRODUCT_COLUMNS + list(extra_columns):
+        long[name] = pd.concat([df[name]] * customers, ignore_index=True)
+    long = pd.DataFrame(long)
+
+    long = long[long['Product_ID'].notna() & long['Customer_i_ID'].notna() & ~long['Customer_i_ID'].isin(['None', 'Unavailable'])]
+    long['Customer_i_Unique_ID'] = long['Product_ID'].astype(str).str.cat(long['Customer_i_ID'].astype(str), sep='-')
+    return long[LONG_COLUMNS + list(extra_columns)].reset_index(drop=True)
+
+
+def read_review_stream(path, chunk_size):
+    with pd.read_json(path, lines=True, chunksize=chunk_size, dtype=False, convert_dates=False) as reader:
+        yield from reader
+
+
+def clean_review_stream(df):
+    # Rows of the review stream as STREAM_REVIEW_COLUMNS, with None for missing values
+    df = df.reindex(columns=['Product_ID', 'Review_ID', 'Star_Rating', 'Comment', 'buying_influence', 'Date'])
+    df = df[df['Product_ID'].notna() & df['Review_ID'].notna() & ~df['Review_ID'].isin(['None', 'Unavailable'])]
+    # A resumed crawl appends to the stream, so the same review can be listed twice
+    df = df.drop_duplicates(subset=['Product_ID', 'Review_ID'], keep='last')
+    comments = df['Comment'].astype(object)
+    dates = df['Date'].astype(object)
+    cleaned = pd.DataFrame({
+        'product_id': df['Product_ID'].astype(str),
+        'review_id': df['Review_ID'].astype(str),
+        'star_rating': to_number(df['Star_Rating']).astype(object),
+        'comment': comments.mask(comments.isin(nan_variants)),
+        'helpful_votes': to_number(df['buying_influence']).fillna(0).astype('int64').astype(object),
+        'review_date': pd.to_datetime(dates.mask(dates.isin(nan_variants)), errors='coerce', format=DATE_FORMAT)
+                         .dt.strftime('%Y-%m-%d').astype(object),
+    }, index=df.index)
+    return cleaned.where(cleaned.notna(), None)
+
+
+def record_run_products(conn, df):
+    # Products cleaned in this run, so the review stream is exported for them only
+    rows = df[['Product_ID', 'scraped_at']].astype(object)
+    with conn.cursor() as cur:
+        cur.copy_expert(copy_run_products_query, rows_to_csv(rows.where(rows.notna(), None).itertuples(index=False, name=None)))
+    conn.commit()
+
+
+def merge_review_stream(cur):
+    # Returns the new reviews (see new_stream_reviews_query) and how many rows were merged
+    cur.execute(new_stream_reviews_query)
+    new_reviews = pd.DataFrame(cur.fetchall(), columns=LONG_COLUMNS + ['scraped_at'])
+    cur.execute(merge_stream_reviews_query)
+    merged = cur.rowcount
+    cur.execute("TRUNCATE stream_reviews_staging")
+    for name in ['Customer_i_Star_Rating', 'price_dollars', 'star_ratings']:
+        new_reviews[name] = pd.to_numeric(new_reviews[name], errors='coerce')
+    return new_reviews, merged
+
+
+def load_review_stream(conn, reviews):
+    """Merge cleaned stream reviews into stream_reviews, in one COPY when the rows allow it.
+
+    As in load_batch, a failed COPY or merge is retried row by row so only the bad rows are
+    rejected. Returns the new reviews for the long exports, the merged row count and the
+    (index, error) of every rejected row.
+    """
+    rows = list(zip(reviews.index, reviews[list(STREAM_REVIEW_COLUMNS)].itertuples(index=False, name=None)))
+    with conn.cursor() as cur:
+        cur.execute("SAVEPOINT batch")
+        try:
+            cur.copy_expert(copy_stream_reviews_query, rows_to_csv(values for _, values in rows))
+            new_reviews, merged = merge_review_stream(cur)
+            cur.execute("RELEASE SAVEPOINT batch")
+            conn.commit()
+            return new_reviews, merged, []
+        except psycopg2.Error as e:
+            logging.warning(f"Review stream COPY failed ({e}); retrying row by row to isolate bad rows")
+            cur.execute("ROLLBACK TO SAVEPOINT batch")
+
+        bad_rows = []
+        for index, values in rows:
+            cur.execute("SAVEPOINT row")
+            try:
+                cur.execute(insert_stream_review_query, values)
+                cur.execute("RELEASE SAVEPOINT row")
+            except psycopg2.Error as e:
+                cur.execute("ROLLBACK TO SAVEPOINT row")
+                bad_rows.append((index, str(e).strip()))
+        new_reviews, merged = merge_review_stream(cur)
+    conn.commit()
+    return new_reviews, merged, bad_rows
+
+
+def export_parquet(df, root='amazon_data_ext_parquet', written=None):
+    column_types = {name: spec['type'] for name, spec in COLUMN_SCHEMA.items()}
+    parquet_dataset.write_partitioned(df, root, column_types, scrape_date_column='scraped_at', written=written)
+
+
+def export_reviews_parquet(long, root='formatted_customer_data_parquet', written=None):
+    parquet_dataset.write_partitioned(long, root, LONG_COLUMN_TYPES, dictionary_columns=('product',), scrape_date_column='scraped_at',
+                                      written=written)
+
+
+def export_csv(df, path='amazon_data_ext.csv', append=False):
+    # Rename the columns in the DataFrame
+    df = df.rename(columns=CSV_COLUMN_NAMES)
+
+    # Save the DataFrame to a CSV file with updated column names
+    df.to_csv(path, mode='a' if append else 'w', header=not append, index=False, encoding='utf-8')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Clean scraped Amazon data and load it into PostgreSQL.")
+    parser.add_argument('--input', default='amazon_data_ext.json',
+                        help="Scraper output; a .jsonl file is read and loaded chunk by chunk")
+    parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per chunk read, cleaned and COPYed")
+    parser.add_argument('--parquet-dir', default='amazon_data_ext_parquet',
+                        help="Parquet dataset partitioned by category and scrape date ('' to skip)")
+    parser.add_argument('--skip-csv', action='store_true', help="Do not write the CSV exports")
+    parser.add_argument('--reviews-csv', default='formatted_customer_data.csv',
+                        help="One-row-per-review CSV (the create_new_csv.ipynb output; '' to skip)")
+    parser.add_argument('--reviews-parquet-dir', default='formatted_customer_data_parquet',
+                        help="One-row-per-review Parquet dataset ('' to skip)")
+    parser.add_argument('--reviews-input', default='amazon_reviews_ext.jsonl',
+                        help="Review stream from scraper_script.py --max-reviews, loaded after the products if it exists ('' to skip)")
+    parser.add_argument('--metrics-json', default='processing_metrics.json', help="Per-stage timing report for this run ('' to skip)")
+    parser.add_argument('--metrics-prom', default='processing_metrics.prom', help="The same metrics in Prometheus text format ('' to skip)")
+    args = parser.parse_args()
+    METRICS.start('amazon_processing')
+
+    conn = connect()
+    create_tables(conn)
+
+    # Partitions written by this run: replaced on their first write, appended to afterwards
+    written_partitions = set()
+    written_review_partitions = set()
+
+    # Product IDs kept so far, so duplicates are dropped across chunks as well as within them
+    seen_keys = set()
+    loaded = 0
+    rejected = 0
+    reviews_csv_started = False
+    # Nothing is collected for the review stream unless its file exists
+    stream_input = args.reviews_input if args.reviews_input and os.path.exists(args.reviews_input) else None
+    for chunk_number, chunk in enumerate(METRICS.iterate('load', read_chunks(args.input, args.chunk_size))):
+        with METRICS.timer('clean'):
+            df = clean_data(chunk, seen_keys)
+        with METRICS.timer('insert'):
+            chunk_loaded, chunk_rejected = bulk_load(conn, df, chunk_size=args.chunk_size)
+        loaded += chunk_loaded
+        rejected += chunk_rejected
+        METRICS.count('rows', len(chunk), status='read')
+        METRICS.count('rows', chunk_loaded, status='loaded')
+        METRICS.count('rows', chunk_rejected, status='rejected')
+        if not args.skip_csv:
+            with METRICS.timer('csv_export'):
+                export_csv(df, append=chunk_number > 0)
+        if args.parquet_dir:
+            with METRICS.timer('parquet_export'):
+                export_parquet(df, args.parquet_dir, written_partitions)
+
+        with METRICS.timer('reshape'):
+            long = reshape_reviews_long(df, extra_columns=['scraped_at'])
+        if args.reviews_csv and not args.skip_csv:
+            with METRICS.timer('reviews_csv_export'):
+                long[LONG_COLUMNS].to_csv(args.reviews_csv, mode='a' if reviews_csv_started else 'w', header=not reviews_csv_started, index=False)
+            reviews_csv_started = True
+        if args.reviews_parquet_dir:
+            with METRICS.timer('reviews_parquet_export'):
+                export_reviews_parquet(long, args.reviews_parquet_dir, written_review_partitions)
+        if stream_input:
+            record_run_products(conn, df)
+
+    # The deep review stream goes to stream_reviews; the reviews it adds are appended to the
+    # long exports
+    stream_loaded = 0
+    stream_rejected = 0
+    if stream_input:
+        for chunk_number, chunk in enumerate(METRICS.iterate('load_review_stream', read_review_stream(stream_input, args.chunk_size)), start=1):
+            with METRICS.timer('clean_review_stream'):
+                reviews = clean_review_stream(chunk)
+            with METRICS.timer('insert_review_stream'):
+                long, chunk_loaded, bad_rows = load_review_stream(conn, reviews)
+            stream_loaded += chunk_loaded
+            stream_rejected += len(bad_rows)
+            for index, error in bad_rows:
+                logging.error(f"Review stream chunk {chunk_number}: row at index {index} rejected: {error}")
+            METRICS.count('stream_reviews', len(chunk), status='read')
+            METRICS.count('stream_reviews', len(bad_rows), status='rejected')
+            if args.reviews_csv and not args.skip_csv:
+                with METRICS.timer('reviews_csv_export'):
+                    long[LONG_COLUMNS].to_csv(args.reviews_csv, mode='a' if reviews_csv_started else 'w', header=not reviews_csv_started, index=False)
+                reviews_csv_started = True
+            if args.reviews_parquet_dir:
+                with METRICS.timer('reviews_parquet_export'):
+                    export_reviews_parquet(long, args.reviews_parquet_dir, written_review_partitions)
+        METRICS.count('stream_reviews', stream_loaded, status='loaded')
+    conn.close()
+
+    logging.info(f"Finished: {loaded} rows loaded, {rejected} rejected, {len(seen_keys)} distinct products, "
+                 f"{stream_loaded} stream reviews loaded, {stream_rejected} rejected")
+    METRICS.print_summary()
+    METRICS.export(args.metrics_json, args.metrics_prom)
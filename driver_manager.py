@@ -0,0 +1,167 @@
+import os
+import time
+import logging
+
+from selenium import webdriver
+from selenium.webdriver.edge.service import Service
+from selenium.common.exceptions import SessionNotCreatedException
+from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+try:
+    import psutil
+except ImportError:  # RSS-based recycling is skipped without psutil
+    psutil = None
+
+
+DRIVER_PATH_CACHE = os.path.join(os.path.expanduser('~'), '.wdm', 'edgedriver_path.txt')
+
+# Resource types the extractors never look at
+BLOCKED_URL_PATTERNS = [
+    '*.jpg', '*.jpeg', '*.png', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.m3u8', '*.mp3',
+]
+
+
+def get_driver_path(cache_file=DRIVER_PATH_CACHE, refresh=False):
+    # EDGEDRIVER_PATH wins; otherwise reuse the binary resolved by an earlier run and only
+    # ask webdriver-manager (a network round-trip) when there is nothing usable cached.
+    # refresh skips both and resolves a driver for the installed Edge again.
+    env_path = os.environ.get('EDGEDRIVER_PATH')
+    if env_path and os.path.exists(env_path) and not refresh:
+        return env_path
+
+    if os.path.exists(cache_file) and not refresh:
+        with open(cache_file) as file:
+            cached_path = file.read().strip()
+        if cached_path and os.path.exists(cached_path):
+            return cached_path
+
+    driver_path = EdgeChromiumDriverManager().install()
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    with open(cache_file, 'w') as file:
+        file.write(driver_path)
+    return driver_path
+
+
+def is_version_mismatch(error):
+    # "session not created: This version of Microsoft Edge WebDriver only supports Microsoft Edge version 114"
+    message = str(error).lower()
+    return 'only supports' in message or 'current browser version' in message
+
+
+def create_edge_driver(options, cache_file=DRIVER_PATH_CACHE):
+    """Start Edge with the cached driver binary.
+
+    Edge updates itself, after which the cached driver no longer matches the browser; on
+    that error the driver is resolved again through webdriver-manager, the cache is
+    rewritten and the start is retried once.
+    """
+    try:
+        return webdriver.Edge(service=Service(get_driver_path(cache_file)), options=options)
+    except SessionNotCreatedException as e:
+        if not is_version_mismatch(e):
+            raise
+        logging.warning(f"Edge driver does not match the installed Edge ({e}); installing a matching driver")
+    return webdriver.Edge(service=Service(get_driver_path(cache_file, refresh=True)), options=options)
+
+
+def make_edge_options(user_agent=None, block_resources=True):
+    options = webdriver.EdgeOptions()
+    options.add_argument('--no-sandbox')
+    if user_agent:
+        options.add_argument(f"user-agent={user_agent}")
+    # Hand the page over once the DOM is parsed instead of waiting for every subresource
+    options.page_load_strategy = 'eager'
+    if block_resources:
+        # Images via prefs; media and fonts are blocked by URL in block_heavy_resources
+        options.add_argument('--blink-settings=imagesEnabled=false')
+        options.add_experimental_option('prefs', {
+            'profile.managed_default_content_settings.images': 2,
+        })
+    return options
+
+
+def block_heavy_resources(driver):
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': BLOCKED_URL_PATTERNS})
+    except Exception as e:
+        logging.warning(f"Could not block images/media/fonts over CDP: {e}")
+
+
+def browser_rss_bytes(driver):
+    # Resident memory of the driver binary plus every browser process it started
+    if psutil is None:
+        return 0
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        return sum(process.memory_info().rss for process in [root] + root.children(recursive=True))
+    except (AttributeError, psutil.Error):
+        return 0
+
+
+class ManagedDriver:
+    """A WebDriver that is restarted after ``max_pages`` loads or once it uses ``max_rss_mb``.
+
+    Attribute access is forwarded to the current browser, so it can be used anywhere a
+    plain driver is expected. ``factory`` builds a fresh driver on every (re)start.
+    """
+
+    def __init__(self, factory, max_pages=200, max_rss_mb=1500, rss_check_every=10):
+        self.factory = factory
+        self.max_pages = max_pages
+        self.max_rss_bytes = max_rss_mb * 1024 * 1024
+        self.rss_check_every = rss_check_every
+        self.driver = None
+        self.pages = 0
+        self.restarts = 0
+        self.total_pages = 0
+        self.load_seconds = 0.0
+        self.peak_rss_bytes = 0
+        self._start()
+
+    def _start(self):
+        self.driver = self.factory()
+        self.pages = 0
+
+    def _should_recycle(self):
+        if self.max_pages and self.pages >= self.max_pages:
+            return True
+        if self.pages and self.pages % self.rss_check_every == 0:
+            rss = browser_rss_bytes(self.driver)
+            self.peak_rss_bytes = max(self.peak_rss_bytes, rss)
+            return bool(self.max_rss_bytes) and rss > self.max_rss_bytes
+        return False
+
+    def recycle(self):
+        logging.info(f"Recycling browser after {self.pages} pages")
+        try:
+            self.driver.quit()
+        except Exception as e:
+            logging.warning(f"Error closing browser: {e}")
+        self.restarts += 1
+        self._start()
+
+    def get(self, url):
+        if self._should_recycle():
+            self.recycle()
+        started = time.time()
+        self.driver.get(url)
+        self.load_seconds += time.time() - started
+        self.pages += 1
+        self.total_pages += 1
+
+    def quit(self):
+        if self.driver is not None:
+            self.peak_rss_bytes = max(self.peak_rss_bytes, browser_rss_bytes(self.driver))
+            self.driver.quit()
+            self.driver = None
+
+    def report(self):
+        average = self.load_seconds / self.total_pages if self.total_pages else 0.0
+        print(f"Browser: {self.total_pages} page loads, {average:.2f}s average load, {self.restarts} restarts, "
+              f"peak RSS {self.peak_rss_bytes / (1024 * 1024):.0f} MB")
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
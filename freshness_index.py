@@ -0,0 +1,146 @@
+import json
+import time
+import sqlite3
+import hashlib
+
+
+# Fields that describe where a record came from rather than what was scraped
+VOLATILE_FIELDS = ('url', 'category', 'scraped_at')
+
+# Product-page fields reused from the last scrape when a stale product is refreshed
+PRODUCT_FIELDS = ('product', 'price', 'ratings', 'reviews')
+
+
+def content_hash(product_details):
+    fields = {key: value for key, value in product_details.items() if key not in VOLATILE_FIELDS}
+    return hashlib.sha1(json.dumps(fields, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def review_ids_of(product_details):
+    review_ids = []
+    i = 1
+    while f'Customer_{i}_ID' in product_details:
+        review_ids.append(product_details[f'Customer_{i}_ID'])
+        i += 1
+    return [review_id for review_id in review_ids if review_id and review_id != 'None']
+
+
+class FreshnessIndex:
+    """Cross-run SQLite index of scraped products, keyed by Product_ID.
+
+    Remembers when each product was last scraped, a hash of its extracted fields, its
+    product-page fields and the review IDs already collected, so later runs can skip
+    fresh products and refresh stale ones from the reviews page alone. The top reviews
+    on the reviews page (known_reviews) and the reviews the deep review stream has
+    written (streamed_reviews) are tracked separately: the stream may only stop early at
+    reviews it collected itself, or it would never get past the first page.
+    """
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            self.connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            return
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript("""
+            CREATE TABLE IF NOT EXISTS products (
+                product_id TEXT PRIMARY KEY,
+                last_scraped REAL NOT NULL,
+                content_hash TEXT NOT NULL,
+                newest_review_id TEXT,
+                newest_review_date TEXT,
+                product_fields TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS known_reviews (
+                product_id TEXT NOT NULL,
+                review_id TEXT NOT NULL,
+                PRIMARY KEY (product_id, review_id)
+            );
+            CREATE TABLE IF NOT EXISTS streamed_reviews (
+                product_id TEXT NOT NULL,
+                review_id TEXT NOT NULL,
+                PRIMARY KEY (product_id, review_id)
+            );
+        """)
+        self.connection.commit()
+
+    def lookup(self, product_id):
+        row = self.connection.execute(
+            "SELECT last_scraped, content_hash, product_fields FROM products WHERE product_id = ?", (product_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'last_scraped': row[0], 'content_hash': row[1], 'product_fields': json.loads(row[2])}
+
+    def is_fresh(self, product_id, ttl_seconds, now=None):
+        entry = self.lookup(product_id)
+        now = now if now is not None else time.time()
+        return entry is not None and now - entry['last_scraped'] < ttl_seconds
+
+    def previous_fields(self, product_id):
+        entry = self.lookup(product_id)
+        return entry['product_fields'] if entry else {}
+
+    def known_review_ids(self, product_id):
+        rows = self.connection.execute("SELECT review_id FROM known_reviews WHERE product_id = ?", (product_id,))
+        return {row[0] for row in rows}
+
+    def new_review_ids(self, product_id, review_ids):
+        # Reviews are listed newest first, so everything after the first known ID is old
+        known = self.known_review_ids(product_id)
+        new_ids = []
+        for review_id in review_ids:
+            if review_id in known:
+                break
+            new_ids.append(review_id)
+        return new_ids
+
+    def record_review_ids(self, product_id, review_ids):
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO known_reviews (product_id, review_id) VALUES (?, ?)",
+            [(product_id, review_id) for review_id in review_ids],
+        )
+        self.connection.commit()
+
+    def streamed_review_ids(self, product_id):
+        rows = self.connection.execute("SELECT review_id FROM streamed_reviews WHERE product_id = ?", (product_id,))
+        return {row[0] for row in rows}
+
+    def record_streamed_review_ids(self, product_id, review_ids):
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO streamed_reviews (product_id, review_id) VALUES (?, ?)",
+            [(product_id, review_id) for review_id in review_ids],
+        )
+        self.connection.commit()
+
+    def record(self, product_details, scraped_at=None):
+        """Store a freshly scraped product; returns True if its content changed."""
+        product_id = product_details['Product_ID']
+        digest = content_hash(product_details)
+        previous = self.lookup(product_id)
+        review_ids = review_ids_of(product_details)
+        self.connection.execute(
+            """
+            INSERT INTO products (product_id, last_scraped, content_hash, newest_review_id, newest_review_date, product_fields)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (product_id) DO UPDATE SET
+                last_scraped = excluded.last_scraped,
+                content_hash = excluded.content_hash,
+                newest_review_id = COALESCE(excluded.newest_review_id, products.newest_review_id),
+                newest_review_date = COALESCE(excluded.newest_review_date, products.newest_review_date),
+                product_fields = excluded.product_fields
+            """,
+            (
+                product_id,
+                scraped_at if scraped_at is not None else time.time(),
+                digest,
+                review_ids[0] if review_ids else None,
+                product_details.get('Customer_1_Date') if review_ids else None,
+                json.dumps({field: product_details.get(field) for field in PRODUCT_FIELDS}),
+            ),
+        )
+        self.record_review_ids(product_id, review_ids)
+        return previous is None or previous['content_hash'] != digest
+
+    def close(self):
+        self.connection.close()
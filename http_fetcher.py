@@ -0,0 +1,181 @@
+import time
+import random
+import logging
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
+
+import rate_scheduler
+from rate_scheduler import is_blocked_page
+from run_metrics import METRICS
+
+
+AMAZON_BASE_URL = 'https://www.amazon.com'
+
+# Elements that must be present before a page is handed to the extractors
+PRODUCT_PAGE_READY = '#productTitle'
+REVIEW_PAGE_READY = "div[data-hook='review']"
+
+
+class BackendStats:
+    def __init__(self):
+        self.fetches = 0
+        self.failures = 0
+        self.busy_seconds = 0.0
+        self.first_started = None
+        self.last_finished = None
+
+    def record(self, started, finished, ok=True):
+        self.fetches += 1
+        if not ok:
+            self.failures += 1
+        self.busy_seconds += finished - started
+        self.first_started = started if self.first_started is None else min(self.first_started, started)
+        self.last_finished = finished if self.last_finished is None else max(self.last_finished, finished)
+
+    def fetches_per_second(self):
+        if not self.fetches or self.last_finished == self.first_started:
+            return 0.0
+        return self.fetches / (self.last_finished - self.first_started)
+
+
+class HttpFetcher:
+    """Fetch pages over pooled keep-alive HTTP connections, falling back to Selenium.
+
+    A page is returned from the HTTP response when it contains the required element;
+    otherwise (blocked, captcha, script-rendered content) the same URL is loaded in a
+    browser obtained from ``driver_factory``. The browser is created lazily and shared,
+    so fallbacks are serialized. A ``driver`` passed in directly is used but never quit.
+    Both backends are paced by ``scheduler`` (see rate_scheduler) when one is given. A
+    block or throttle response (429, 503, captcha) is not retried in the browser; the
+    scheduler's cooldown applies to the next request instead.
+    """
+
+    def __init__(self, base_url=AMAZON_BASE_URL, pool_size=8, timeout=15, driver=None, driver_factory=None,
+                 user_agents=None, scheduler=None):
+        self.base_url = base_url.rstrip('/')
+        self.scheduler = scheduler
+        self.timeout = timeout
+        self.driver_factory = driver_factory
+        self.user_agents = user_agents or [requests.utils.default_user_agent()]
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept-Language': 'en-US,en;q=0.9'})
+        self.stats = {'http': BackendStats(), 'selenium': BackendStats()}
+        self._stats_lock = threading.Lock()
+        self._driver = driver
+        self._owns_driver = driver is None
+        self._driver_lock = threading.Lock()
+        self._ready_selectors = {}
+
+    def absolute(self, url):
+        # Extractors build amazon.com URLs; point them at the configured host instead
+        if url.startswith(AMAZON_BASE_URL):
+            return self.base_url + url[len(AMAZON_BASE_URL):]
+        if url.startswith('/'):
+            return self.base_url + url
+        return url
+
+    def _record(self, backend, started, ok):
+        with self._stats_lock:
+            self.stats[backend].record(started, time.time(), ok)
+
+    def _has_element(self, page_source, css_selector):
+        selector = self._ready_selectors.get(css_selector)
+        if selector is None:
+            selector = self._ready_selectors[css_selector] = CSSSelector(css_selector)
+        try:
+            return bool(selector(lxml_html.fromstring(page_source)))
+        except Exception:
+            return False
+
+    def _report_to_scheduler(self, url, started, outcome):
+        if self.scheduler is not None:
+            self.scheduler.record(url, time.time() - started, outcome)
+
+    def fetch_http(self, url, ready_selector):
+        # Returns the page (None unless it is complete) and the outcome reported to the scheduler
+        if self.scheduler is not None:
+            with METRICS.timer('pacing_wait'):
+                self.scheduler.wait(url)
+        started = time.time()
+        try:
+            with METRICS.timer('http_get'):
+                response = self.session.get(url, timeout=self.timeout,
+                                            headers={'User-Agent': random.choice(self.user_agents)})
+        except requests.RequestException as e:
+            logging.info(f"HTTP fetch failed for {url}: {e}")
+            self._record('http', started, ok=False)
+            self._report_to_scheduler(url, started, rate_scheduler.TIMEOUT)
+            return None, rate_scheduler.TIMEOUT
+
+        if response.status_code in (429, 503) or is_blocked_page(response.text):
+            outcome = rate_scheduler.BLOCKED
+        else:
+            outcome = rate_scheduler.OK
+        self._report_to_scheduler(url, started, outcome)
+        ok = response.status_code == 200 and self._has_element(response.text, ready_selector)
+        self._record('http', started, ok)
+        return (response.text if ok else None), outcome
+
+    def fetch_selenium(self, url, ready_selector, wait_seconds=20):
+        if self._driver is None and self.driver_factory is None:
+            return None
+        if self.scheduler is not None:
+            with METRICS.timer('pacing_wait'):
+                self.scheduler.wait(url)
+        with self._driver_lock:
+            if self._driver is None:
+                self._driver = self.driver_factory()
+            started = time.time()
+            with METRICS.timer('driver_get'):
+                self._driver.get(url)
+            try:
+                with METRICS.timer('webdriver_wait'):
+                    WebDriverWait(self._driver, wait_seconds).until(EC.presence_of_element_located((By.CSS_SELECTOR, ready_selector)))
+            except TimeoutException:
+                print(f"TimeoutException: Could not find {ready_selector} on {url}")
+                self._record('selenium', started, ok=False)
+                blocked = is_blocked_page(self._driver.page_source)
+                self._report_to_scheduler(url, started, rate_scheduler.BLOCKED if blocked else rate_scheduler.TIMEOUT)
+                return None
+            page_source = self._driver.page_source
+            self._record('selenium', started, ok=True)
+            self._report_to_scheduler(url, started, rate_scheduler.OK)
+            return page_source
+
+    def fetch(self, url, ready_selector):
+        url = self.absolute(url)
+        page_source, outcome = self.fetch_http(url, ready_selector)
+        if page_source is None and outcome == rate_scheduler.BLOCKED:
+            # The browser would hit the same throttled host at once
+            logging.info(f"Blocked or throttled on {url}; not falling back to Selenium")
+            METRICS.count('blocked_fetches')
+        elif page_source is None:
+            logging.info(f"Falling back to Selenium for {url}")
+            METRICS.count('selenium_fallbacks')
+            page_source = self.fetch_selenium(url, ready_selector)
+        return page_source
+
+    def report(self):
+        for backend, stats in self.stats.items():
+            if not stats.fetches:
+                continue
+            print(f"{backend}: {stats.fetches} fetches ({stats.failures} incomplete), "
+                  f"{stats.fetches_per_second():.2f} fetches/s, "
+                  f"{stats.busy_seconds / stats.fetches:.2f}s average latency")
+
+    def close(self):
+        self.session.close()
+        if self._driver is not None and self._owns_driver:
+            self._driver.quit()
+            self._driver = None
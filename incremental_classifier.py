@@ -0,0 +1,170 @@
+import os
+import time
+import sqlite3
+import argparse
+
+import joblib
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import MultinomialNB
+
+from text_preprocessing import tokenize, dtm_terms
+
+
+CLASSES = np.array(['Negative', 'Neutral', 'Positive'])
+
+# Stateless: the same text always hashes to the same columns, so nothing is refitted
+# when new reviews arrive. alternate_sign=False keeps counts non-negative for Naive Bayes.
+N_FEATURES = 2 ** 20
+
+
+def review_terms(text):
+    return dtm_terms(tokenize(text))
+
+
+def make_vectorizer():
+    return HashingVectorizer(analyzer=review_terms, n_features=N_FEATURES, alternate_sign=False, norm='l2')
+
+
+def make_model(kind):
+    if kind == 'nb':
+        return MultinomialNB()
+    return SGDClassifier(loss='log_loss', alpha=1e-5, random_state=0)
+
+
+class TrainingLog:
+    """SQLite set of review IDs the model has already been trained on."""
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS trained (review_id TEXT PRIMARY KEY)")
+        self.connection.commit()
+
+    def new_ids(self, review_ids):
+        review_ids = list(review_ids)
+        known = set()
+        for start in range(0, len(review_ids), 900):
+            batch = review_ids[start:start + 900]
+            rows = self.connection.execute(f"SELECT review_id FROM trained WHERE review_id IN ({', '.join('?' * len(batch))})", batch)
+            known.update(row[0] for row in rows)
+        return [review_id not in known for review_id in review_ids]
+
+    def record(self, review_ids):
+        self.connection.executemany("INSERT OR IGNORE INTO trained (review_id) VALUES (?)", [(review_id,) for review_id in review_ids])
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+def load_checkpoint(path, kind='sgd'):
+    if os.path.exists(path):
+        return joblib.load(path)
+    return {'model': make_model(kind), 'class_counts': np.zeros(len(CLASSES)), 'batches': 0, 'reviews': 0}
+
+
+def save_checkpoint(checkpoint, path):
+    # Write to a temporary file and rename, so a crash never leaves a half-written model
+    temporary_path = f"{path}.tmp"
+    joblib.dump(checkpoint, temporary_path)
+    os.replace(temporary_path, path)
+
+
+def balanced_weights(class_counts, labels):
+    # Running equivalent of class_weight='balanced' (partial_fit cannot take it directly)
+    counts = np.maximum(class_counts, 1)
+    weights = counts.sum() / (len(CLASSES) * counts)
+    return weights[np.searchsorted(CLASSES, labels)]
+
+
+def iter_labeled_batches(path, text_column, label_column, id_column, batch_size):
+    # Read only the needed columns, batch_size rows at a time, from a CSV or a Parquet dataset
+    columns = [id_column, text_column, label_column]
+    if os.path.isdir(path):
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=batch_size)
+
+
+def near_duplicate_ids(clusters_path, id_column='Customer_i_Unique_ID'):
+    # Reviews that are not the representative of their cluster in a near_duplicates.py output
+    duplicates = set()
+    for chunk in pd.read_csv(clusters_path, usecols=[id_column, 'is_representative'], chunksize=500000):
+        duplicates.update(chunk.loc[~chunk['is_representative'].astype(bool), id_column])
+    return duplicates
+
+
+def train_incremental(path, model_path='sentiment_model.joblib', kind='sgd', text_column='Customer_i_Comment',
+                      label_column='Sentiment', id_column='Customer_i_Unique_ID', batch_size=5000, clusters_path=None):
+    """Update the checkpointed model with labeled reviews it has not been trained on yet.
+
+    Each mini-batch is first scored with the current model (so the running accuracy is
+    measured on unseen reviews), then used for one partial_fit step. The model is
+    checkpointed after every batch and the batch's review IDs are logged only afterwards.
+    With clusters_path, only one review per near-duplicate cluster is trained on.
+    """
+    skipped_ids = near_duplicate_ids(clusters_path, id_column) if clusters_path else set()
+    checkpoint = load_checkpoint(model_path, kind)
+    model = checkpoint['model']
+    vectorizer = make_vectorizer()
+    log = TrainingLog(f"{model_path}.trained.db")
+
+    started = time.time()
+    trained = 0
+    correct = 0
+    evaluated = 0
+    for batch in iter_labeled_batches(path, text_column, label_column, id_column, batch_size):
+        batch = batch.dropna(subset=[id_column, label_column])
+        batch = batch[batch[label_column].isin(CLASSES)]
+        if skipped_ids:
+            batch = batch[~batch[id_column].isin(skipped_ids)]
+        batch = batch[log.new_ids(batch[id_column])]
+        if batch.empty:
+            continue
+
+        X = vectorizer.transform(batch[text_column].fillna('').astype(str))
+        y = batch[label_column].to_numpy()
+        if checkpoint['batches']:
+            correct += int((model.predict(X) == y).sum())
+            evaluated += len(y)
+
+        checkpoint['class_counts'] += (y[:, None] == CLASSES).sum(axis=0)
+        model.partial_fit(X, y, classes=CLASSES, sample_weight=balanced_weights(checkpoint['class_counts'], y))
+        checkpoint['batches'] += 1
+        checkpoint['reviews'] += len(y)
+        save_checkpoint(checkpoint, model_path)
+        log.record(batch[id_column])
+        trained += len(y)
+    log.close()
+
+    elapsed = time.time() - started
+    accuracy = f"{correct / evaluated:.3f}" if evaluated else "n/a"
+    print(f"Trained on {trained} new reviews in {elapsed:.1f}s ({trained / elapsed if elapsed else 0.0:.0f} reviews/s); "
+          f"progressive accuracy {accuracy}; model has seen {checkpoint['reviews']} reviews in {checkpoint['batches']} batches")
+    return checkpoint
+
+
+def predict(texts, model_path='sentiment_model.joblib'):
+    model = joblib.load(model_path)['model']
+    return model.predict(make_vectorizer().transform([str(text) for text in texts]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Incrementally train the review sentiment classifier on new labeled reviews.")
+    parser.add_argument('input', help="Labeled reviews: a CSV or a Parquet dataset directory")
+    parser.add_argument('--model-path', default='sentiment_model.joblib')
+    parser.add_argument('--model', choices=['sgd', 'nb'], default='sgd', help="Logistic-loss SGD or multinomial Naive Bayes (new models only)")
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--text-column', default='Customer_i_Comment')
+    parser.add_argument('--label-column', default='Sentiment', help="e.g. the label written by sentiment_scoring.py")
+    parser.add_argument('--id-column', default='Customer_i_Unique_ID')
+    parser.add_argument('--clusters', default=None, help="review_clusters.csv from near_duplicates.py: train on one review per cluster")
+    args = parser.parse_args()
+
+    train_incremental(args.input, args.model_path, args.model, args.text_column, args.label_column, args.id_column,
+                      args.batch_size, args.clusters)
@@ -0,0 +1,173 @@
+import os
+import time
+import json
+import hashlib
+import argparse
+from itertools import product
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.model_selection import StratifiedKFold
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import MultinomialNB
+
+from text_preprocessing import tokenize_corpus, document_term_matrix
+
+try:
+    import psutil
+except ImportError:  # Jobs then report no memory figure
+    psutil = None
+
+
+# The four models compared in Internship_Project.ipynb, each with a small grid around its defaults
+MODELS = {
+    'Random Forest': (RandomForestClassifier, {'n_estimators': [100], 'random_state': [0]}),
+    'KNN': (KNeighborsClassifier, {'n_neighbors': [5, 15]}),
+    'Logistic Regression': (LogisticRegression, {'C': [0.1, 1.0, 10.0], 'max_iter': [1000], 'random_state': [0]}),
+    'Naive Bayes': (MultinomialNB, {'alpha': [0.1, 1.0]}),
+}
+
+# Features loaded once per worker process by init_worker
+_features = None
+
+
+def parameter_grid(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in product(*(grid[name] for name in names))]
+
+
+def feature_cache_key(texts, labels):
+    digest = hashlib.sha1()
+    for text, label in zip(texts, labels):
+        digest.update(f"{text}\x00{label}\x01".encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def build_feature_cache(texts, labels, cache_dir='feature_cache', workers=None):
+    """Tokenize and vectorize once; store the CSR arrays as .npy files that can be memory-mapped.
+
+    The cache directory is keyed by a hash of the texts and labels, so an unchanged corpus
+    is never re-vectorized. Returns the directory holding the cached features.
+    """
+    texts = [str(text) for text in texts]
+    labels = np.asarray(labels)
+    directory = os.path.join(cache_dir, feature_cache_key(texts, labels))
+    if os.path.exists(os.path.join(directory, 'meta.json')):
+        print(f"Using cached features in {directory}")
+        return directory
+
+    started = time.time()
+    X, vectorizer = document_term_matrix(tokenize_corpus(texts, workers=workers))
+    X = X.tocsr().astype(np.float32)
+    os.makedirs(directory, exist_ok=True)
+    for name in ('data', 'indices', 'indptr'):
+        np.save(os.path.join(directory, f'{name}.npy'), getattr(X, name))
+    np.save(os.path.join(directory, 'labels.npy'), labels.astype(str))
+    # meta.json is written last and marks the cache as complete
+    with open(os.path.join(directory, 'meta.json'), 'w') as file:
+        json.dump({'shape': X.shape, 'vocabulary_size': len(vectorizer.vocabulary_)}, file)
+    print(f"Built {X.shape[0]} x {X.shape[1]} feature matrix in {time.time() - started:.1f}s -> {directory}")
+    return directory
+
+
+def load_features(directory):
+    # mmap_mode='r' shares the arrays through the page cache instead of copying them per process
+    with open(os.path.join(directory, 'meta.json')) as file:
+        shape = tuple(json.load(file)['shape'])
+    arrays = [np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r') for name in ('data', 'indices', 'indptr')]
+    X = sparse.csr_matrix(tuple(arrays), shape=shape, copy=False)
+    y = np.load(os.path.join(directory, 'labels.npy'))
+    return X, y
+
+
+def init_worker(directory):
+    global _features
+    _features = load_features(directory)
+
+
+def anonymous_rss():
+    # Resident memory not backed by a file, so the memory-mapped features are left out
+    if psutil is None:
+        return None
+    info = psutil.Process().memory_info()
+    return info.rss - getattr(info, 'shared', 0)
+
+
+def run_job(job):
+    # Runs in a worker: fit one (model, params, fold) and score it on the held-out fold
+    model_name, params, fold, train_index, test_index = job
+    X, y = _features
+    model_class = MODELS[model_name][0]
+    rss_before = anonymous_rss()
+    started = time.time()
+    model = model_class(**params)
+    model.fit(X[train_index], y[train_index])
+    accuracy = float((model.predict(X[test_index]) == y[test_index]).mean())
+    seconds = time.time() - started
+    # Measured while the fitted model is still alive, native allocations included
+    rss_after = anonymous_rss()
+    return {
+        'model': model_name,
+        'params': json.dumps(params, sort_keys=True),
+        'fold': fold,
+        'accuracy': accuracy,
+        'seconds': seconds,
+        'rss_growth_mb': (rss_after - rss_before) / 2 ** 20 if rss_before is not None else None,
+    }
+
+
+def make_jobs(y, models, folds):
+    # StratifiedKFold without shuffling, as cross_val_score(model, X, y, cv=5) uses for classifiers
+    splits = list(StratifiedKFold(n_splits=folds).split(np.zeros(len(y)), y))
+    jobs = []
+    for model_name in models:
+        for params in parameter_grid(MODELS[model_name][1]):
+            for fold, (train_index, test_index) in enumerate(splits):
+                jobs.append((model_name, params, fold, train_index, test_index))
+    # Slowest models first so they do not end up as stragglers
+    return sorted(jobs, key=lambda job: job[0] != 'Random Forest')
+
+
+def run_model_selection(directory, models=None, folds=5, workers=None):
+    """Fan (model x hyperparameters x fold) jobs out over a process pool; returns the results table."""
+    models = models or list(MODELS)
+    _, y = load_features(directory)
+    jobs = make_jobs(y, models, folds)
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(directory,)) as executor:
+        results = pd.DataFrame(list(executor.map(run_job, jobs)))
+    elapsed = time.time() - started
+    print(f"Ran {len(jobs)} jobs in {elapsed:.1f}s wall time ({results['seconds'].sum():.1f}s of fitting, "
+          f"{results['seconds'].sum() / elapsed:.1f}x parallel speedup)")
+    return results
+
+
+def summarize(results):
+    summary = results.groupby(['model', 'params']).agg(
+        accuracy=('accuracy', 'mean'), accuracy_std=('accuracy', 'std'),
+        seconds=('seconds', 'sum'), rss_growth_mb=('rss_growth_mb', 'max'),
+    )
+    return summary.sort_values('accuracy', ascending=False).reset_index()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cross-validate the sentiment models in parallel on cached features.")
+    parser.add_argument('input', help="CSV with review text and sentiment label columns")
+    parser.add_argument('--text-column', default='Customer_i_Comment')
+    parser.add_argument('--label-column', default='Sentiment')
+    parser.add_argument('--models', nargs='*', choices=list(MODELS), default=None)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=None, help="Job processes (default: all cores)")
+    parser.add_argument('--cache-dir', default='feature_cache')
+    parser.add_argument('--output', default='model_selection_results.csv', help="Per-job results table")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input, usecols=[args.text_column, args.label_column]).dropna(subset=[args.label_column])
+    directory = build_feature_cache(df[args.text_column].fillna(''), df[args.label_column], args.cache_dir, args.workers)
+    results = run_model_selection(directory, args.models, args.folds, args.workers)
+    results.to_csv(args.output, index=False)
+    print(summarize(results).to_string(index=False))
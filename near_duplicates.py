@@ -0,0 +1,252 @@
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow.dataset as ds
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+
+# Character 5-grams of the normalized text; short comments ("Bueno") become a single shingle
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+# 32 bands of 4 rows: pairs above ~0.6 Jaccard almost always share a band, and every
+# candidate is then checked against THRESHOLD on the full signature
+BANDS = 32
+THRESHOLD = 0.8
+
+NON_WORD_PATTERN = r'\W+'
+
+
+def normalize_comments(texts):
+    # Case, punctuation and spacing differences alone never make two reviews distinct
+    texts = pd.Series(texts).fillna('').astype(str)
+    return texts.str.lower().str.replace(NON_WORD_PATTERN, ' ', regex=True).str.strip()
+
+
+def shingle_hashes(texts, k=SHINGLE_SIZE):
+    """All k-byte shingles of every text as uint64 values, plus each text's shingle count.
+
+    The texts are joined into one byte array and shingled in a single vectorized pass;
+    texts shorter than k are padded so they still get one shingle.
+    """
+    encoded = [text.encode('utf-8').ljust(k) for text in texts]
+    lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    counts = lengths - k + 1
+    offsets = np.cumsum(lengths) - lengths
+    first_shingle = np.cumsum(counts) - counts
+    starts = np.repeat(offsets, counts) + np.arange(counts.sum()) - np.repeat(first_shingle, counts)
+    shingles = np.zeros(len(starts), dtype=np.uint64)
+    for position in range(k):
+        shingles = (shingles << np.uint64(8)) | data[starts + position]
+    return shingles, counts
+
+
+def permutations(num_perm=NUM_PERM, seed=1):
+    # Multiply-shift hash functions; fixed by the seed so signatures are comparable across runs
+    rng = np.random.RandomState(seed)
+    multipliers = rng.randint(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    increments = rng.randint(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    return multipliers, increments
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, k=SHINGLE_SIZE, seed=1, batch_size=2000, perm_block=16):
+    """MinHash signatures (len(texts) x num_perm, uint32) of already-normalized texts."""
+    multipliers, increments = permutations(num_perm, seed)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for start in range(0, len(texts), batch_size):
+        shingles, counts = shingle_hashes(texts[start:start + batch_size], k)
+        text_starts = np.cumsum(counts) - counts
+        for block in range(0, num_perm, perm_block):
+            columns = slice(block, block + perm_block)
+            # Permutations x shingles, so each text's minimum is taken over contiguous memory
+            hashed = (multipliers[columns, None] * shingles[None, :] + increments[columns, None]) >> np.uint64(32)
+            signatures[start:start + len(counts), columns] = np.minimum.reduceat(hashed, text_starts, axis=1).T
+    return signatures
+
+
+def band_hashes(signatures, bands=BANDS):
+    rows = signatures.shape[1] // bands
+    hashes = np.empty((len(signatures), bands), dtype=np.uint64)
+    for band in range(bands):
+        combined = np.zeros(len(signatures), dtype=np.uint64)
+        for column in range(band * rows, (band + 1) * rows):
+            combined = combined * np.uint64(0x100000001B3) ^ signatures[:, column].astype(np.uint64)
+        hashes[:, band] = combined
+    return hashes
+
+
+class NearDuplicateIndex:
+    """Streams review comments in, then clusters exact and near-duplicate texts.
+
+    Exact duplicates (after normalization) share one entry, found by a 64-bit hash of
+    the text. Each distinct text's MinHash signature and LSH band hashes are appended to
+    files in work_dir rather than held in memory, so memory stays proportional to the
+    number of rows, not to the signatures. Call add() per chunk, then clusters().
+    """
+
+    def __init__(self, work_dir=None, num_perm=NUM_PERM, bands=BANDS, threshold=THRESHOLD):
+        self.num_perm = num_perm
+        self.bands = bands
+        self.threshold = threshold
+        # Only a directory made here is removed by close(); in a given one, only our files are
+        self.owns_work_dir = work_dir is None
+        self.work_dir = work_dir or tempfile.mkdtemp(prefix='near_duplicates-')
+        os.makedirs(self.work_dir, exist_ok=True)
+        self.distinct_ids = {}
+        self.signature_file = open(os.path.join(self.work_dir, 'signatures.u32'), 'wb')
+        self.band_files = [open(os.path.join(self.work_dir, f'band-{band}.u64'), 'wb') for band in range(bands)]
+
+    def add(self, texts):
+        # Returns the distinct-text id of every input text, in input order
+        normalized = normalize_comments(texts)
+        keys = pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+        ids = np.empty(len(keys), dtype=np.int64)
+        new_texts = []
+        for row, (key, text) in enumerate(zip(keys.tolist(), normalized.tolist())):
+            distinct_id = self.distinct_ids.get(key)
+            if distinct_id is None:
+                distinct_id = self.distinct_ids[key] = len(self.distinct_ids)
+                new_texts.append(text)
+            ids[row] = distinct_id
+
+        if new_texts:
+            signatures = minhash_signatures(new_texts, self.num_perm)
+            self.signature_file.write(signatures.tobytes())
+            for band, hashes in enumerate(band_hashes(signatures, self.bands).T):
+                self.band_files[band].write(np.ascontiguousarray(hashes).tobytes())
+        return ids
+
+    def clusters(self):
+        """Cluster id of every distinct text: the smallest distinct id in its cluster.
+
+        Band by band, texts with equal band hashes are candidates; each is checked against
+        the first text of its bucket on the full signature, and accepted pairs are merged
+        with connected_components. Only one band's hashes are in memory at a time.
+        """
+        for file in [self.signature_file] + self.band_files:
+            file.flush()
+        count = len(self.distinct_ids)
+        labels = np.arange(count)
+        if count < 2:
+            return labels
+        signatures = np.memmap(self.signature_file.name, dtype=np.uint32, mode='r', shape=(count, self.num_perm))
+
+        for band_file in self.band_files:
+            hashes = np.fromfile(band_file.name, dtype=np.uint64)
+            order = np.argsort(hashes, kind='stable')
+            sorted_hashes = hashes[order]
+            starts_bucket = np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]]
+            heads = order[np.maximum.accumulate(np.where(starts_bucket, np.arange(count), 0))]
+            members = order[~starts_bucket]
+            heads = heads[~starts_bucket]
+            # Pairs already in one cluster need no check
+            open_pairs = labels[heads] != labels[members]
+            heads, members = heads[open_pairs], members[open_pairs]
+            if not len(heads):
+                continue
+
+            similar = np.zeros(len(heads), dtype=bool)
+            for start in range(0, len(heads), 100000):
+                block = slice(start, start + 100000)
+                agreement = (signatures[heads[block]] == signatures[members[block]]).mean(axis=1)
+                similar[block] = agreement >= self.threshold
+            heads, members = heads[similar], members[similar]
+            if not len(heads):
+                continue
+
+            graph = sparse.coo_matrix((np.ones(len(heads), dtype=np.int8), (labels[heads], labels[members])), shape=(count, count))
+            _, components = connected_components(graph, directed=False)
+            labels = components[labels]
+
+        # Name each cluster after its smallest member, so ids follow first appearance
+        smallest = np.full(labels.max() + 1, count, dtype=np.int64)
+        np.minimum.at(smallest, labels, np.arange(count))
+        return smallest[labels]
+
+    def close(self):
+        files = [self.signature_file] + self.band_files
+        for file in files:
+            file.close()
+        if self.owns_work_dir:
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+        else:
+            for file in files:
+                if os.path.exists(file.name):
+                    os.remove(file.name)
+
+
+def assign_clusters(texts, threshold=THRESHOLD, chunk_size=100000):
+    """Cluster columns for an in-memory column of review texts, aligned with its index.
+
+    cluster_id is shared by exact and near-duplicate texts, cluster_size counts the rows
+    in the cluster and is_representative marks the first row of each cluster, the one
+    to score or train on.
+    """
+    texts = pd.Series(texts)
+    index = NearDuplicateIndex(threshold=threshold)
+    try:
+        distinct_ids = np.concatenate([index.add(texts.iloc[start:start + chunk_size])
+                                       for start in range(0, len(texts), chunk_size)] or [np.empty(0, dtype=np.int64)])
+        cluster_ids = index.clusters()[distinct_ids]
+    finally:
+        index.close()
+    return cluster_frame(cluster_ids, texts.index)
+
+
+def cluster_frame(cluster_ids, index=None):
+    cluster_ids = pd.Series(cluster_ids, index=index)
+    return pd.DataFrame({
+        'cluster_id': cluster_ids,
+        'cluster_size': cluster_ids.map(cluster_ids.value_counts()),
+        'is_representative': ~cluster_ids.duplicated(),
+    })
+
+
+def iter_text_batches(path, columns, batch_size):
+    # CSV chunks or Parquet dataset batches with only the needed columns
+    if os.path.isdir(path):
+        dataset = ds.dataset(path, format='parquet', partitioning='hive')
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, usecols=columns, chunksize=batch_size)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cluster exact and near-duplicate review comments with MinHash/LSH.")
+    parser.add_argument('input', help="Reviews: a CSV such as formatted_customer_data.csv or a Parquet dataset directory")
+    parser.add_argument('--column', default='Customer_i_Comment')
+    parser.add_argument('--id-column', default='Customer_i_Unique_ID')
+    parser.add_argument('--output', default='review_clusters.csv', help="review ID, cluster_id, cluster_size, is_representative")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Estimated Jaccard similarity for a near duplicate")
+    parser.add_argument('--batch-size', type=int, default=100000)
+    parser.add_argument('--work-dir', default=None, help="Where signatures are spilled (default: a temporary directory, removed afterwards; in a given directory only the spill files are removed)")
+    args = parser.parse_args()
+
+    started = time.time()
+    index = NearDuplicateIndex(args.work_dir, threshold=args.threshold)
+    review_ids = []
+    distinct_ids = []
+    try:
+        for batch in iter_text_batches(args.input, [args.id_column, args.column], args.batch_size):
+            review_ids.append(batch[args.id_column].to_numpy())
+            distinct_ids.append(index.add(batch[args.column]))
+        rows = sum(len(ids) for ids in distinct_ids)
+        distinct = len(index.distinct_ids)
+        cluster_ids = index.clusters()[np.concatenate(distinct_ids or [np.empty(0, dtype=np.int64)])]
+    finally:
+        index.close()
+
+    # An empty input still gets a header-only CSV
+    clusters = cluster_frame(cluster_ids)
+    clusters.insert(0, args.id_column, np.concatenate(review_ids) if review_ids else np.empty(0, dtype=object))
+    clusters.to_csv(args.output, index=False)
+    elapsed = time.time() - started
+    print(f"{rows} reviews, {distinct} distinct texts, {clusters['cluster_id'].nunique()} clusters "
+          f"({clusters['is_representative'].sum() / rows if rows else 0:.1%} of reviews left to process) in {elapsed:.1f}s")
@@ -0,0 +1,99 @@
+import os
+import gzip
+import json
+import time
+import logging
+import threading
+
+
+# Segments are rotated once they hold this many bytes of (uncompressed) records
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+
+
+class PageArchive:
+    """Append-only archive of raw pages, stored as gzip-compressed JSON-lines segments.
+
+    Every record holds the ASIN, the page type ('product', 'reviews', 'reviews-<n>' or
+    'search_card'), the fetch time and the raw HTML. A 'search_card' record holds the
+    JSON of the card fields a product was built from instead of HTML. Segments are never
+    rewritten: a writer only appends to its current segment and starts a new file once
+    it is full.
+    """
+
+    def __init__(self, directory, writer_id=0, segment_size=DEFAULT_SEGMENT_SIZE):
+        self.directory = directory
+        self.writer_id = writer_id
+        self.segment_size = segment_size
+        self._file = None
+        self._segment_bytes = 0
+        self._sequence = 0
+        self._run_id = time.strftime('%Y%m%dT%H%M%S')
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_segment(self):
+        self._sequence += 1
+        name = f"segment-{self._run_id}-w{self.writer_id}-{self._sequence:05d}.jsonl.gz"
+        self._file = gzip.open(os.path.join(self.directory, name), 'ab')
+        self._segment_bytes = 0
+
+    def append(self, asin, page_type, html_content, url=None, category=None, fetched_at=None):
+        record = {
+            'asin': asin,
+            'page_type': page_type,
+            'fetched_at': fetched_at if fetched_at is not None else time.time(),
+            'url': url,
+            'category': category,
+            'html': html_content,
+        }
+        line = (json.dumps(record) + '\n').encode('utf-8')
+        with self._lock:
+            if self._file is None or self._segment_bytes >= self.segment_size:
+                self._close_segment()
+                self._open_segment()
+            self._file.write(line)
+            # Sync-flush so a crash only loses the page being written
+            self._file.flush()
+            self._segment_bytes += len(line)
+
+    def _close_segment(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def list_segments(directory):
+    return sorted(
+        os.path.join(directory, name)
+        for name in os.listdir(directory)
+        if name.startswith('segment-') and name.endswith('.jsonl.gz')
+    )
+
+
+def iter_segment(path):
+    # A segment left behind by a crashed writer ends in a truncated gzip stream;
+    # keep every complete record before the cut.
+    with gzip.open(path, 'rb') as file:
+        try:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    logging.warning(f"Skipping truncated record in {path}")
+        except (EOFError, OSError) as e:
+            logging.warning(f"Segment {path} ends early: {e}")
+
+
+def iter_archive(directory):
+    for path in list_segments(directory):
+        yield from iter_segment(path)
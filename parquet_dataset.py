@@ -0,0 +1,133 @@
+import os
+import time
+import uuid
+import argparse
+from datetime import date
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+
+# Hive-style directories: ROOT/category=Laptops/scrape_date=2024-01-31/part-....parquet
+PARTITION_COLUMNS = ['category', 'scrape_date']
+
+ARROW_TYPES = {
+    'text': pa.string(),
+    'float': pa.float64(),
+    'int': pa.int64(),
+    'date': pa.date32(),
+}
+
+
+def arrow_schema(column_types, dictionary_columns=()):
+    # A fixed schema keeps every chunk's files compatible, even when a chunk has a column
+    # that is entirely missing (which Arrow would otherwise infer as the null type)
+    fields = []
+    for name, kind in column_types.items():
+        arrow_type = ARROW_TYPES[kind]
+        if name in dictionary_columns:
+            arrow_type = pa.dictionary(pa.int32(), arrow_type)
+        fields.append(pa.field(name, arrow_type))
+    return pa.schema(fields)
+
+
+def to_arrow_table(df, column_types, dictionary_columns=()):
+    df = df[list(column_types)].copy()
+    for name, kind in column_types.items():
+        if kind == 'date':
+            df[name] = pd.to_datetime(df[name], errors='coerce').dt.date
+        elif kind == 'text':
+            df[name] = df[name].astype(object).where(df[name].notna(), None)
+    return pa.Table.from_pandas(df, schema=arrow_schema(column_types, dictionary_columns), preserve_index=False)
+
+
+def write_partitioned(df, root, column_types, dictionary_columns=(), scrape_date_column=None, written=None):
+    """Write df to the Parquet dataset at root, partitioned by category and scrape date.
+
+    column_types maps each column to 'text', 'float', 'int' or 'date'. The scrape date
+    comes from scrape_date_column where it is set and is today's date otherwise.
+    Partitions df does not touch are kept. A partition df does touch is replaced, unless
+    it is already in written: pass the same set to every call of a chunked load so later
+    chunks add files next to the earlier ones instead of deleting them.
+    """
+    if df.empty:
+        return
+    if written is None:
+        written = set()
+    df = df.copy()
+    today = date.today().isoformat()
+    if scrape_date_column is not None:
+        scrape_dates = pd.to_datetime(df[scrape_date_column], errors='coerce').dt.strftime('%Y-%m-%d')
+        df['scrape_date'] = scrape_dates.fillna(today)
+    else:
+        df['scrape_date'] = today
+    df['category'] = df['category'].fillna('Unavailable')
+
+    column_types = {'category': 'text', 'scrape_date': 'text',
+                    **{name: kind for name, kind in column_types.items() if name not in PARTITION_COLUMNS}}
+    partitions = pd.Series(list(zip(df['category'], df['scrape_date'])), index=df.index)
+    seen_before = partitions.isin(written)
+    basename_template = f"part-{uuid.uuid4().hex}-{{i}}.parquet"
+    for rows, behavior in ((~seen_before, 'delete_matching'), (seen_before, 'overwrite_or_ignore')):
+        if not rows.any():
+            continue
+        pq.write_to_dataset(
+            to_arrow_table(df[rows], column_types, dictionary_columns),
+            root,
+            partition_cols=PARTITION_COLUMNS,
+            basename_template=basename_template,
+            existing_data_behavior=behavior,
+            compression='zstd',
+            use_dictionary=True,
+        )
+    written.update(partitions)
+
+
+def read_partitioned(root, columns=None, categories=None, since=None):
+    """Read a dataset written by write_partitioned, touching only what is asked for.
+
+    Only the listed columns are read. categories and since (an ISO scrape date) become
+    filters on the partition directories, so other partitions are never opened.
+    """
+    filters = []
+    if categories is not None:
+        filters.append(('category', 'in', list(categories)))
+    if since is not None:
+        filters.append(('scrape_date', '>=', since))
+    return pd.read_parquet(root, engine='pyarrow', columns=columns, filters=filters or None)
+
+
+def infer_column_types(df, date_columns=()):
+    column_types = {}
+    for name in df.columns:
+        if name in date_columns:
+            column_types[name] = 'date'
+        elif pd.api.types.is_integer_dtype(df[name]):
+            column_types[name] = 'int'
+        elif pd.api.types.is_float_dtype(df[name]):
+            column_types[name] = 'float'
+        else:
+            column_types[name] = 'text'
+    return column_types
+
+
+def directory_size(root):
+    return sum(os.path.getsize(os.path.join(subdir, file)) for subdir, _, files in os.walk(root) for file in files)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Convert a CSV export to a Parquet dataset partitioned by category and scrape date.")
+    parser.add_argument('csv_path', help="e.g. formatted_customer_data.csv")
+    parser.add_argument('output_dir')
+    parser.add_argument('--date-columns', nargs='*', default=[], help="Columns stored as dates")
+    parser.add_argument('--dictionary-columns', nargs='*', default=[], help="Repetitive text columns read back as categoricals")
+    parser.add_argument('--scrape-date-column', default=None, help="Column holding each row's scrape date (default: today)")
+    args = parser.parse_args()
+
+    started = time.time()
+    df = pd.read_csv(args.csv_path)
+    column_types = infer_column_types(df, args.date_columns)
+    write_partitioned(df, args.output_dir, column_types, args.dictionary_columns, args.scrape_date_column)
+    print(f"Wrote {len(df)} rows to {args.output_dir} in {time.time() - started:.2f}s "
+          f"({os.path.getsize(args.csv_path) / 1024:.0f} KB CSV -> {directory_size(args.output_dir) / 1024:.0f} KB Parquet)")
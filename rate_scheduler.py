@@ -0,0 +1,131 @@
+import time
+import threading
+from urllib.parse import urlsplit
+
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
+
+
+# Outcomes reported back to the scheduler after every page load
+OK = 'ok'
+TIMEOUT = 'timeout'
+BLOCKED = 'blocked'
+
+# Text Amazon serves instead of the requested page when it throttles a client
+BLOCK_MARKERS = (
+    'Enter the characters you see below',
+    '/errors/validateCaptcha',
+    'api-services-support@amazon.com',
+    'To discuss automated access to Amazon data',
+)
+
+
+def is_blocked_page(page_source):
+    return any(marker in page_source for marker in BLOCK_MARKERS)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=1.0):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now):
+        # No tokens accrue while the host is paused
+        accrued_since = max(self.updated, self.paused_until)
+        if now > accrued_since:
+            self.tokens = min(self.burst, self.tokens + (now - accrued_since) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        # Take one token and return how long the caller must wait before using it. Callers
+        # queued behind a pause are spaced at the rate after it ends, rather than all
+        # released the moment it does
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1.0
+        deficit = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(self.paused_until - now, 0.0) + deficit
+
+
+class AdaptiveRateScheduler:
+    """Per-host token buckets whose rate follows what the site tolerates.
+
+    Successful fast responses raise the rate additively; slow responses, timeouts and
+    block/captcha pages cut it multiplicatively (AIMD), and a block also pauses the host
+    for ``block_cooldown`` seconds. Rates are in requests per second.
+    """
+
+    def __init__(self, initial_rate=0.5, min_rate=0.05, max_rate=4.0, burst=2.0,
+                 target_latency=3.0, increase=0.05, block_cooldown=60.0):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.burst = burst
+        self.target_latency = target_latency
+        self.increase = increase
+        self.block_cooldown = block_cooldown
+        self.buckets = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, host):
+        bucket = self.buckets.get(host)
+        if bucket is None:
+            bucket = self.buckets[host] = TokenBucket(self.initial_rate, self.burst)
+            self.counts[host] = {OK: 0, TIMEOUT: 0, BLOCKED: 0}
+        return bucket
+
+    def wait(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            delay = self._bucket(host).reserve()
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def record(self, url, latency, outcome=OK):
+        host = urlsplit(url).netloc
+        with self._lock:
+            bucket = self._bucket(host)
+            self.counts[host][outcome] += 1
+            if outcome == BLOCKED:
+                bucket.rate *= 0.25
+                bucket.paused_until = time.monotonic() + self.block_cooldown
+            elif outcome == TIMEOUT:
+                bucket.rate *= 0.5
+            elif latency > self.target_latency:
+                bucket.rate *= 0.8
+            else:
+                bucket.rate += self.increase
+            bucket.rate = min(self.max_rate, max(self.min_rate, bucket.rate))
+
+    def summary(self):
+        with self._lock:
+            return {host: dict(self.counts[host], rate=round(bucket.rate, 3)) for host, bucket in self.buckets.items()}
+
+
+def wait_for_results(driver, result_selector, timeout=25, poll_frequency=0.25):
+    """Wait until the page has loaded and the number of results stops changing.
+
+    Replaces scroll-and-sleep loops: the page is scrolled once to trigger lazy loading and
+    the wait returns as soon as two consecutive polls see the same non-zero result count.
+    """
+    state = {'count': -1}
+
+    def results_settled(driver):
+        if driver.execute_script("return document.readyState") != 'complete':
+            return False
+        count = driver.execute_script("return document.querySelectorAll(arguments[0]).length", result_selector)
+        settled = count > 0 and count == state['count']
+        state['count'] = count
+        return settled
+
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(results_settled)
+    except TimeoutException:
+        return False
+    return True
@@ -0,0 +1,93 @@
+import os
+import json
+import time
+import argparse
+import traceback
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from page_archive import list_segments, iter_segment
+from scraper_script import parse_product_page, parse_review_page, build_product_details, write_products
+
+
+def parse_record(record):
+    if record['page_type'] == 'product':
+        return parse_product_page(record['html'], record['asin'])
+    if record['page_type'] == 'search_card':
+        return json.loads(record['html'])
+    return parse_review_page(record['html'], record['url'])
+
+
+def reparse_segment(path):
+    # Runs in a worker process: parse every page of one segment, no browser involved
+    parsed = []
+    failures = 0
+    for record in iter_segment(path):
+        if record['page_type'] not in ('product', 'search_card', 'reviews'):
+            # Deep review pages belong to the review stream, not the product records
+            continue
+        try:
+            fields = parse_record(record)
+        except Exception as e:
+            print(f"Error parsing {record['page_type']} page for ASIN {record['asin']}: {e}")
+            traceback.print_exc()
+            failures += 1
+            continue
+        parsed.append((record['asin'], record['page_type'], record['fetched_at'], record['category'], fields))
+    return parsed, failures
+
+
+def reparse_archive(archive_dir, workers=None):
+    segments = list_segments(archive_dir)
+    latest = {}
+    pages = 0
+    failures = 0
+    started = time.time()
+
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for parsed, segment_failures in executor.map(reparse_segment, segments):
+            failures += segment_failures
+            for asin, page_type, fetched_at, category, fields in parsed:
+                pages += 1
+                # Keep only the newest fetch of each (ASIN, page type)
+                key = (asin, page_type)
+                if key not in latest or fetched_at >= latest[key][0]:
+                    latest[key] = (fetched_at, category, fields)
+
+    # Rebuild records the way the crawler does: search card fields first, then the product
+    # page for whatever the card did not show. Products with a complete card (or fields
+    # carried over by the freshness index) never had a product page.
+    products = {}
+    for asin in {asin for asin, page_type in latest if page_type in ('product', 'search_card')}:
+        page = latest.get((asin, 'product'))
+        card = latest.get((asin, 'search_card'))
+        if card is not None and page is not None and card[0] < page[0]:
+            # A later crawl loaded the product page without using this card
+            card = None
+        fetched_at, category, _ = max((record for record in (page, card) if record is not None), key=lambda record: record[0])
+        product_details = build_product_details(asin, category, card[2] if card else {}, page[2] if page else None)
+        product_details['scraped_at'] = datetime.fromtimestamp(fetched_at).isoformat(timespec='seconds')
+        products[asin] = (fetched_at, product_details)
+
+    for (asin, page_type), (_, _, fields) in latest.items():
+        if page_type == 'reviews' and asin in products:
+            products[asin][1].update(fields)
+
+    all_products = [product for _, product in sorted(products.values(), key=lambda item: item[0])]
+
+    elapsed = time.time() - started
+    rate = pages / elapsed if elapsed else 0.0
+    print(f"Re-parsed {pages} pages from {len(segments)} segments in {elapsed:.1f}s "
+          f"({rate:.1f} pages/s, {failures} failures)")
+    return all_products
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Re-parse a raw-HTML crawl archive without a browser.")
+    parser.add_argument('archive_dir', help="Directory written by scraper_script.py --archive-dir")
+    parser.add_argument('--output', default='amazon_data_ext.json', help="A .jsonl path writes one product per line")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: all cores)")
+    args = parser.parse_args()
+
+    all_products = reparse_archive(args.archive_dir, workers=args.workers)
+    write_products(all_products, args.output)
@@ -0,0 +1,128 @@
+import json
+import time
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from http_fetcher import REVIEW_PAGE_READY
+from review_parser import parse_review_list
+from run_metrics import METRICS
+
+
+# Amazon lists ten reviews per review page
+REVIEWS_PER_PAGE = 10
+
+# A review page that fails to load is retried this many times before it is skipped, and
+# paging gives up after this many consecutive skipped pages
+PAGE_RETRIES = 2
+MAX_FAILED_PAGES = 2
+
+
+def review_page_url(asin, page_number):
+    return (f"https://www.amazon.com/product-reviews/{asin}/ref=cm_cr_arp_d_paging_btm_next_{page_number}"
+            f"?ie=UTF8&reviewerType=all_reviews&sortBy=recent&pageNumber={page_number}")
+
+
+def fetch_review_page(fetcher, asin, page_number, archive=None, category=None):
+    # None when the page did not load, as opposed to [] for a page without reviews
+    url = review_page_url(asin, page_number)
+    page_source = fetcher.fetch(url, REVIEW_PAGE_READY)
+    if page_source is None:
+        return None
+    METRICS.page('review_list')
+    if archive is not None:
+        archive.append(asin, f'reviews-{page_number}', page_source, url=url, category=category)
+    with METRICS.timer('parse_review_list'):
+        return parse_review_list(page_source)
+
+
+def collect_reviews(fetcher, asin, max_reviews, concurrency=4, known_review_ids=None, archive=None, category=None):
+    """Collect up to ``max_reviews`` reviews of one product, newest first.
+
+    Review pages are fetched ``concurrency`` at a time. Paging stops early at the last page
+    (fewer than ten reviews) or once a review already in ``known_review_ids`` shows up,
+    since everything after it was collected by an earlier run. A page that does not load
+    is retried, then counted as failed and skipped rather than taken for the last page;
+    paging stops after MAX_FAILED_PAGES failed pages in a row.
+    """
+    known_review_ids = known_review_ids or set()
+    total_pages = math.ceil(max_reviews / REVIEWS_PER_PAGE)
+    reviews = []
+    seen_ids = set()
+    failed_pages = 0
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for first_page in range(1, total_pages + 1, concurrency):
+            page_numbers = range(first_page, min(first_page + concurrency, total_pages + 1))
+            pages = list(executor.map(lambda n: fetch_review_page(fetcher, asin, n, archive, category), page_numbers))
+
+            for page_number, page_reviews in zip(page_numbers, pages):
+                # Retried only once reached, so pages fetched past the last one are never retried
+                for _ in range(PAGE_RETRIES):
+                    if page_reviews is not None:
+                        break
+                    page_reviews = fetch_review_page(fetcher, asin, page_number, archive, category)
+                if page_reviews is None:
+                    METRICS.count('review_pages_failed')
+                    print(f"Review page {page_number} of {asin} failed after {PAGE_RETRIES} retries; skipping it")
+                    failed_pages += 1
+                    if failed_pages >= MAX_FAILED_PAGES:
+                        return reviews
+                    continue
+                failed_pages = 0
+                for review in page_reviews:
+                    if review['ID'] in known_review_ids:
+                        return reviews
+                    if review['ID'] in seen_ids:
+                        continue
+                    seen_ids.add(review['ID'])
+                    reviews.append(review)
+                    if len(reviews) >= max_reviews:
+                        return reviews
+                if len(page_reviews) < REVIEWS_PER_PAGE:
+                    return reviews
+    return reviews
+
+
+def review_rows(product_details, reviews):
+    # One row per review, keyed like the long formatted_customer_data shape
+    return [
+        {
+            'Product_ID': product_details['Product_ID'],
+            'category': product_details.get('category'),
+            'Review_ID': review['ID'],
+            'Star_Rating': review['Star_Rating'],
+            'Comment': review['Comment'],
+            'buying_influence': review['buying_influence'],
+            'Date': review['Date'],
+        }
+        for review in reviews
+    ]
+
+
+class ReviewStreamWriter:
+    """Thread-safe JSON-lines writer for the one-row-per-review stream."""
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self._file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self._lock = threading.Lock()
+        self.reviews = 0
+        self.started = time.time()
+
+    def write(self, rows):
+        if not rows:
+            return
+        lines = ''.join(json.dumps(row) + '\n' for row in rows)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            self.reviews += len(rows)
+
+    def report(self):
+        elapsed = time.time() - self.started
+        rate = self.reviews / elapsed if elapsed else 0.0
+        print(f"Review stream: {self.reviews} reviews written to {self.path} ({rate:.2f} reviews/s)")
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,156 @@
+import re
+import logging
+from datetime import datetime
+
+from lxml import etree, html as lxml_html
+from lxml.cssselect import CSSSelector
+from word2number import w2n
+
+from run_metrics import METRICS
+
+
+# Selectors are compiled to XPath once at import time instead of once per review.
+# They mirror the BeautifulSoup selectors in scraper_script.parse_review_page_bs4.
+REVIEWS = CSSSelector('div[data-hook="review"]')
+REVIEW_STAR_RATING = CSSSelector('i[data-hook="review-star-rating"] span.a-icon-alt')
+REVIEW_TITLE = CSSSelector('a[data-hook="review-title"]')
+REVIEW_ORIGINAL_CONTENT = CSSSelector('span.cr-original-review-content')
+REVIEW_HELPFUL_VOTES = CSSSelector('span[data-hook="helpful-vote-statement"]')
+# '#customer_review-{id} > span' with the review ID bound at call time
+REVIEW_DATE = etree.XPath('descendant::*[@id=$element_id]/span')
+
+VIEWPOINTS = CSSSelector('div[id^="viewpoint-"]')
+VIEWPOINT_NAME = CSSSelector('div.a-profile-content span.a-profile-name')
+VIEWPOINT_COMMENT = etree.XPath('descendant::div[normalize-space(@class)="a-row a-spacing-top-mini"]')
+VIEWPOINT_TITLE = CSSSelector('span[data-hook="review-title"]')
+VIEWPOINT_DATE = CSSSelector('div.a-expander-content.a-expander-partial-collapse-content span.a-size-base.a-color-secondary.review-date')
+VIEWPOINT_STAR_RATING = CSSSelector('i[data-hook="review-star-rating-view-point"] span.a-icon-alt')
+VIEWPOINT_VOTES = {
+    'Top_Positive': CSSSelector('div.a-column.a-span6.view-point-review.positive-review div.a-row.a-spacing-top-small span.a-size-small.a-color-tertiary span.review-votes'),
+    'Critical': CSSSelector('div.a-column.a-span6.view-point-review.critical-review.a-span-last div.a-row.a-spacing-top-small span.a-size-small.a-color-tertiary span.review-votes'),
+}
+
+STARS_PATTERN = re.compile(r'\d+(\.\d+)? out of 5 stars\n')
+POSTED_ON_PATTERN = re.compile(r'on (.+)$')
+LEADING_DIGITS_PATTERN = re.compile(r'\d+')
+
+
+def first(selector, element, **variables):
+    matches = selector(element, **variables)
+    return matches[0] if matches else None
+
+
+def text_of(element):
+    return element.text_content()
+
+
+def parse_review_date(tag, field='Date'):
+    if tag is None:
+        logging.debug("Date tag not found")
+        METRICS.parse_failure(field)
+        return None
+
+    post_time_text = text_of(tag).strip()
+    match = POSTED_ON_PATTERN.search(post_time_text)
+    if not match:
+        logging.debug(f"Date not found in text: {post_time_text}")
+        METRICS.parse_failure(field)
+        return '-'
+
+    date_string = match.group(1)
+    try:
+        return datetime.strptime(date_string, '%B %d, %Y').isoformat()
+    except ValueError as ve:
+        logging.debug(f"Error parsing date string {date_string}: {ve}")
+        METRICS.parse_failure(field)
+        return '-'
+
+
+def extract_customer_review(review):
+    review_id = review.get('id', 'None')
+    fields = {'ID': review_id}
+
+    star_rating_tag = first(REVIEW_STAR_RATING, review)
+    fields['Star_Rating'] = float(text_of(star_rating_tag).split()[0]) if star_rating_tag is not None else 0.0
+
+    comment_title_tag = first(REVIEW_TITLE, review)
+    if comment_title_tag is None:
+        comment_title_tag = first(REVIEW_ORIGINAL_CONTENT, review)
+    comment_title = text_of(comment_title_tag).strip() if comment_title_tag is not None else 'NaN'
+    fields['Comment'] = STARS_PATTERN.sub('', comment_title)
+
+    helpful_vote_tag = first(REVIEW_HELPFUL_VOTES, review)
+    fields['buying_influence'] = w2n.word_to_num(text_of(helpful_vote_tag).split()[0]) if helpful_vote_tag is not None else 0
+
+    fields['Date'] = parse_review_date(first(REVIEW_DATE, review, element_id=f'customer_review-{review_id}'), 'Customer_i_Date')
+    return fields
+
+
+def parse_customer_review(review, index, result):
+    for key, value in extract_customer_review(review).items():
+        result[f'Customer_{index}_{key}'] = value
+
+
+def parse_review_list(page_source):
+    # Every review on a review page as {'ID', 'Star_Rating', 'Comment', 'buying_influence', 'Date'}
+    return [extract_customer_review(review) for review in REVIEWS(lxml_html.fromstring(page_source))]
+
+
+def parse_viewpoint_review(document, viewpoint, review_type, url):
+    result = {f'{review_type}_Review_Cust_ID': viewpoint.get('id', 'None').replace('viewpoint-', '')}
+
+    name_tag = first(VIEWPOINT_NAME, viewpoint)
+    result[f'{review_type}_Review_Cust_Name'] = text_of(name_tag) if name_tag is not None else 'None'
+
+    # The vote count lives in a sibling column, so it is looked up on the whole document
+    votes_tag = first(VIEWPOINT_VOTES[review_type], document)
+    if votes_tag is not None:
+        helpful_text = text_of(votes_tag).strip()
+        match = LEADING_DIGITS_PATTERN.match(helpful_text)
+        helpful_count = int(match.group()) if match else w2n.word_to_num(helpful_text.split()[0])
+    else:
+        logging.debug(f"Tag not found in {url}")
+        METRICS.parse_failure(f'{review_type}_Review_Cust_Influenced')
+        helpful_count = 0
+    result[f'{review_type}_Review_Cust_Influenced'] = helpful_count
+
+    comment_tag = first(VIEWPOINT_COMMENT, viewpoint)
+    result[f'{review_type}_Review_Cust_Comment'] = text_of(comment_tag).strip() if comment_tag is not None else 'None'
+
+    title_tag = first(VIEWPOINT_TITLE, viewpoint)
+    result[f'{review_type}_Review_Cust_Comment_Title'] = text_of(title_tag) if title_tag is not None else 'None'
+
+    result[f'{review_type}_Review_Cust_Date'] = parse_review_date(first(VIEWPOINT_DATE, viewpoint), f'{review_type}_Review_Cust_Date')
+
+    star_rating_tag = first(VIEWPOINT_STAR_RATING, viewpoint)
+    result[f'{review_type}_Review_Cust_Star_Rating'] = float(text_of(star_rating_tag).split()[0]) if star_rating_tag is not None else 0.0
+    return result
+
+
+def default_viewpoint_review(review_type):
+    return {
+        f'{review_type}_Review_Cust_ID': 'None',
+        f'{review_type}_Review_Cust_Name': 'None',
+        f'{review_type}_Review_Cust_Comment': 'None',
+        f'{review_type}_Review_Cust_Comment_Title': 'None',
+        f'{review_type}_Review_Cust_Influenced': 0,
+        f'{review_type}_Review_Cust_Star_Rating': 0.0,
+        f'{review_type}_Review_Cust_Date': None,
+    }
+
+
+def parse_review_page(page_source, url, max_reviews=5):
+    # Same keys and values as the BeautifulSoup extractor, built from a single lxml parse
+    document = lxml_html.fromstring(page_source)
+
+    result = {}
+    for index, review in enumerate(REVIEWS(document)[:max_reviews], start=1):
+        parse_customer_review(review, index, result)
+
+    viewpoints = VIEWPOINTS(document)
+    for position, review_type in enumerate(('Top_Positive', 'Critical')):
+        if len(viewpoints) > position:
+            result.update(parse_viewpoint_review(document, viewpoints[position], review_type, url))
+        else:
+            result.update(default_viewpoint_review(review_type))
+    return result
@@ -0,0 +1,87 @@
+import time
+import argparse
+
+from data_processing_script import connect, SEARCH_CONFIG
+
+
+def build_search_query(category=None, min_rating=None, max_rating=None, since=None, until=None, review_types=None):
+    """SQL and parameter order for a ranked full-text search over the loaded reviews.
+
+    Searches the searchable_reviews view (product-page reviews plus the review stream),
+    whose branches use the GIN indexes on search_vector that create_tables maintains;
+    each filter given narrows the matches and only adds its own condition.
+    """
+    conditions = ["r.search_vector @@ q.query"]
+    params = []
+    if category is not None:
+        conditions.append("p.category = %s")
+        params.append(category)
+    if min_rating is not None:
+        conditions.append("r.star_rating >= %s")
+        params.append(min_rating)
+    if max_rating is not None:
+        conditions.append("r.star_rating <= %s")
+        params.append(max_rating)
+    if since is not None:
+        conditions.append("r.review_date >= %s")
+        params.append(since)
+    if until is not None:
+        conditions.append("r.review_date <= %s")
+        params.append(until)
+    if review_types:
+        conditions.append("r.review_type = ANY(%s::review_type[])")
+        params.append(list(review_types))
+
+    query = f"""
+    SELECT r.product_id, p.product, p.category, r.review_type, r.review_id, r.star_rating, r.review_date,
+           r.title, ts_headline('{SEARCH_CONFIG}', coalesce(r.comment, ''), q.query, 'MaxFragments=1, MaxWords=25, MinWords=8') AS snippet,
+           ts_rank(r.search_vector, q.query) AS rank
+    FROM searchable_reviews r
+    JOIN products p ON p.product_id = r.product_id
+    CROSS JOIN websearch_to_tsquery('{SEARCH_CONFIG}', %s) AS q(query)
+    WHERE {' AND '.join(conditions)}
+    ORDER BY rank DESC, r.review_date DESC NULLS LAST
+    LIMIT %s
+    """
+    return query, params
+
+
+def search_reviews(conn, text, category=None, min_rating=None, max_rating=None, since=None, until=None,
+                   review_types=None, limit=20):
+    """Reviews whose title or comment matches text, best matches first, as a list of dicts.
+
+    text uses web-search syntax: words are ANDed, "quoted phrases" match in order,
+    "or" separates alternatives and -word excludes a word. Words are stemmed, so
+    "battery" also finds "batteries".
+    """
+    query, params = build_search_query(category, min_rating, max_rating, since, until, review_types)
+    with conn.cursor() as cur:
+        cur.execute(query, [text] + params + [limit])
+        columns = [column.name for column in cur.description]
+        return [dict(zip(columns, row)) for row in cur.fetchall()]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Full-text search over the loaded review titles and comments.")
+    parser.add_argument('text', help='Search terms, e.g. battery, "battery life" or "screen -cracked"')
+    parser.add_argument('--category', default=None)
+    parser.add_argument('--min-rating', type=float, default=None)
+    parser.add_argument('--max-rating', type=float, default=None)
+    parser.add_argument('--since', default=None, help="Earliest review date (YYYY-MM-DD)")
+    parser.add_argument('--until', default=None, help="Latest review date (YYYY-MM-DD)")
+    parser.add_argument('--review-type', action='append', choices=['top_positive', 'critical', 'customer'], default=None)
+    parser.add_argument('--limit', type=int, default=20)
+    args = parser.parse_args()
+
+    conn = connect()
+    started = time.perf_counter()
+    results = search_reviews(conn, args.text, args.category, args.min_rating, args.max_rating, args.since, args.until,
+                             args.review_type, args.limit)
+    elapsed = time.perf_counter() - started
+    conn.close()
+
+    for result in results:
+        print(f"[{result['rank']:.3f}] {result['category']} | {result['product_id']} | {result['review_type']} | "
+              f"{result['star_rating']} stars | {result['review_date']}")
+        print(f"    {result['title'] or ''} - {result['snippet']}")
+    print(f"{len(results)} reviews in {elapsed * 1000:.1f} ms")
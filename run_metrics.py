@@ -0,0 +1,232 @@
+import json
+import time
+import threading
+from bisect import bisect_left
+from functools import wraps
+from contextlib import contextmanager
+
+
+# Upper bounds (seconds) of the histogram buckets: 100µs to ~10 minutes, 30% apart, so
+# percentiles read from the buckets are within about 15% of the exact value
+BUCKETS = tuple(round(0.0001 * 1.3 ** i, 6) for i in range(60))
+
+
+class Histogram:
+    """Fixed-bucket histogram; cheap to update, to merge across processes and to export."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q):
+        # Linear interpolation inside the bucket holding the q-th observation
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and cumulative + bucket_count >= rank:
+                lower = BUCKETS[index - 1] if index else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else self.max
+                estimate = lower + (upper - lower) * (rank - cumulative) / bucket_count
+                return min(max(estimate, self.min), self.max)
+            cumulative += bucket_count
+        return self.max
+
+    def merge(self, other):
+        self.counts = [a + b for a, b in zip(self.counts, other['counts'])]
+        self.count += other['count']
+        self.sum += other['sum']
+        for name, pick in (('min', min), ('max', max)):
+            if other[name] is not None:
+                current = getattr(self, name)
+                setattr(self, name, other[name] if current is None else pick(current, other[name]))
+
+    def to_dict(self):
+        return {'counts': list(self.counts), 'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max}
+
+
+class RunMetrics:
+    """Per-stage timings and counters for one crawl or processing run.
+
+    Stages are timed with ``timer(stage)``, ``timed()`` or ``iterate(stage, iterable)``;
+    stages may nest (scrolling includes its sleeps). Counters carry labels, e.g. pages by
+    kind and parse failures by field. Safe to update from several threads; worker
+    processes send ``snapshot()`` to the parent, which ``merge``s it.
+    """
+
+    def __init__(self, name='run'):
+        self._lock = threading.Lock()
+        self.start(name)
+
+    def start(self, name):
+        # Clears everything in place, so functions decorated with timed() keep recording here
+        with self._lock:
+            self.name = name
+            self.started = time.time()
+            self.histograms = {}
+            self.counters = {}
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
+
+    def timed(self, stage=None):
+        def decorator(function):
+            name = stage or function.__name__
+
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self.observe(name, time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def iterate(self, stage, iterable):
+        # Times how long each item takes to produce, e.g. reading the next chunk of a file
+        iterator = iter(iterable)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            self.observe(stage, time.perf_counter() - started)
+            yield item
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def page(self, kind):
+        self.count('pages', kind=kind)
+
+    def parse_failure(self, field):
+        self.count('parse_failures', field=field)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'histograms': {stage: histogram.to_dict() for stage, histogram in self.histograms.items()},
+                'counters': [(name, list(labels), value) for (name, labels), value in self.counters.items()],
+            }
+
+    def merge(self, snapshot):
+        for stage, data in snapshot['histograms'].items():
+            with self._lock:
+                histogram = self.histograms.setdefault(stage, Histogram())
+                histogram.merge(data)
+        for name, labels, value in snapshot['counters']:
+            self.count(name, value, **dict(labels))
+
+    def totals(self, name):
+        # {label value: count} for a counter with a single label, e.g. pages by kind
+        return {labels[0][1] if labels else '': value for (counter, labels), value in self.counters.items() if counter == name}
+
+    def report(self):
+        elapsed = time.time() - self.started
+        minutes = elapsed / 60 if elapsed else 0.0
+        stages = {}
+        for stage, histogram in sorted(self.histograms.items()):
+            stages[stage] = {
+                'count': histogram.count,
+                'total_seconds': histogram.sum,
+                'mean': histogram.sum / histogram.count,
+                'p50': histogram.quantile(0.50),
+                'p95': histogram.quantile(0.95),
+                'p99': histogram.quantile(0.99),
+                'max': histogram.max,
+            }
+        per_minute = {}
+        for name, _ in self.counters:
+            per_minute[name] = sum(self.totals(name).values()) / minutes if minutes else 0.0
+        return {
+            'run': self.name,
+            'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+            'elapsed_seconds': elapsed,
+            'stages': stages,
+            'pages': self.totals('pages'),
+            'pages_per_minute': per_minute.get('pages', 0.0),
+            'parse_failures': self.totals('parse_failures'),
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(self.counters.items())],
+            'per_minute': per_minute,
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
+
+    def prometheus_text(self):
+        prefix = self.name
+        lines = [f'# HELP {prefix}_stage_seconds Time spent per stage.', f'# TYPE {prefix}_stage_seconds histogram']
+        for stage, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(BUCKETS, histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        for name in sorted({name for name, _ in self.counters}):
+            lines.append(f'# TYPE {prefix}_{name}_total counter')
+            for (counter, labels), value in sorted(self.counters.items()):
+                if counter == name:
+                    label_text = ','.join(f'{key}="{label}"' for key, label in labels)
+                    lines.append(f'{prefix}_{name}_total{{{label_text}}} {value}' if label_text else f'{prefix}_{name}_total {value}')
+
+        report = self.report()
+        lines.append(f'# TYPE {prefix}_pages_per_minute gauge')
+        lines.append(f'{prefix}_pages_per_minute {report["pages_per_minute"]:.3f}')
+        lines.append(f'# TYPE {prefix}_elapsed_seconds gauge')
+        lines.append(f'{prefix}_elapsed_seconds {report["elapsed_seconds"]:.3f}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        with open(path, 'w') as file:
+            file.write(self.prometheus_text())
+
+    def print_summary(self):
+        report = self.report()
+        print(f"Stage timings for {self.name} ({report['elapsed_seconds']:.0f}s):")
+        for stage, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['total_seconds']):
+            print(f"  {stage}: {stats['count']} calls, {stats['total_seconds']:.1f}s total, "
+                  f"p50 {stats['p50']:.3f}s, p95 {stats['p95']:.3f}s, p99 {stats['p99']:.3f}s")
+        for name, rate in sorted(report['per_minute'].items()):
+            print(f"  {name}: {self.totals(name)} ({rate:.1f}/min)")
+
+    def export(self, json_path=None, prometheus_path=None):
+        if json_path:
+            self.write_json(json_path)
+        if prometheus_path:
+            self.write_prometheus(prometheus_path)
+
+
+# Shared by the scraper, its extractors and the processing script; each run calls start()
+METRICS = RunMetrics()
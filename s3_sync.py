@@ -0,0 +1,305 @@
+import io
+import os
+import time
+import zlib
+import sqlite3
+import fnmatch
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from boto3.s3.transfer import TransferConfig
+
+
+# The bucket and prefixes the aws_s3.ipynb cells used to copy-paste
+BUCKET_NAME = 'de-on-amazon-raw-useast1-dev'
+RAW_DATA_PREFIX = 'amazon/raw_statistics_reference_data/'
+CSV_PREFIX = 'amazon/raw_statistics/region=us-global/'
+
+# Files above the threshold go up and down as parallel multipart transfers
+MULTIPART_THRESHOLD = 16 * 1024 * 1024
+MULTIPART_CHUNK_SIZE = 16 * 1024 * 1024
+
+COMPRESSED_SUFFIX = '.gz'
+
+
+def make_client(endpoint_url=None, workers=8):
+    # endpoint_url points at a local stand-in (MinIO, moto server, LocalStack) instead of AWS
+    config = Config(max_pool_connections=workers * 4, retries={'max_attempts': 10, 'mode': 'adaptive'})
+    return boto3.client('s3', endpoint_url=endpoint_url, config=config)
+
+
+def transfer_config(concurrency=4):
+    return TransferConfig(multipart_threshold=MULTIPART_THRESHOLD, multipart_chunksize=MULTIPART_CHUNK_SIZE,
+                          max_concurrency=concurrency, use_threads=True)
+
+
+class SyncManifest:
+    """SQLite record of what was last transferred between each object and each local file.
+
+    A file is skipped when its size and mtime still match the manifest and the object in
+    the bucket still has the ETag recorded after the last transfer. Rows are keyed by the
+    local path as well as the object, so an upload of ./x.csv and a download of the same
+    key into ./downloaded_files/x.csv keep separate rows in one manifest.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        # Older manifests keyed rows by object only; those rows cannot tell an upload's
+        # source from a download's target, so they are dropped
+        self.connection.execute("DROP TABLE IF EXISTS objects")
+        # One row per object and local file: an object synced with two local paths (an
+        # upload source and a download target) has two independent rows
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS transfers (
+                bucket TEXT NOT NULL,
+                key TEXT NOT NULL,
+                local_path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                etag TEXT NOT NULL,
+                synced_at REAL NOT NULL,
+                PRIMARY KEY (bucket, key, local_path)
+            )
+        """)
+        self.connection.commit()
+
+    def entries(self, bucket, prefix):
+        # {(key, absolute local path): (size, mtime_ns, etag)}
+        rows = self.connection.execute(
+            "SELECT key, local_path, size, mtime_ns, etag FROM transfers WHERE bucket = ? AND substr(key, 1, ?) = ?",
+            (bucket, len(prefix), prefix),
+        )
+        return {(row[0], row[1]): row[2:] for row in rows}
+
+    def record(self, bucket, key, local_path, etag):
+        stat = os.stat(local_path)
+        self.connection.execute(
+            "INSERT OR REPLACE INTO transfers (bucket, key, local_path, size, mtime_ns, etag, synced_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (bucket, key, os.path.abspath(local_path), stat.st_size, stat.st_mtime_ns, etag, time.time()),
+        )
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class TransferStats:
+    def __init__(self):
+        self.files = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, size):
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+
+    def report(self, action):
+        megabytes = self.bytes / (1024 * 1024)
+        rate = megabytes / self.seconds if self.seconds else 0.0
+        print(f"{action}: {self.files} files ({megabytes:.1f} MB) in {self.seconds:.1f}s ({rate:.1f} MB/s), "
+              f"{self.skipped} unchanged skipped, {self.failed} failed")
+
+
+class GzipStream(io.RawIOBase):
+    """Read-only stream of a file's gzip-compressed bytes, compressed as it is read.
+
+    Lets upload_fileobj send a compressed copy without writing a temporary .gz file;
+    the compressed size is unknown up front, so S3 gets it as a multipart upload.
+    """
+
+    def __init__(self, path, chunk_size=1024 * 1024, level=6):
+        self.file = open(path, 'rb')
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        self.chunk_size = chunk_size
+        self.buffer = b''
+        self.finished = False
+        self.raw_bytes = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        while len(self.buffer) < len(target) and not self.finished:
+            chunk = self.file.read(self.chunk_size)
+            self.raw_bytes += len(chunk)
+            if chunk:
+                self.buffer += self.compressor.compress(chunk)
+            else:
+                self.buffer += self.compressor.flush()
+                self.finished = True
+        size = min(len(target), len(self.buffer))
+        target[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+    def close(self):
+        self.file.close()
+        super().close()
+
+
+def list_objects(client, bucket, prefix='', page_size=1000):
+    # Paginated, so prefixes with more than 1,000 objects are listed completely
+    paginator = client.get_paginator('list_objects_v2')
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix, PaginationConfig={'PageSize': page_size}):
+        yield from page.get('Contents', [])
+
+
+def iter_local_files(directory, patterns):
+    for subdir, _, files in os.walk(directory):
+        for name in sorted(files):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                yield os.path.join(subdir, name)
+
+
+def object_key(prefix, directory, local_path, compress=False):
+    key = prefix + os.path.relpath(local_path, directory).replace(os.sep, '/')
+    return key + COMPRESSED_SUFFIX if compress else key
+
+
+def is_unchanged(known, key, local_path, remote):
+    # known is SyncManifest.entries(); remote the listed object
+    entry = known.get((key, os.path.abspath(local_path)))
+    if entry is None or remote is None or not os.path.exists(local_path):
+        return False
+    size, mtime_ns, etag = entry
+    stat = os.stat(local_path)
+    return stat.st_size == size and stat.st_mtime_ns == mtime_ns and remote['ETag'] == etag
+
+
+def upload_one(client, bucket, key, local_path, config, compress=False):
+    # Runs in a pool thread; returns the ETag S3 assigned to the new object
+    if compress:
+        with GzipStream(local_path) as stream:
+            client.upload_fileobj(stream, bucket, key, Config=config, ExtraArgs={'ContentType': 'application/gzip'})
+    else:
+        client.upload_file(local_path, bucket, key, Config=config)
+    return client.head_object(Bucket=bucket, Key=key)['ETag']
+
+
+def download_one(client, bucket, key, local_path, config):
+    os.makedirs(os.path.dirname(local_path) or '.', exist_ok=True)
+    # Download next to the target and rename, so an interrupted transfer never looks complete
+    temporary_path = f"{local_path}.part"
+    client.download_file(bucket, key, temporary_path, Config=config)
+    os.replace(temporary_path, local_path)
+
+
+def upload_directory(client, directory, bucket=BUCKET_NAME, prefix=RAW_DATA_PREFIX, patterns=('*ext.json',),
+                     manifest=None, workers=8, compress=False, stats=None):
+    """Upload the files under directory matching patterns that changed since the last sync.
+
+    Files are uploaded workers at a time; large ones are also split into concurrent
+    multipart chunks. The manifest is updated from this thread as uploads finish.
+    """
+    stats = stats or TransferStats()
+    started = time.time()
+    remote = {obj['Key']: obj for obj in list_objects(client, bucket, prefix)}
+    known = manifest.entries(bucket, prefix) if manifest is not None else {}
+
+    pending = []
+    for local_path in iter_local_files(directory, patterns):
+        key = object_key(prefix, directory, local_path, compress)
+        if is_unchanged(known, key, local_path, remote.get(key)):
+            stats.skipped += 1
+        else:
+            pending.append((key, local_path))
+
+    config = transfer_config()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(key, local_path, executor.submit(upload_one, client, bucket, key, local_path, config, compress))
+                   for key, local_path in pending]
+        for key, local_path, future in futures:
+            try:
+                etag = future.result()
+            except Exception as e:
+                print(f"Upload of {local_path} to s3://{bucket}/{key} failed: {e}")
+                stats.failed += 1
+                continue
+            stats.add(os.path.getsize(local_path))
+            if manifest is not None:
+                manifest.record(bucket, key, local_path, etag)
+                manifest.commit()
+    stats.seconds += time.time() - started
+    return stats
+
+
+def download_prefix(client, directory, bucket=BUCKET_NAME, prefix=CSV_PREFIX, patterns=('*',),
+                    manifest=None, workers=8, stats=None):
+    """Download the objects under prefix whose ETag changed, keeping their relative paths."""
+    stats = stats or TransferStats()
+    started = time.time()
+    known = manifest.entries(bucket, prefix) if manifest is not None else {}
+
+    pending = []
+    for obj in list_objects(client, bucket, prefix):
+        key = obj['Key']
+        if key.endswith('/') or not any(fnmatch.fnmatch(key.rsplit('/', 1)[-1], pattern) for pattern in patterns):
+            continue
+        local_path = os.path.join(directory, *key[len(prefix):].lstrip('/').split('/'))
+        if is_unchanged(known, key, local_path, obj):
+            stats.skipped += 1
+        else:
+            pending.append((obj, local_path))
+
+    config = transfer_config()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [(obj, local_path, executor.submit(download_one, client, bucket, obj['Key'], local_path, config))
+                   for obj, local_path in pending]
+        for obj, local_path, future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                print(f"Download of s3://{bucket}/{obj['Key']} failed: {e}")
+                stats.failed += 1
+                continue
+            stats.add(obj['Size'])
+            if manifest is not None:
+                manifest.record(bucket, obj['Key'], local_path, obj['ETag'])
+                manifest.commit()
+    stats.seconds += time.time() - started
+    return stats
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Sync crawl outputs with S3, skipping files that have not changed.")
+    parser.add_argument('action', choices=['upload', 'download', 'list'])
+    parser.add_argument('directory', nargs='?', default='.', help="Local directory to upload from or download into")
+    parser.add_argument('--bucket', default=BUCKET_NAME)
+    parser.add_argument('--prefix', default=None, help=f"Key prefix (default: {RAW_DATA_PREFIX} for upload, {CSV_PREFIX} otherwise)")
+    parser.add_argument('--pattern', action='append', default=None,
+                        help="File name pattern, repeatable (default: *ext.json for upload, * for download)")
+    parser.add_argument('--workers', type=int, default=8, help="Files transferred at once")
+    parser.add_argument('--compress', action='store_true', help="Upload gzip-compressed copies as <key>.gz, compressed while streaming")
+    parser.add_argument('--manifest', default='s3_sync_manifest.db', help="SQLite manifest of transferred files ('' to always transfer)")
+    parser.add_argument('--endpoint-url', default=os.environ.get('S3_ENDPOINT_URL'), help="Local S3 stand-in, e.g. http://127.0.0.1:9000")
+    args = parser.parse_args()
+
+    client = make_client(args.endpoint_url, args.workers)
+    if args.action == 'list':
+        count = 0
+        total = 0
+        for obj in list_objects(client, args.bucket, args.prefix if args.prefix is not None else ''):
+            print(f"{obj['LastModified']:%Y-%m-%d %H:%M:%S} {obj['Size']:>12} {obj['Key']}")
+            count += 1
+            total += obj['Size']
+        print(f"{count} objects, {total / (1024 * 1024):.1f} MB")
+    else:
+        manifest = SyncManifest(args.manifest) if args.manifest else None
+        if args.action == 'upload':
+            stats = upload_directory(client, args.directory, args.bucket, args.prefix if args.prefix is not None else RAW_DATA_PREFIX,
+                                     args.pattern or ['*ext.json'], manifest, args.workers, args.compress)
+        else:
+            stats = download_prefix(client, args.directory, args.bucket, args.prefix if args.prefix is not None else CSV_PREFIX,
+                                    args.pattern or ['*'], manifest, args.workers)
+        stats.report(args.action.capitalize())
+        if manifest is not None:
+            manifest.close()
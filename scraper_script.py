@@ -5,18 +5,31 @@ import html
 import re
 import traceback
 import logging
+import argparse
+import queue
+import threading
+import multiprocessing
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from word2number import w2n
 from bs4 import BeautifulSoup
 from selenium import webdriver
-from selenium.webdriver.edge.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.by import By
 from selenium.common.exceptions import TimeoutException
-from webdriver_manager.microsoft import EdgeChromiumDriverManager
+from driver_manager import ManagedDriver, create_edge_driver, make_edge_options, block_heavy_resources
 from selenium.common.exceptions import NoSuchElementException
+from page_archive import PageArchive
+from crawl_journal import CrawlJournal, load_journal_products
+from freshness_index import FreshnessIndex, review_ids_of
+from review_pagination import collect_reviews, review_rows, ReviewStreamWriter
+from review_parser import parse_review_page
+from http_fetcher import HttpFetcher, PRODUCT_PAGE_READY, REVIEW_PAGE_READY
+import rate_scheduler
+from rate_scheduler import AdaptiveRateScheduler, wait_for_results, is_blocked_page
+from run_metrics import METRICS
 
 
 
@@ -31,103 +44,140 @@ def process_review_count(text):
 
 
 def setup_driver():
-    options = webdriver.EdgeOptions()
-    options.add_argument('--no-sandbox')
+    options = make_edge_options()
     try:
-        driver = webdriver.Edge(service=Service(EdgeChromiumDriverManager().install()), options=options)
+        driver = create_edge_driver(options)
     except Exception as e:
         print(e)
         raise Exception("Failed to install Edge Chromium driver.")
+    block_heavy_resources(driver)
     return driver
 
-def scrape_extra_parameters(url: str, driver: webdriver.Edge) -> dict:
-    try:
+def paced_get(driver, url, scheduler=None):
+    if scheduler is not None:
+        with METRICS.timer('pacing_wait'):
+            scheduler.wait(url)
+    with METRICS.timer('driver_get'):
         driver.get(url)
+    return time.time()
+
+def pause(seconds):
+    with METRICS.timer('sleep'):
+        time.sleep(seconds)
+
+def report_page_load(scheduler, url, started, page_source=None, timed_out=False):
+    # Feed the outcome of a page load back to the pacing scheduler (if any)
+    if scheduler is None:
+        return
+    if page_source is not None and is_blocked_page(page_source):
+        outcome = rate_scheduler.BLOCKED
+    elif timed_out:
+        outcome = rate_scheduler.TIMEOUT
+    else:
+        outcome = rate_scheduler.OK
+    scheduler.record(url, time.time() - started, outcome)
+
+def scrape_extra_parameters(url: str, driver: webdriver.Edge, archive=None, asin=None, category=None, scheduler=None) -> dict:
+    try:
+        started = paced_get(driver, url, scheduler)
         try:
-            WebDriverWait(driver, 20).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div[data-hook='review']")))
+            with METRICS.timer('webdriver_wait'):
+                WebDriverWait(driver, 20).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, "div[data-hook='review']")))
 
         except TimeoutException:
+            METRICS.count('timeouts', kind='reviews')
             print(f"TimeoutException: Could not find reviews for {url}")
+            report_page_load(scheduler, url, started, driver.page_source, timed_out=True)
             return {}
-        
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
 
-        # Extract the general reviews
-        reviews_tags = soup.find_all('div', attrs={'data-hook': 'review'})
+        page_source = driver.page_source
+        METRICS.page('reviews')
+        report_page_load(scheduler, url, started, page_source)
+        if archive is not None:
+            archive.append(asin, 'reviews', page_source, url=url, category=category)
+        with METRICS.timer('parse_review_page'):
+            return parse_review_page(page_source, url)
+    except Exception as e:
+        print(f"Error scraping extra parameters: {e}")
+        traceback.print_exc()
+        return {}
 
-        result = {}
-        for i, review_tag in enumerate(reviews_tags[:5]):
-            result[f'Customer_{i + 1}_ID'] = review_tag.attrs.get('id', 'None')
-            
-            # Extract the Star Rating
-            star_rating_tag = review_tag.select_one('i[data-hook="review-star-rating"] span.a-icon-alt')
-            star_rating = float(star_rating_tag.text.split()[0]) if star_rating_tag else 0.0
-            result[f'Customer_{i+1}_Star_Rating'] = star_rating
-
-            # Extract the Comment Title
-            comment_title_tag = review_tag.select_one('a[data-hook="review-title"]')
-            # Inside the for loop, after extracting the comment title:
-            if comment_title_tag:
-                actual_comment_title = comment_title_tag.text.strip()
-            else:
-                # Handle alternate structure
-                comment_title_tag = review_tag.select_one('span.cr-original-review-content')
-                actual_comment_title = comment_title_tag.text.strip() if comment_title_tag else 'NaN'
+def parse_review_page_bs4(page_source, url):
+    # Reference BeautifulSoup implementation; the crawler uses review_parser.parse_review_page
+    soup = BeautifulSoup(page_source, 'html.parser')
 
-            # Remove the pattern "k out of 5 stars\n" from the comment
-            actual_comment_title = re.sub(r'\d+(\.\d+)? out of 5 stars\n', '', actual_comment_title)
+    # Extract the general reviews
+    reviews_tags = soup.find_all('div', attrs={'data-hook': 'review'})
 
-            result[f'Customer_{i+1}_Comment'] = actual_comment_title
+    result = {}
+    for i, review_tag in enumerate(reviews_tags[:5]):
+        result[f'Customer_{i + 1}_ID'] = review_tag.attrs.get('id', 'None')
+        
+        # Extract the Star Rating
+        star_rating_tag = review_tag.select_one('i[data-hook="review-star-rating"] span.a-icon-alt')
+        star_rating = float(star_rating_tag.text.split()[0]) if star_rating_tag else 0.0
+        result[f'Customer_{i+1}_Star_Rating'] = star_rating
 
-            # Extract the Number of people who found the review helpful
-            helpful_vote_tag = review_tag.select_one('span[data-hook="helpful-vote-statement"]')
-            helpful_count = w2n.word_to_num(helpful_vote_tag.text.split()[0]) if helpful_vote_tag else 0
-            result[f'Customer_{i+1}_buying_influence'] = helpful_count
+        # Extract the Comment Title
+        comment_title_tag = review_tag.select_one('a[data-hook="review-title"]')
+        # Inside the for loop, after extracting the comment title:
+        if comment_title_tag:
+            actual_comment_title = comment_title_tag.text.strip()
+        else:
+            # Handle alternate structure
+            comment_title_tag = review_tag.select_one('span.cr-original-review-content')
+            actual_comment_title = comment_title_tag.text.strip() if comment_title_tag else 'NaN'
 
-            # Extract the post time
-            customer_id = result[f'Customer_{i + 1}_ID']  # Extract the customer ID from the results
-            Cust_tags_date = review_tag.select(f'#customer_review-{customer_id} > span')  # Use the customer ID in the selector
+        # Remove the pattern "k out of 5 stars\n" from the comment
+        actual_comment_title = re.sub(r'\d+(\.\d+)? out of 5 stars\n', '', actual_comment_title)
 
-            if Cust_tags_date:
-                Cust_post_time_text = Cust_tags_date[0].text.strip()
-                match = re.search(r'on (.+)$', Cust_post_time_text)
-                if match:
-                    date_string = match.group(1)
-                    try:
-                        post_date = datetime.strptime(date_string, '%B %d, %Y')
-                        result[f'Customer_{i+1}_Date'] = post_date.isoformat()                            
-                    except ValueError as ve:
-                        print(f"Error parsing date string {date_string}: {ve}")
-                        result[f'Customer_{i+1}_Date'] = '-'
-                else:
-                    print("Date not found in text:", Cust_post_time_text)
+        result[f'Customer_{i+1}_Comment'] = actual_comment_title
+
+        # Extract the Number of people who found the review helpful
+        helpful_vote_tag = review_tag.select_one('span[data-hook="helpful-vote-statement"]')
+        helpful_count = w2n.word_to_num(helpful_vote_tag.text.split()[0]) if helpful_vote_tag else 0
+        result[f'Customer_{i+1}_buying_influence'] = helpful_count
+
+        # Extract the post time
+        customer_id = result[f'Customer_{i + 1}_ID']  # Extract the customer ID from the results
+        Cust_tags_date = review_tag.select(f'#customer_review-{customer_id} > span')  # Use the customer ID in the selector
+
+        if Cust_tags_date:
+            Cust_post_time_text = Cust_tags_date[0].text.strip()
+            match = re.search(r'on (.+)$', Cust_post_time_text)
+            if match:
+                date_string = match.group(1)
+                try:
+                    post_date = datetime.strptime(date_string, '%B %d, %Y')
+                    result[f'Customer_{i+1}_Date'] = post_date.isoformat()                            
+                except ValueError as ve:
+                    print(f"Error parsing date string {date_string}: {ve}")
                     result[f'Customer_{i+1}_Date'] = '-'
             else:
-                print("Date tag not found")
-                result[f'Customer_{i+1}_Date'] = None
-                 
+                print("Date not found in text:", Cust_post_time_text)
+                result[f'Customer_{i+1}_Date'] = '-'
+        else:
+            print("Date tag not found")
+            result[f'Customer_{i+1}_Date'] = None
+             
 
-        # Extract Top Positive and Critical Reviews (Moved outside of the above loop)
-        Parent_review_tags = soup.select('div[id^="viewpoint-"]')
-        if len(Parent_review_tags) > 0: 
-            ts = 'positive-review'
-            result.update(extract_specific_review(Parent_review_tags[0], 'Top_Positive', ts, soup, url))
+    # Extract Top Positive and Critical Reviews (Moved outside of the above loop)
+    Parent_review_tags = soup.select('div[id^="viewpoint-"]')
+    if len(Parent_review_tags) > 0: 
+        ts = 'positive-review'
+        result.update(extract_specific_review(Parent_review_tags[0], 'Top_Positive', ts, soup, url))
 
-        else:
-            result.update(set_default_values('Top_Positive'))
-            
-        if len(Parent_review_tags) > 1: 
-            ts = 'critical-review.a-span-last'
-            result.update(extract_specific_review(Parent_review_tags[1], 'Critical', ts, soup, url))
+    else:
+        result.update(set_default_values('Top_Positive'))
+        
+    if len(Parent_review_tags) > 1: 
+        ts = 'critical-review.a-span-last'
+        result.update(extract_specific_review(Parent_review_tags[1], 'Critical', ts, soup, url))
 
-        else:
-            result.update(set_default_values('Critical'))
-            
-        return result
-    except Exception as e:
-        print(f"Error scraping extra parameters: {e}")
-        traceback.print_exc()
-        return {}
+    else:
+        result.update(set_default_values('Critical'))
+        
+    return result
 
 def extract_specific_review(review_tag, review_type, ts, soup, url):
     specific_result = {}
@@ -213,14 +263,17 @@ def set_default_values(review_type):
     }
     return default_values
 
+@METRICS.timed()
 def get_title(soup):
     try:
         title = soup.find("span", attrs={"id": 'productTitle'})
         title_string = title.string.strip()
     except AttributeError:
+        METRICS.parse_failure('product')
         title_string = ""
     return title_string
 
+@METRICS.timed()
 def get_price(soup):
     try:
         # Try the first potential structure
@@ -234,12 +287,15 @@ def get_price(soup):
         if price_match:
             price = price_match.group(1)
         else:
+            METRICS.parse_failure('price')
             price = ""
     except AttributeError:
+        METRICS.parse_failure('price')
         price = ""
     return price
 
 
+@METRICS.timed()
 def get_rating(soup):
     try:
         # Extract rating based on the provided structure
@@ -247,19 +303,23 @@ def get_rating(soup):
         if rating_element:
             rating = rating_element[0].text.strip()
         else:
+            METRICS.parse_failure('ratings')
             rating = ""
     except AttributeError:
+        METRICS.parse_failure('ratings')
         rating = ""
     return rating
 
 
 
+@METRICS.timed()
 def get_review_count(soup):
     try:
         review_count_element = soup.select_one("#acrCustomerReviewText")
         reviews_text = review_count_element.text.strip()
         review_count = process_review_count(reviews_text)
     except (AttributeError, ValueError):
+        METRICS.parse_failure('reviews')
         review_count = 0
     return review_count
 
@@ -276,17 +336,36 @@ def process_review_count(reviews_text):
 
 
 
-def extract_product_details(driver, asin):
+def extract_product_details(driver, asin, archive=None, category=None, scheduler=None):
     product_page_url = f"https://www.amazon.com/dp/{asin}"
-    reviews_page_url = f"https://www.amazon.com/product-reviews/{asin}/ref=cm_cr_dp_d_show_all_top?ie=UTF8&reviewerType=all_reviews&sortBy=recent"
     
     # Navigate to the product page for scraping
  
-    driver.get(product_page_url)
-    WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, 'productTitle')))
-    
+    started = paced_get(driver, product_page_url, scheduler)
+    try:
+        with METRICS.timer('webdriver_wait'):
+            WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.ID, 'productTitle')))
+    except TimeoutException:
+        METRICS.count('timeouts', kind='product')
+        report_page_load(scheduler, product_page_url, started, driver.page_source, timed_out=True)
+        raise
+
+    page_source = driver.page_source
+    METRICS.page('product')
+    report_page_load(scheduler, product_page_url, started, page_source)
+    if archive is not None:
+        archive.append(asin, 'product', page_source, url=product_page_url, category=category)
+    return parse_product_page(page_source, asin)
+
+def get_reviews_page_url(asin):
+    return f"https://www.amazon.com/product-reviews/{asin}/ref=cm_cr_dp_d_show_all_top?ie=UTF8&reviewerType=all_reviews&sortBy=recent"
+
+def parse_product_page(page_source, asin):
+    reviews_page_url = get_reviews_page_url(asin)
+
     # Create a BeautifulSoup object and parse the page source
-    soup = BeautifulSoup(driver.page_source, 'lxml')
+    with METRICS.timer('soup'):
+        soup = BeautifulSoup(page_source, 'lxml')
 
     # Extract details using the dedicated functions and store in a dictionary
     product_dict = {
@@ -309,16 +388,20 @@ user_agents = [
 ]
 
 def setup_driver_with_random_user_agent():
-    options = webdriver.EdgeOptions()
-    options.add_argument('--no-sandbox')
-    options.add_argument(f"user-agent={random.choice(user_agents)}")  # Set a random user agent
+    options = make_edge_options(user_agent=random.choice(user_agents))  # Set a random user agent
     try:
-        driver = webdriver.Edge(service=Service(EdgeChromiumDriverManager().install()), options=options)
+        driver = create_edge_driver(options)
     except Exception as e:
         print(e)
         raise Exception("Failed to install Edge Chromium driver.")
+    block_heavy_resources(driver)
     return driver
 
+def setup_managed_driver(recycle_pages=200, max_browser_rss_mb=1500):
+    # Restarted (with a new random user agent) after recycle_pages loads or above the RSS limit
+    return ManagedDriver(setup_driver_with_random_user_agent, max_pages=recycle_pages, max_rss_mb=max_browser_rss_mb)
+
+@METRICS.timed('scrolling')
 def emulate_human_scrolling(driver, scroll_pause_time=2):
     # Get scroll height initially
     last_height = driver.execute_script("return document.body.scrollHeight")
@@ -328,7 +411,7 @@ def emulate_human_scrolling(driver, scroll_pause_time=2):
         driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
 
         # Wait for page to load
-        time.sleep(scroll_pause_time)
+        pause(scroll_pause_time)
 
         # Calculate new scroll height and compare with the last scroll height
         new_height = driver.execute_script("return document.body.scrollHeight")
@@ -336,9 +419,11 @@ def emulate_human_scrolling(driver, scroll_pause_time=2):
             break
         last_height = new_height
 
+@METRICS.timed()
 def extract_data_asins_from_html(html_content):
     # Using BeautifulSoup to parse the HTML content
-    soup = BeautifulSoup(html_content, 'lxml')
+    with METRICS.timer('soup'):
+        soup = BeautifulSoup(html_content, 'lxml')
     
     # Extract all elements with 'data-asin' attribute
     elements_with_data_asin = soup.find_all(attrs={"data-asin": True})
@@ -348,49 +433,650 @@ def extract_data_asins_from_html(html_content):
     
     return distinct_product_asins
 
-def scrape_amazon(categories):
-    driver = setup_driver_with_random_user_agent()  # Setup driver with a random user agent
-    all_products = []
-    seen_products = set()
+# Product fields that can be read from a search-result card instead of the product page
+CARD_FIELDS = ('product', 'price', 'ratings', 'reviews')
+
+def parse_card_review_count(text):
+    # Cards show "1,234", "(1.2K)" or "2K+"; None when there is no usable number
+    match = re.search(r'(\d[\d.,]*)\s*([Kk])?', text)
+    if not match:
+        return None
+    try:
+        count = float(match.group(1).replace(',', ''))
+    except ValueError:
+        return None
+    return int(count * 1000) if match.group(2) else int(count)
+
+@METRICS.timed()
+def parse_search_card(card):
+    fields = {}
+
+    title_tag = card.select_one('h2')
+    if title_tag and title_tag.get_text(strip=True):
+        fields['product'] = title_tag.get_text(strip=True)
+
+    price_tag = card.select_one('span.a-price span.a-offscreen')
+    price_match = re.search(r"\$([\d,]+\.\d{2})", price_tag.text) if price_tag else None
+    if price_match:
+        fields['price'] = price_match.group(1)
+
+    rating_tag = card.select_one('span.a-icon-alt')
+    rating_match = re.match(r'\s*(\d+(\.\d+)?) out of', rating_tag.text) if rating_tag else None
+    if rating_match:
+        fields['ratings'] = rating_match.group(1)
+
+    review_count_tag = card.select_one('span.s-underline-text') or card.select_one('a[href*="customerReviews"]')
+    review_count = parse_card_review_count(review_count_tag.text) if review_count_tag else None
+    if review_count is not None:
+        fields['reviews'] = review_count
+
+    return fields
+
+@METRICS.timed()
+def extract_search_results(html_content):
+    # Every distinct ASIN on the page (as extract_data_asins_from_html), mapped to the
+    # product fields its result card already shows; ASINs without a card map to {}
+    with METRICS.timer('soup'):
+        soup = BeautifulSoup(html_content, 'lxml')
+
+    results = {}
+    for element in soup.find_all(attrs={"data-asin": True}):
+        asin = element['data-asin']
+        if not asin.strip():
+            continue
+        card_fields = results.setdefault(asin, {})
+        if element.get('data-component-type') == 's-search-result':
+            card_fields.update(parse_search_card(element))
+
+    # Sorted by ASIN so the serial and parallel crawls visit (and emit) products in the same order
+    return {asin: results[asin] for asin in sorted(results)}
+
+def build_product_details(asin, category, card_fields, page_details=None):
+    # Card values win; the product page (if it had to be loaded) fills in the rest
+    page_details = page_details or {}
+    product_details = {'Product_ID': asin}
+    for field in CARD_FIELDS:
+        product_details[field] = card_fields[field] if field in card_fields else page_details.get(field, '' if field != 'reviews' else 0)
+    product_details['url'] = get_reviews_page_url(asin)
+    product_details['category'] = category
+    product_details['scraped_at'] = datetime.now().isoformat(timespec='seconds')
+    return product_details
+
+def is_card_complete(card_fields):
+    return all(field in card_fields for field in CARD_FIELDS)
+
+# Organic result cards; used to tell when a search page has finished loading
+SEARCH_RESULT_SELECTOR = "div.s-main-slot div[data-component-type='s-search-result']"
+
+def scrape_search_page_paced(driver, url, category, page, scheduler):
+    # Event-driven replacement for the scroll loop and fixed sleep below
+    started = paced_get(driver, url, scheduler)
+    with METRICS.timer('webdriver_wait'):
+        ready = wait_for_results(driver, SEARCH_RESULT_SELECTOR)
+    page_source = driver.page_source
+    report_page_load(scheduler, url, started, page_source, timed_out=not ready)
+
+    if is_blocked_page(page_source):
+        METRICS.count('blocked', kind='search')
+        print(f"Blocked on page {page} of category {category}; backing off.")
+        return None
+    if not ready:
+        METRICS.count('timeouts', kind='search')
+        print(f"Timed out waiting for elements on page {page} of category {category}.")
+        return None
+
+    METRICS.page('search')
+    search_results = extract_search_results(page_source)
+    print(f"Extracted ASINs: {list(search_results)}")
+    return search_results
+
+def scrape_search_page(driver, url, category, page, scheduler=None):
+    if scheduler is not None:
+        return scrape_search_page_paced(driver, url, category, page, scheduler)
+
+    try:
+        with METRICS.timer('driver_get'):
+            driver.get(url)
+        emulate_human_scrolling(driver, scroll_pause_time=random.randint(2, 4))
+        with METRICS.timer('webdriver_wait'):
+            WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.CSS_SELECTOR, "#search > div.s-desktop-width-max.s-desktop-content.s-wide-grid-style-t1.s-opposite-dir.s-wide-grid-style.sg-row > div.sg-col-20-of-24.s-matching-dir.sg-col-16-of-20.sg-col.sg-col-8-of-12.sg-col-12-of-16 > div > span.rush-component.s-latency-cf-section > div.s-main-slot.s-result-list.s-search-results.sg-row")))
+    except TimeoutException:
+        METRICS.count('timeouts', kind='search')
+        print(f"Timed out waiting for elements on page {page} of category {category}.")
+        return None
+
+    pause(random.uniform(3.0, 6.0))
+    METRICS.page('search')
+    search_results = extract_search_results(driver.page_source)
+    print(f"Extracted ASINs: {list(search_results)}")
+
+    return search_results
+
+def archive_card_fields(archive, asin, category, card_fields):
+    # Archived after any product page, so reparse_archive.py can tell which of the two is newer
+    if archive is not None and card_fields:
+        archive.append(asin, 'search_card', json.dumps(card_fields), category=category)
+
+def scrape_product(driver, asin, category, card_fields=None, archive=None, scheduler=None):
+    card_fields = card_fields or {}
+    page_details = None
+    if not is_card_complete(card_fields):
+        page_details = extract_product_details(driver, asin, archive=archive, category=category, scheduler=scheduler)
+    archive_card_fields(archive, asin, category, card_fields)
+    return build_product_details(asin, category, card_fields, page_details)
+
+def scrape_product_reviews(driver, product_details, archive=None, scheduler=None):
+    extra_params = scrape_extra_parameters(product_details['url'], driver, archive=archive,
+                                           asin=product_details['Product_ID'], category=product_details['category'],
+                                           scheduler=scheduler)
+    product_details.update(extra_params)
+    return product_details
+
+def scrape_product_http(fetcher, asin, category, card_fields=None, archive=None):
+    # Same record as scrape_product + scrape_product_reviews, fetched over HTTP when possible
+    card_fields = card_fields or {}
+    page_details = None
+    if not is_card_complete(card_fields):
+        product_page_url = f"https://www.amazon.com/dp/{asin}"
+        page_source = fetcher.fetch(product_page_url, PRODUCT_PAGE_READY)
+        if page_source is None:
+            METRICS.count('timeouts', kind='product')
+            raise Exception(f"Could not load product page {product_page_url}")
+        METRICS.page('product')
+        if archive is not None:
+            archive.append(asin, 'product', page_source, url=product_page_url, category=category)
+        page_details = parse_product_page(page_source, asin)
+    archive_card_fields(archive, asin, category, card_fields)
+    product_details = build_product_details(asin, category, card_fields, page_details)
+
+    reviews_source = fetcher.fetch(product_details['url'], REVIEW_PAGE_READY)
+    if reviews_source is None:
+        METRICS.count('timeouts', kind='reviews')
+        print(f"TimeoutException: Could not find reviews for {product_details['url']}")
+        return product_details
+    METRICS.page('reviews')
+    if archive is not None:
+        archive.append(asin, 'reviews', reviews_source, url=product_details['url'], category=category)
+    try:
+        with METRICS.timer('parse_review_page'):
+            product_details.update(parse_review_page(reviews_source, product_details['url']))
+    except Exception as e:
+        print(f"Error scraping extra parameters: {e}")
+        traceback.print_exc()
+    return product_details
+
+def scrape_deep_reviews(fetcher, product_details, max_reviews, concurrency, known_review_ids=None, archive=None):
+    # Up to max_reviews reviews as one row per review, fetched several review pages at a time
+    reviews = collect_reviews(fetcher, product_details['Product_ID'], max_reviews, concurrency=concurrency,
+                              known_review_ids=known_review_ids, archive=archive, category=product_details['category'])
+    return review_rows(product_details, reviews)
+
+def scrape_product_http_task(fetcher, asin, category, card_fields, archive=None, max_reviews=0,
+                             review_concurrency=4, known_review_ids=None):
+    product_details = scrape_product_http(fetcher, asin, category, card_fields, archive)
+    rows = []
+    if max_reviews:
+        rows = scrape_deep_reviews(fetcher, product_details, max_reviews, review_concurrency, known_review_ids, archive)
+    return product_details, rows
+
+def write_review_rows(review_writer, index, product_id, rows):
+    review_writer.write(rows)
+    if index is not None:
+        index.record_streamed_review_ids(product_id, [row['Review_ID'] for row in rows])
+
+def apply_freshness(index, asin, card_fields, ttl_seconds):
+    # None when the product was scraped within the TTL. Otherwise the card fields, topped up
+    # with the last scrape's product-page fields so stale products only need their reviews page
+    if index is None:
+        return card_fields
+    if index.is_fresh(asin, ttl_seconds):
+        return None
+    return {**index.previous_fields(asin), **card_fields}
+
+class FreshnessStats:
+    def __init__(self):
+        self.fresh = 0
+        self.changed = 0
+        self.unchanged = 0
+        self.new_reviews = 0
+
+    def record(self, index, product_details):
+        if index is None:
+            return
+        asin = product_details['Product_ID']
+        self.new_reviews += len(index.new_review_ids(asin, review_ids_of(product_details)))
+        if index.record(product_details):
+            self.changed += 1
+        else:
+            self.unchanged += 1
+
+    def report(self, index):
+        if index is None:
+            return
+        print(f"Freshness index: {self.fresh} fresh products skipped, {self.changed} new or changed, "
+              f"{self.unchanged} unchanged, {self.new_reviews} new reviews")
+
+def make_scheduler(pacing, num_workers=1):
+    if pacing != 'adaptive':
+        return None
+    # Every worker process paces itself, so split the host's rate budget between them
+    defaults = AdaptiveRateScheduler()
+    return AdaptiveRateScheduler(initial_rate=defaults.initial_rate / num_workers,
+                                 min_rate=defaults.min_rate / num_workers,
+                                 max_rate=defaults.max_rate / num_workers)
+
+def print_pacing_summary(scheduler):
+    if scheduler is None:
+        return
+    for host, summary in scheduler.summary().items():
+        print(f"Pacing for {host}: {summary}")
+
+def scrape_amazon(categories, archive_dir=None, backend='selenium', http_workers=8, pacing='adaptive',
+                  journal_path=None, resume=False, index_path=None, ttl_hours=24,
+                  max_reviews=0, review_concurrency=4, reviews_path='amazon_reviews_ext.jsonl',
+                  recycle_pages=200, max_browser_rss_mb=1500):
+    driver = setup_managed_driver(recycle_pages, max_browser_rss_mb)  # Setup driver with a random user agent
+    archive = PageArchive(archive_dir) if archive_dir else None
+    index = FreshnessIndex(index_path) if index_path else None
+    ttl_seconds = ttl_hours * 3600
+    freshness = FreshnessStats()
+    scheduler = make_scheduler(pacing)
+    journal = CrawlJournal(journal_path, resume=resume) if journal_path else None
+    all_products = list(journal.products) if journal else []
+    seen_products = set(journal.seen_products) if journal else set()
+    review_writer = ReviewStreamWriter(reviews_path, append=resume) if max_reviews else None
+
+    # With the HTTP backend, search pages still go through the browser; product and
+    # review pages are fetched concurrently and only fall back to the browser when needed.
+    # Deep review pagination always uses the HTTP fetcher so pages can load concurrently.
+    fetcher = None
+    executor = None
+    if backend == 'http' or max_reviews:
+        fetcher = HttpFetcher(pool_size=max(http_workers, review_concurrency), driver=driver,
+                              user_agents=user_agents, scheduler=scheduler)
+    if backend == 'http':
+        executor = ThreadPoolExecutor(max_workers=http_workers)
 
     for category, base_url in categories.items():
         for page in range(1, 20):
             url = f"{base_url}&page={page}"
+            if journal is not None and journal.is_page_done(category, page):
+                continue
 
-            try:
-                driver.get(url)
-                emulate_human_scrolling(driver, scroll_pause_time=random.randint(2, 4))
-                WebDriverWait(driver, 25).until(EC.presence_of_element_located((By.CSS_SELECTOR, "#search > div.s-desktop-width-max.s-desktop-content.s-wide-grid-style-t1.s-opposite-dir.s-wide-grid-style.sg-row > div.sg-col-20-of-24.s-matching-dir.sg-col-16-of-20.sg-col.sg-col-8-of-12.sg-col-12-of-16 > div > span.rush-component.s-latency-cf-section > div.s-main-slot.s-result-list.s-search-results.sg-row")))
-            except TimeoutException:
-                print(f"Timed out waiting for elements on page {page} of category {category}.")
+            search_results = scrape_search_page(driver, url, category, page, scheduler=scheduler)
+            if search_results is None:
                 continue
 
-            time.sleep(random.uniform(3.0, 6.0))
-            distinct_asins = extract_data_asins_from_html(driver.page_source)
-            print(f"Extracted ASINs: {distinct_asins}")
+            planned = {}
+            for asin, card_fields in search_results.items():
+                if asin in seen_products:
+                    # Already scraped earlier in this run or before a resume
+                    continue
+                card_fields = apply_freshness(index, asin, card_fields, ttl_seconds)
+                if card_fields is None:
+                    freshness.fresh += 1
+                    seen_products.add(asin)
+                    continue
+                planned[asin] = card_fields
+
+            # A page with a failed product is not journaled, so --resume retries that product
+            page_failed = False
+            if executor is not None:
+                # Streamed review IDs are read here because the SQLite connection belongs to this thread
+                futures = [executor.submit(scrape_product_http_task, fetcher, asin, category, card_fields, archive,
+                                           max_reviews, review_concurrency,
+                                           index.streamed_review_ids(asin) if index is not None else None)
+                           for asin, card_fields in planned.items()]
+                for asin, future in zip(planned, futures):
+                    try:
+                        product_details, rows = future.result()
+                    except Exception as e:
+                        print(f"Error processing ASIN {asin}: {e}")
+                        page_failed = True
+                        continue
+                    all_products.append(product_details)
+                    if review_writer is not None:
+                        write_review_rows(review_writer, index, asin, rows)
+                    freshness.record(index, product_details)
+                    if journal is not None:
+                        journal.record_product(product_details)
+                    seen_products.add(asin)
+                if journal is not None and not page_failed:
+                    journal.record_page(category, page)
+                continue
 
-            for asin in distinct_asins:
+            for asin, card_fields in planned.items():
                 try:
                     print(f"Processing ASIN: {asin}")
-                    product_details = extract_product_details(driver, asin)
-                    product_details['Product_ID'] = asin
-                    product_details['category'] = category
-
-                    identifier = product_details['Product_ID']
-                    if identifier and identifier not in seen_products:
-                        seen_products.add(identifier)
-                        # You need to define and implement the scrape_extra_parameters function
-                        extra_params = scrape_extra_parameters(product_details['url'], driver)
-                        product_details.update(extra_params)
-                        all_products.append(product_details)
-
+                    product_details = scrape_product(driver, asin, category, card_fields, archive=archive, scheduler=scheduler)
+                    product_details = scrape_product_reviews(driver, product_details, archive=archive, scheduler=scheduler)
+                    rows = None
+                    if review_writer is not None:
+                        known_review_ids = index.streamed_review_ids(asin) if index is not None else None
+                        rows = scrape_deep_reviews(fetcher, product_details, max_reviews, review_concurrency,
+                                                   known_review_ids, archive)
                 except Exception as e:
                     print(f"Error processing ASIN {asin}: {e}")
+                    page_failed = True
+                    continue
+
+                all_products.append(product_details)
+                if rows is not None:
+                    write_review_rows(review_writer, index, asin, rows)
+                freshness.record(index, product_details)
+                if journal is not None:
+                    journal.record_product(product_details)
+                # Only now: a product that failed above may still turn up on a later page
+                seen_products.add(asin)
 
+            if journal is not None and not page_failed:
+                journal.record_page(category, page)
+
+    if executor is not None:
+        executor.shutdown()
+    if fetcher is not None:
+        fetcher.report()
+        fetcher.close()
+    if review_writer is not None:
+        review_writer.report()
+        review_writer.close()
+    print_pacing_summary(scheduler)
+    freshness.report(index)
+    if index is not None:
+        index.close()
     driver.quit()
+    driver.report()
+    if archive is not None:
+        archive.close()
+    if journal is not None:
+        journal.close()
     return json.dumps(all_products)
 
+def crawl_worker(worker_id, tasks, results, seen_products, seen_lock, archive_dir=None, pacing='adaptive', num_workers=1,
+                 index_path=None, ttl_hours=24, max_reviews=0, review_concurrency=4,
+                 recycle_pages=200, max_browser_rss_mb=1500):
+    # One Edge instance per worker process; tasks are either search pages or ASINs
+    stats = {'worker': worker_id, 'search_pages': 0, 'products': 0, 'fresh': 0, 'errors': 0, 'elapsed': 0.0}
+    started = time.time()
+    # Timings start empty in every worker and are merged by the coordinator at the end
+    METRICS.start(METRICS.name)
+    try:
+        driver = setup_managed_driver(recycle_pages, max_browser_rss_mb)
+    except Exception as e:
+        print(f"Worker {worker_id} could not start a driver: {e}")
+        results.put(('stats', stats))
+        return
+    # Each worker writes its own archive segments so no two processes append to the same file
+    archive = PageArchive(archive_dir, writer_id=worker_id) if archive_dir else None
+    scheduler = make_scheduler(pacing, num_workers)
+    # Workers only read the freshness index; the coordinator records results in it
+    index = FreshnessIndex(index_path, readonly=True) if index_path else None
+    review_fetcher = HttpFetcher(pool_size=review_concurrency, driver=driver, user_agents=user_agents,
+                                 scheduler=scheduler) if max_reviews else None
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                tasks.task_done()
+                break
+
+            try:
+                if task[0] == 'search':
+                    _, category_index, category, page, url = task
+                    search_results = scrape_search_page(driver, url, category, page, scheduler=scheduler)
+                    stats['search_pages'] += 1
+                    if search_results is None:
+                        continue
+
+                    claimed_asins = []
+                    planned = {}
+                    for position, asin in enumerate(search_results):
+                        # The serial crawl keeps the first sighting of an ASIN, so remember the
+                        # earliest (category, page, position) seen by any worker, with its card
+                        sighting = (category_index, page, position)
+                        with seen_lock:
+                            first_sighting = seen_products.get(asin)
+                            if first_sighting is None or sighting < first_sighting[0]:
+                                seen_products[asin] = (sighting, search_results[asin])
+                        if first_sighting is None:
+                            card_fields = apply_freshness(index, asin, search_results[asin], ttl_hours * 3600)
+                            if card_fields is None:
+                                stats['fresh'] += 1
+                                continue
+                            planned[asin] = card_fields
+                            claimed_asins.append(asin)
+                    # Sent before the product tasks so the coordinator knows which ASINs
+                    # must come back before the page can be marked done
+                    results.put(('search', (category, page), claimed_asins))
+                    for asin in claimed_asins:
+                        tasks.put(('product', asin, category, planned[asin]))
+                else:
+                    _, asin, category, card_fields = task
+                    print(f"Worker {worker_id} processing ASIN: {asin}")
+                    product_details = scrape_product(driver, asin, category, card_fields, archive=archive, scheduler=scheduler)
+                    product_details = scrape_product_reviews(driver, product_details, archive=archive, scheduler=scheduler)
+                    if review_fetcher is not None:
+                        known_review_ids = index.streamed_review_ids(asin) if index is not None else None
+                        rows = scrape_deep_reviews(review_fetcher, product_details, max_reviews, review_concurrency,
+                                                   known_review_ids, archive)
+                        results.put(('reviews', asin, rows))
+                    results.put(('product', product_details))
+                    stats['products'] += 1
+            except Exception as e:
+                stats['errors'] += 1
+                print(f"Worker {worker_id} error on task {task}: {e}")
+                if task[0] == 'product':
+                    results.put(('failed', task[1]))
+                    # Sent before the claim is released, so the coordinator settles this
+                    # claim before any later sighting re-claims the ASIN
+                    with seen_lock:
+                        seen_products.pop(task[1], None)
+            finally:
+                tasks.task_done()
+    finally:
+        driver.quit()
+        stats['page_loads'] = driver.total_pages
+        stats['restarts'] = driver.restarts
+        stats['peak_rss_mb'] = driver.peak_rss_bytes / (1024 * 1024)
+        if archive is not None:
+            archive.close()
+        if index is not None:
+            index.close()
+        if review_fetcher is not None:
+            review_fetcher.close()
+        stats['elapsed'] = time.time() - started
+        results.put(('metrics', METRICS.snapshot()))
+        results.put(('stats', stats))
+
+def print_worker_summary(worker_stats):
+    print("Crawl worker summary:")
+    for stats in sorted(worker_stats, key=lambda s: s['worker']):
+        minutes = stats['elapsed'] / 60 if stats['elapsed'] else 0
+        rate = stats['products'] / minutes if minutes else 0.0
+        print(f"  worker {stats['worker']}: {stats['search_pages']} search pages, {stats['products']} products, "
+              f"{stats['errors']} errors in {stats['elapsed']:.0f}s ({rate:.1f} products/min), "
+              f"{stats.get('restarts', 0)} browser restarts, peak RSS {stats.get('peak_rss_mb', 0):.0f} MB")
+
+class CoordinatorState:
+    # Results gathered by the coordinator while the workers run
+    def __init__(self, journal, index=None, review_writer=None):
+        self.journal = journal
+        self.index = index
+        self.review_writer = review_writer
+        self.freshness = FreshnessStats()
+        self.products = []
+        self.worker_stats = []
+        self.pending_pages = {}
+        self.asin_pages = {}
+        # Pages with a failed product are left out of the journal so a resume redoes them
+        self.failed_pages = set()
+
+    def _complete_page(self, page_key):
+        if self.journal is not None and page_key not in self.failed_pages:
+            self.journal.record_page(*page_key)
+
+    def _finish_asin(self, asin):
+        page_key = self.asin_pages.pop(asin, None)
+        if page_key is None:
+            return
+        pending = self.pending_pages[page_key]
+        pending.discard(asin)
+        if not pending:
+            del self.pending_pages[page_key]
+            self._complete_page(page_key)
+
+    def handle(self, kind, *payload):
+        if kind == 'stats':
+            self.worker_stats.append(payload[0])
+        elif kind == 'metrics':
+            METRICS.merge(payload[0])
+        elif kind == 'search':
+            page_key, claimed_asins = payload
+            if not claimed_asins:
+                self._complete_page(page_key)
+                return
+            self.pending_pages[page_key] = set(claimed_asins)
+            for asin in claimed_asins:
+                self.asin_pages[asin] = page_key
+        elif kind == 'product':
+            product_details = payload[0]
+            self.products.append(product_details)
+            self.freshness.record(self.index, product_details)
+            if self.journal is not None:
+                self.journal.record_product(product_details)
+            self._finish_asin(product_details['Product_ID'])
+        elif kind == 'reviews':
+            asin, rows = payload
+            write_review_rows(self.review_writer, self.index, asin, rows)
+        elif kind == 'failed':
+            page_key = self.asin_pages.get(payload[0])
+            if page_key is not None:
+                self.failed_pages.add(page_key)
+            self._finish_asin(payload[0])
+
+    def drain(self, results, timeout):
+        try:
+            message = results.get(timeout=timeout)
+            while True:
+                self.handle(*message)
+                message = results.get_nowait()
+        except queue.Empty:
+            pass
+
+def scrape_amazon_parallel(categories, num_workers=4, archive_dir=None, pacing='adaptive',
+                           journal_path=None, resume=False, index_path=None, ttl_hours=24,
+                           max_reviews=0, review_concurrency=4, reviews_path='amazon_reviews_ext.jsonl',
+                           recycle_pages=200, max_browser_rss_mb=1500):
+    manager = multiprocessing.Manager()
+    tasks = manager.Queue()
+    results = manager.Queue()
+    seen_products = manager.dict()
+    seen_lock = manager.Lock()
+
+    journal = CrawlJournal(journal_path, resume=resume) if journal_path else None
+    resumed_products = list(journal.products) if journal else []
+    for position, product in enumerate(resumed_products):
+        # Sorts ahead of every sighting made by this run
+        seen_products[product['Product_ID']] = ((-1, 0, position), None)
+
+    # Created (with its tables) before the workers open it read-only
+    index = FreshnessIndex(index_path) if index_path else None
+    review_writer = ReviewStreamWriter(reviews_path, append=resume) if max_reviews else None
+
+    category_names = list(categories)
+    for category_index, (category, base_url) in enumerate(categories.items()):
+        for page in range(1, 20):
+            if journal is not None and journal.is_page_done(category, page):
+                continue
+            tasks.put(('search', category_index, category, page, f"{base_url}&page={page}"))
+
+    workers = [
+        multiprocessing.Process(target=crawl_worker, args=(worker_id, tasks, results, seen_products, seen_lock,
+                                                              archive_dir, pacing, num_workers, index_path, ttl_hours,
+                                                              max_reviews, review_concurrency,
+                                                              recycle_pages, max_browser_rss_mb))
+        for worker_id in range(num_workers)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Collect results as they arrive (so the journal is current) until the queue drains,
+    # without hanging if every worker died
+    state = CoordinatorState(journal, index, review_writer)
+    waiter = threading.Thread(target=tasks.join, daemon=True)
+    waiter.start()
+    while waiter.is_alive():
+        state.drain(results, timeout=1)
+        if waiter.is_alive() and not any(worker.is_alive() for worker in workers):
+            print("All crawl workers exited before the work queue was drained.")
+            break
+
+    for _ in workers:
+        tasks.put(None)
+    for worker in workers:
+        worker.join()
+    state.drain(results, timeout=0.1)
+
+    # Re-attach each product to the category and card of its first sighting and restore serial
+    # order; fields that card does not show keep the values the product was scraped with
+    first_sightings = dict(seen_products)
+    products = state.products
+    for product in products:
+        (category_index, _, _), card_fields = first_sightings[product['Product_ID']]
+        product['category'] = category_names[category_index]
+        product.update({field: card_fields[field] for field in CARD_FIELDS if field in card_fields})
+    products.sort(key=lambda product: first_sightings[product['Product_ID']][0])
+
+    print_worker_summary(state.worker_stats)
+    state.freshness.fresh = sum(stats['fresh'] for stats in state.worker_stats)
+    state.freshness.report(index)
+    if index is not None:
+        index.close()
+    if review_writer is not None:
+        review_writer.report()
+        review_writer.close()
+    manager.shutdown()
+    if journal is not None:
+        journal.close()
+    return json.dumps(resumed_products + products)
+
+
+def write_products(products, path):
+    # A .jsonl path gets one product per line so it can be read back in chunks
+    with open(path, 'w') as file:
+        if path.endswith('.jsonl'):
+            for product_details in products:
+                file.write(json.dumps(product_details) + '\n')
+        else:
+            json.dump(products, file)
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Scrape Amazon products and reviews.")
+    parser.add_argument('--workers', type=int, default=1, help="Number of parallel browser workers (1 = serial crawl)")
+    parser.add_argument('--backend', choices=['selenium', 'http'], default='selenium',
+                        help="Fetch product and review pages through the browser or pooled HTTP sessions (serial crawl only)")
+    parser.add_argument('--http-workers', type=int, default=8, help="Concurrent HTTP fetches for --backend http")
+    parser.add_argument('--pacing', choices=['adaptive', 'fixed'], default='adaptive',
+                        help="Adaptive per-host rate limiting, or the original fixed sleeps and scroll loop")
+    parser.add_argument('--journal', default='crawl_journal.jsonl', help="Append-only progress journal (products are flushed as they finish)")
+    parser.add_argument('--resume', action='store_true', help="Continue from the journal instead of starting a new crawl")
+    parser.add_argument('--index', default=None, help="SQLite freshness index; products scraped within --ttl-hours are skipped")
+    parser.add_argument('--ttl-hours', type=float, default=24, help="How long a scraped product stays fresh")
+    parser.add_argument('--max-reviews', type=int, default=0,
+                        help="Also collect up to this many reviews per product into a one-row-per-review stream")
+    parser.add_argument('--review-concurrency', type=int, default=4, help="Review pages fetched at once per product")
+    parser.add_argument('--reviews-output', default='amazon_reviews_ext.jsonl', help="Where the review stream is written")
+    parser.add_argument('--recycle-pages', type=int, default=200, help="Restart a browser after this many page loads (0 = never)")
+    parser.add_argument('--max-browser-rss-mb', type=int, default=1500, help="Restart a browser whose memory exceeds this (0 = never)")
+    parser.add_argument('--archive-dir', default=None, help="Write every fetched page to a compressed raw-HTML archive in this directory")
+    parser.add_argument('--output', default='amazon_data_ext.json',
+                        help="Where scraped products are written; a .jsonl path writes one product per line")
+    parser.add_argument('--metrics-json', default='crawl_metrics.json', help="Per-stage timing report for this run ('' to skip)")
+    parser.add_argument('--metrics-prom', default='crawl_metrics.prom', help="The same metrics in Prometheus text format ('' to skip)")
+    args = parser.parse_args()
+    METRICS.start('amazon_crawl')
+
     categories = {
         'Smartphones': 'https://www.amazon.com/s?k=smartphone&ref=nb_sb_noss',
         'Laptops': 'https://www.amazon.com/s?k=Laptops&ref=nb_sb_noss',
@@ -402,9 +1088,29 @@ if __name__ == '__main__':
 
     all_products = []
     try:
-        all_products = json.loads(scrape_amazon(categories))
+        if args.workers > 1:
+            all_products = json.loads(scrape_amazon_parallel(categories, num_workers=args.workers,
+                                                             archive_dir=args.archive_dir, pacing=args.pacing,
+                                                             journal_path=args.journal, resume=args.resume,
+                                                             index_path=args.index, ttl_hours=args.ttl_hours,
+                                                             max_reviews=args.max_reviews,
+                                                             review_concurrency=args.review_concurrency,
+                                                             reviews_path=args.reviews_output,
+                                                             recycle_pages=args.recycle_pages,
+                                                             max_browser_rss_mb=args.max_browser_rss_mb))
+        else:
+            all_products = json.loads(scrape_amazon(categories, archive_dir=args.archive_dir,
+                                                    backend=args.backend, http_workers=args.http_workers,
+                                                    pacing=args.pacing, journal_path=args.journal, resume=args.resume,
+                                                    index_path=args.index, ttl_hours=args.ttl_hours,
+                                                    max_reviews=args.max_reviews, review_concurrency=args.review_concurrency,
+                                                    reviews_path=args.reviews_output,
+                                                    recycle_pages=args.recycle_pages, max_browser_rss_mb=args.max_browser_rss_mb))
     except Exception as e:
         print(f"Error occurred during scraping: {e}")
+        # Everything finished before the failure is already in the journal
+        all_products = load_journal_products(args.journal)
     finally:
-        with open('amazon_data_ext.json', 'w') as file:
-            json.dump(all_products, file)
+        write_products(all_products, args.output)
+        METRICS.print_summary()
+        METRICS.export(args.metrics_json, args.metrics_prom)
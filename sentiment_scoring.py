@@ -0,0 +1,184 @@
+import re
+import time
+import sqlite3
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from textblob import TextBlob
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+from near_duplicates import assign_clusters
+
+
+# Bump when the scorers or the normalization change, so cached scores are not reused
+SCORER_VERSION = 1
+
+NON_ALPHA_PATTERN = re.compile(r'[^a-z\s]')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# One analyzer per worker process, built once by init_worker
+_analyzer = None
+
+
+def normalize_text(text):
+    # Same cleanup the notebook applies to the Review column: lowercase, letters only
+    text = NON_ALPHA_PATTERN.sub('', str(text).lower())
+    return WHITESPACE_PATTERN.sub(' ', text).strip()
+
+
+def text_key(normalized):
+    return hashlib.sha1(f"{SCORER_VERSION}:{normalized}".encode('utf-8')).hexdigest()
+
+
+def sentiment_label(compound):
+    if compound < 0:
+        return "Negative"
+    elif compound > 0:
+        return "Positive"
+    else:
+        return "Neutral"
+
+
+def init_worker():
+    global _analyzer
+    _analyzer = SentimentIntensityAnalyzer()
+
+
+def score_batch(texts):
+    # Runs in a worker: VADER compound, TextBlob polarity and the label for each text
+    if _analyzer is None:
+        init_worker()
+    scores = []
+    for text in texts:
+        compound = _analyzer.polarity_scores(text)['compound']
+        scores.append((compound, TextBlob(text).sentiment.polarity, sentiment_label(compound)))
+    return scores
+
+
+class SentimentCache:
+    """SQLite cache of sentiment scores keyed by a hash of the normalized review text."""
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS scores (
+                text_hash TEXT PRIMARY KEY,
+                compound REAL NOT NULL,
+                polarity REAL NOT NULL,
+                label TEXT NOT NULL
+            )
+        """)
+        self.connection.commit()
+
+    def lookup(self, keys):
+        found = {}
+        keys = list(keys)
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(keys), 900):
+            batch = keys[start:start + 900]
+            rows = self.connection.execute(
+                f"SELECT text_hash, compound, polarity, label FROM scores WHERE text_hash IN ({', '.join('?' * len(batch))})",
+                batch,
+            )
+            found.update((row[0], row[1:]) for row in rows)
+        return found
+
+    def store(self, scores):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO scores (text_hash, compound, polarity, label) VALUES (?, ?, ?, ?)",
+            [(key,) + tuple(score) for key, score in scores.items()],
+        )
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+
+class ScoringStats:
+    def __init__(self):
+        self.texts = 0
+        self.cache_hits = 0
+        self.scored = 0
+        self.seconds = 0.0
+
+    def report(self):
+        hit_rate = self.cache_hits / self.texts if self.texts else 0.0
+        rate = self.scored / self.seconds if self.seconds else 0.0
+        print(f"Sentiment: {self.texts} reviews, {self.cache_hits} cache hits ({hit_rate:.1%}), "
+              f"{self.scored} scored in {self.seconds:.1f}s ({rate:.1f} reviews/s)")
+
+
+def score_reviews(texts, cache_path='sentiment_cache.db', workers=None, batch_size=500, stats=None, cluster_ids=None):
+    """Score a column of review texts; returns a frame of Score, Polarity and Sentiment.
+
+    Texts are normalized and hashed first. Only distinct texts missing from the cache are
+    scored, in batches of batch_size spread over a process pool, and their scores are
+    written back to the cache. The result is aligned with the input's index.
+
+    With cluster_ids (from near_duplicates.assign_clusters, aligned with texts) only the
+    first review of each near-duplicate cluster is scored and the others share its score.
+    """
+    stats = stats or ScoringStats()
+    started = time.time()
+    texts = pd.Series(texts)
+    if cluster_ids is not None:
+        cluster_ids = pd.Series(cluster_ids, index=texts.index)
+        representatives = texts[~cluster_ids.duplicated()]
+        scored = score_reviews(representatives, cache_path, workers, batch_size, stats)
+        stats.texts += len(texts) - len(representatives)
+        scored = scored.set_axis(cluster_ids[representatives.index])
+        return scored.loc[cluster_ids].set_axis(texts.index)
+    keys = texts.map(normalize_text).map(lambda normalized: (text_key(normalized), normalized))
+
+    cache = SentimentCache(cache_path) if cache_path else None
+    distinct = dict(keys.tolist())
+    scores = cache.lookup(distinct) if cache is not None else {}
+    missing = [key for key in distinct if key not in scores]
+
+    if missing:
+        batches = [missing[start:start + batch_size] for start in range(0, len(missing), batch_size)]
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as executor:
+            results = executor.map(score_batch, [[distinct[key] for key in batch] for batch in batches])
+            new_scores = {key: score for batch, batch_scores in zip(batches, results) for key, score in zip(batch, batch_scores)}
+        scores.update(new_scores)
+        if cache is not None:
+            cache.store(new_scores)
+    if cache is not None:
+        cache.close()
+
+    stats.texts += len(texts)
+    missing_keys = set(missing)
+    stats.cache_hits += sum(1 for key, _ in keys if key not in missing_keys)
+    stats.scored += len(missing)
+    stats.seconds += time.time() - started
+
+    scored = [scores[key] for key, _ in keys]
+    return pd.DataFrame(scored, index=texts.index, columns=['Score', 'Polarity', 'Sentiment'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Score review sentiment with VADER and TextBlob, reusing cached scores.")
+    parser.add_argument('input', help="CSV with a review text column, e.g. formatted_customer_data.csv")
+    parser.add_argument('--column', default='Customer_i_Comment')
+    parser.add_argument('--output', default='review_sentiment.csv')
+    parser.add_argument('--cache', default='sentiment_cache.db', help="SQLite score cache ('' to disable)")
+    parser.add_argument('--workers', type=int, default=None, help="Scoring processes (default: all cores)")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--near-duplicates', action='store_true',
+                        help="Cluster near-duplicate reviews first and score each cluster once (adds cluster_id)")
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.input)
+    stats = ScoringStats()
+    cluster_ids = None
+    if args.near_duplicates:
+        clusters = assign_clusters(df[args.column])
+        cluster_ids = clusters['cluster_id']
+        df['cluster_id'] = cluster_ids
+        print(f"Near duplicates: {len(df)} reviews in {cluster_ids.nunique()} clusters")
+    df = df.join(score_reviews(df[args.column].fillna(''), args.cache, args.workers, args.batch_size, stats, cluster_ids))
+    df.to_csv(args.output, index=False)
+    stats.report()
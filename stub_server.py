@@ -0,0 +1,104 @@
+import os
+import re
+import sys
+import glob
+import argparse
+import threading
+import urllib.request
+from http import HTTPStatus
+from urllib.parse import unquote
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+
+# Saved pages are laid out as <root>/product/<ASIN>.html, <root>/reviews/<ASIN>.html
+# and <root>/search/<anything>.html; Amazon URLs are mapped onto those files.
+ROUTES = [
+    (re.compile(r'^/dp/(?P<asin>[A-Z0-9]+)'), 'product'),
+    (re.compile(r'^/product-reviews/(?P<asin>[A-Z0-9]+)'), 'reviews'),
+]
+
+
+def make_handler(root):
+    root = os.path.abspath(root)
+
+    class SavedPageHandler(SimpleHTTPRequestHandler):
+        def translate_path(self, path):
+            for pattern, page_type in ROUTES:
+                match = pattern.match(path)
+                if match:
+                    return os.path.join(root, page_type, f"{match.group('asin')}.html")
+            # Anything else is a file under root; None for paths that would leave it
+            relative = unquote(path.split('?', 1)[0].split('#', 1)[0]).lstrip('/')
+            target = os.path.normpath(os.path.join(root, relative))
+            return target if os.path.commonpath([root, target]) == root else None
+
+        def send_head(self):
+            if self.translate_path(self.path) is None:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return None
+            return super().send_head()
+
+        def log_message(self, format, *args):
+            pass
+
+    return SavedPageHandler
+
+
+def start_stub_server(root, port=0):
+    # Serves saved pages on localhost in a background thread; returns (server, base_url)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(root))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def check_http_backend(root, pool_size=8):
+    """Fetch every saved product and review page through HttpFetcher from a stub server.
+
+    Pages are requested by their Amazon URLs, so the routes, the base_url rewriting and
+    the ready-selector checks are all exercised. Returns the URLs that did not load
+    (including a path-traversal request, which must be refused).
+    """
+    from http_fetcher import HttpFetcher, AMAZON_BASE_URL, PRODUCT_PAGE_READY, REVIEW_PAGE_READY
+
+    server, base_url = start_stub_server(root)
+    fetcher = HttpFetcher(base_url=base_url, pool_size=pool_size)
+    failures = []
+    try:
+        for page_type, url_path, ready_selector in (('product', 'dp', PRODUCT_PAGE_READY),
+                                                    ('reviews', 'product-reviews', REVIEW_PAGE_READY)):
+            for path in sorted(glob.glob(os.path.join(root, page_type, '*.html'))):
+                asin = os.path.splitext(os.path.basename(path))[0]
+                url = f"{AMAZON_BASE_URL}/{url_path}/{asin}"
+                if fetcher.fetch(url, ready_selector) is None:
+                    failures.append(url)
+        # The parent of root exists, so anything but a refusal means the request escaped
+        escape_url = f"{base_url}/../"
+        try:
+            urllib.request.urlopen(urllib.request.Request(escape_url), timeout=5)
+            failures.append(escape_url)
+        except urllib.error.HTTPError:
+            pass
+        fetcher.report()
+    finally:
+        fetcher.close()
+        server.shutdown()
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Serve saved Amazon pages for offline fetch tests.")
+    parser.add_argument('root', help="Directory with product/, reviews/ and search/ pages")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--check', action='store_true',
+                        help="Fetch every saved page through the HTTP backend and exit 1 if any fails, instead of serving")
+    args = parser.parse_args()
+
+    if args.check:
+        failures = check_http_backend(args.root)
+        for url in failures:
+            print(f"FAILED: {url}")
+        sys.exit(1 if failures else 0)
+
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), make_handler(args.root))
+    print(f"Serving {args.root} on http://127.0.0.1:{args.port}")
+    server.serve_forever()
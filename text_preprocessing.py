@@ -0,0 +1,101 @@
+import re
+import time
+import argparse
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from nltk.stem import WordNetLemmatizer
+from sklearn.feature_extraction.text import CountVectorizer
+
+
+NON_ALPHA_PATTERN = re.compile(r'[^a-zA-Z]')
+
+# The stop-word list from Internship_Project.ipynb; it deliberately keeps negations like "not"
+STOP_WORDS = frozenset([
+    'yourselves', 'between', 'whom', 'itself', 'is', "she's", 'up', 'herself', 'here', 'your', 'each',
+    'we', 'he', 'my', "you've", 'having', 'in', 'both', 'for', 'themselves', 'are', 'them', 'other',
+    'and', 'an', 'during', 'their', 'can', 'yourself', 'she', 'until', 'so', 'these', 'ours', 'above',
+    'what', 'while', 'have', 're', 'more', 'only', "needn't", 'when', 'just', 'that', 'were', "don't",
+    'very', 'should', 'any', 'y', 'isn', 'who', 'a', 'they', 'to', 'too', "should've", 'has', 'before',
+    'into', 'yours', "it's", 'do', 'against', 'on', 'now', 'her', 've', 'd', 'by', 'am', 'from',
+    'about', 'further', "that'll", "you'd", 'you', 'as', 'how', 'been', 'the', 'or', 'doing', 'such',
+    'his', 'himself', 'ourselves', 'was', 'through', 'out', 'below', 'own', 'myself', 'theirs',
+    'me', 'why', 'once', 'him', 'than', 'be', 'most', "you'll", 'same', 'some', 'with', 'few', 'it',
+    'at', 'after', 'its', 'which', 'there', 'our', 'this', 'hers', 'being', 'did', 'of', 'had', 'under',
+    'over', 'again', 'where', 'those', 'then', "you're", 'i', 'because', 'does', 'all',
+])
+
+LEMMA_CACHE_SIZE = 100000
+
+_lemmatizer = None
+
+
+@lru_cache(maxsize=LEMMA_CACHE_SIZE)
+def lemmatize(word):
+    # Review vocabularies are small, so almost every lookup after warm-up is a cache hit
+    global _lemmatizer
+    if _lemmatizer is None:
+        _lemmatizer = WordNetLemmatizer()
+    return _lemmatizer.lemmatize(word)
+
+
+def tokenize(text):
+    words = NON_ALPHA_PATTERN.sub(' ', str(text).lower()).split()
+    return [lemmatize(word) for word in words if word not in STOP_WORDS]
+
+
+def preprocess(text):
+    # One corpus entry, as built by the notebook's loop
+    return ' '.join(tokenize(text))
+
+
+def tokenize_corpus(texts, workers=None, chunksize=256):
+    """Tokenize every text, spreading documents over worker processes.
+
+    Each worker keeps its own lemma cache for its lifetime, so a word is looked up in
+    WordNet at most once per worker. workers=1 runs in-process.
+    """
+    texts = list(texts)
+    if workers == 1:
+        return [tokenize(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(tokenize, texts, chunksize=chunksize))
+
+
+def preprocess_corpus(texts, workers=None, chunksize=256):
+    return [' '.join(tokens) for tokens in tokenize_corpus(texts, workers, chunksize)]
+
+
+def dtm_terms(tokens):
+    # CountVectorizer's default token pattern ignores one-letter tokens; keep that behaviour
+    return [token for token in tokens if len(token) > 1]
+
+
+def document_term_matrix(token_lists, vocabulary=None):
+    """Sparse document-term counts straight from token lists, without re-tokenizing text.
+
+    Matches CountVectorizer().fit_transform(corpus) on the joined corpus, including its
+    sorted vocabulary, but stays sparse. Returns (matrix, vectorizer).
+    """
+    vectorizer = CountVectorizer(analyzer=dtm_terms, vocabulary=vocabulary)
+    return vectorizer.fit_transform(token_lists), vectorizer
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Clean, stop-word filter and lemmatize review texts.")
+    parser.add_argument('input', help="CSV with a review text column, e.g. formatted_customer_data.csv")
+    parser.add_argument('--column', default='Customer_i_Comment')
+    parser.add_argument('--output', default='review_corpus.txt', help="One preprocessed review per line")
+    parser.add_argument('--workers', type=int, default=None, help="Preprocessing processes (default: all cores)")
+    args = parser.parse_args()
+
+    texts = pd.read_csv(args.input)[args.column].fillna('')
+    started = time.time()
+    token_lists = tokenize_corpus(texts, workers=args.workers)
+    elapsed = time.time() - started
+    matrix, vectorizer = document_term_matrix(token_lists)
+    with open(args.output, 'w', encoding='utf-8') as file:
+        file.writelines(' '.join(tokens) + '\n' for tokens in token_lists)
+    print(f"Preprocessed {len(texts)} reviews in {elapsed:.2f}s ({len(texts) / elapsed if elapsed else 0.0:.0f} reviews/s); "
+          f"document-term matrix {matrix.shape[0]} x {matrix.shape[1]}, {matrix.nnz} non-zeros")